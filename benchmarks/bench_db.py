@@ -0,0 +1,88 @@
+"""
+Micro-benchmark of bot/db_manager.py under concurrent command load: queries per second with a new
+sqlite3 connection per query (the former behaviour) against the pooled per-thread connections.
+Runs against a temporary database filled with synthetic data, never against data/kvk_data.db.
+Run from the project root: python -m benchmarks.bench_db [queries] [threads]
+"""
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_QUERIES = 20_000
+DEFAULT_THREADS = 8
+PLAYERS_PER_PERIOD = 5_000
+PERIODS = ['zone_4', 'passes', 'altars', 'kingsland']
+KVK_NAME = 'Heroic Anthem'
+
+# The database path must be set before db_manager is imported: it reads KVK_DB_FILE on import
+os.environ['KVK_DB_FILE'] = os.path.join(tempfile.mkdtemp(prefix='kvk_bench_'), 'bench.db')
+
+from bot import db_manager  # noqa: E402
+
+
+def fill_database():
+    rng = random.Random(1662)
+    rows = [
+        (KVK_NAME, period, player_id, f"Governor {player_id}", 'TAG',
+         rng.randrange(10 ** 7), rng.randrange(10 ** 6), 0, 0, 0, 0, rng.randrange(10 ** 9))
+        for period in PERIODS for player_id in range(PLAYERS_PER_PERIOD)
+    ]
+    db_manager.create_tables()
+    conn = db_manager.get_db_connection()
+    conn.executemany(db_manager.INSERT_KVK_DATA_SQL, rows)
+    db_manager._materialize_ranks(conn.cursor())
+    conn.commit()
+
+
+# The rank query used before ranks were materialized in kvk_ranks
+LEGACY_RANK_SQL = '''
+    SELECT COUNT(*) + 1 FROM kvk_data
+    WHERE kvk_id = ? AND period_key = ? AND kills > ?
+'''
+
+
+def legacy_query(player_id: int, period_key: str):
+    """One point lookup and one rank query, each on a freshly opened connection as before."""
+    for sql, args in ((db_manager.SELECT_PLAYER_SQL, (KVK_NAME, period_key, player_id)),
+                      (LEGACY_RANK_SQL, (KVK_NAME, period_key, 5_000_000))):
+        conn = sqlite3.connect(db_manager.DB_FILE)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+
+
+def pooled_query(player_id: int, period_key: str):
+    db_manager.get_player_data(KVK_NAME, period_key, player_id)
+    db_manager.get_player_rank(KVK_NAME, period_key, player_id, 'kills')
+
+
+def run(query, queries: int, threads: int) -> float:
+    rng = random.Random(7)
+    work = [(rng.randrange(PLAYERS_PER_PERIOD), rng.choice(PERIODS)) for _ in range(queries)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda args: query(*args), work))
+    return queries / (time.perf_counter() - started)
+
+
+def main(queries: int = DEFAULT_QUERIES, threads: int = DEFAULT_THREADS):
+    logging.getLogger('db_manager').setLevel(logging.WARNING)
+    fill_database()
+    legacy_qps = run(legacy_query, queries, threads)
+    pooled_qps = run(pooled_query, queries, threads)
+    db_manager.close_all_connections()
+    print(f"{queries} commands (point lookup + rank) on {threads} threads, "
+          f"{PLAYERS_PER_PERIOD * len(PERIODS)} rows")
+    print(f"connection per query: {legacy_qps:10.0f} commands/s")
+    print(f"pooled connections:   {pooled_qps:10.0f} commands/s ({pooled_qps / legacy_qps:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,66 @@
+"""
+Memory of the overall results frame before and after the dtype optimization stage
+(data_processing.dtypes.compact_results_frame), per 10k governors, on a synthetic roster.
+Run from the project root: python -m benchmarks.bench_dtypes [governors]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing.dtypes import compact_results_frame, frame_bytes
+
+DEFAULT_GOVERNORS = 100_000
+
+
+def make_results(governors: int, seed: int = 1662) -> pd.DataFrame:
+    """
+    Builds a frame laid out like calculate_stats() output before compaction: object IDs and names,
+    int64 counters, float64 requirement columns (left merge filled with zeros) and float64 percentages.
+    """
+    rng = np.random.default_rng(seed)
+    frame = {
+        'Governor ID': rng.integers(10_000_000, 99_999_999, governors).astype(str).astype(object),
+        'Governor Name': np.array([f"Governor {i}" for i in range(governors)], dtype=object),
+    }
+    for metric, high in (('Power', 300_000_000), ('Kill Points', 5_000_000_000), ('Deads', 20_000_000),
+                         ('Tier 4 Kills', 200_000_000), ('Tier 5 Kills', 200_000_000)):
+        before = rng.integers(0, high, governors)
+        frame[f"{metric}_before"] = before
+        frame[f"{metric}_after"] = before + rng.integers(0, high // 10, governors)
+        frame[f"{metric} Change"] = frame[f"{metric}_after"] - before
+    frame['Required Kills'] = rng.choice([0.0, 5e6, 15e6, 30e6], governors)
+    frame['Required Deaths'] = rng.choice([0.0, 5e5, 1.5e6, 3e6], governors)
+    frame['DKP'] = frame['Deads Change'] * 15 + frame['Tier 5 Kills Change'] * 10 + frame['Tier 4 Kills Change'] * 4
+    frame['Kills Completion'] = rng.uniform(0, 250, governors)
+    frame['Deads Completion'] = rng.uniform(0, 250, governors)
+    frame['Rank'] = pd.Series(frame['DKP']).rank(ascending=False, method='min').astype(int).to_numpy()
+    return pd.DataFrame(frame)
+
+
+def main(governors: int = DEFAULT_GOVERNORS):
+    df = make_results(governors)
+
+    started = time.perf_counter()
+    compact = compact_results_frame(df)
+    seconds = time.perf_counter() - started
+
+    # Compaction must not change any counter, and percentages only within float32 precision
+    for col in df.columns:
+        if col in ('Kills Completion', 'Deads Completion'):
+            assert np.allclose(compact[col], df[col], rtol=1e-6)
+        else:
+            assert (compact[col].to_numpy(dtype=df[col].dtype) == df[col].to_numpy()).all(), col
+
+    per_10k = 10_000 / governors / 1024 / 1024
+    before, after = frame_bytes(df), frame_bytes(compact)
+    print(f"Governors: {governors}")
+    print(f"before: {before * per_10k:8.2f} MB per 10k governors")
+    print(f"after:  {after * per_10k:8.2f} MB per 10k governors ({before / after:.1f}x smaller, "
+          f"compacted in {seconds * 1000:.1f} ms)")
+    print(compact.dtypes.value_counts().to_string())
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GOVERNORS)
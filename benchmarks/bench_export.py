@@ -0,0 +1,50 @@
+"""
+Benchmark of the results export: DataFrame.to_excel (what calculate_stats used to run before returning)
+against the streaming workbook writer of data_processing.export and the CSV and Parquet outputs,
+on a synthetic results frame. Files are written to a temporary directory.
+Run from the project root: python -m benchmarks.bench_export [governors]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_dtypes import make_results
+from data_processing import export
+from data_processing.export import write_frame
+
+DEFAULT_GOVERNORS = 20_000
+
+
+def timed(function) -> float:
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+
+def main(governors: int = DEFAULT_GOVERNORS):
+    df = make_results(governors)
+    with tempfile.TemporaryDirectory() as directory:
+        def path(name: str) -> str:
+            return os.path.join(directory, name)
+
+        to_excel_seconds = timed(lambda: df.to_excel(path('to_excel.xlsx'), index=False))
+        timings = {fmt: timed(lambda fmt=fmt: write_frame(df, path(f'results.{fmt}'), fmt))
+                   for fmt in export.EXPORT_FORMATS}
+
+        # The streaming workbook must hold the same table as the one written by to_excel
+        pd.testing.assert_frame_equal(pd.read_excel(path('results.xlsx')), pd.read_excel(path('to_excel.xlsx')))
+        sizes = {fmt: os.path.getsize(path(f'results.{fmt}')) for fmt in export.EXPORT_FORMATS}
+
+    writer = 'xlsxwriter constant_memory' if export.xlsxwriter is not None else 'openpyxl write-only'
+    print(f"Governors: {governors}, streaming writer: {writer}")
+    print(f"to_excel:       {to_excel_seconds * 1000:10.0f} ms")
+    for fmt, seconds in timings.items():
+        print(f"{fmt + ':':<15} {seconds * 1000:10.0f} ms ({to_excel_seconds / seconds:.1f}x), "
+              f"{sizes[fmt] / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GOVERNORS)
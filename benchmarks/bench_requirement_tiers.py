@@ -0,0 +1,59 @@
+"""
+Benchmark of the requirements generator: looking up each governor's power bracket in a Python loop
+against data_processing.requirements.RequirementTiers, which evaluates the whole roster at once.
+Run from the project root: python -m benchmarks.bench_requirement_tiers [governors]
+"""
+import sys
+import time
+
+import numpy as np
+
+from data_processing.requirements import CURVE_MODE, DEFAULT_REQUIREMENT_TIERS, RequirementTiers
+
+DEFAULT_GOVERNORS = 100_000
+
+
+def loop_brackets(powers: np.ndarray) -> tuple:
+    """Per-governor lookup of the highest tier whose power does not exceed the governor's."""
+    kills, deaths = [], []
+    for power in powers:
+        tier_kills, tier_deaths = 0, 0
+        for tier in DEFAULT_REQUIREMENT_TIERS:
+            if power >= tier['power']:
+                tier_kills, tier_deaths = tier['kills'], tier['deaths']
+        kills.append(tier_kills)
+        deaths.append(tier_deaths)
+    return np.array(kills), np.array(deaths)
+
+
+def best_of(function, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(governors: int = DEFAULT_GOVERNORS):
+    powers = np.random.default_rng(1662).integers(0, 150_000_000, governors)
+    brackets = RequirementTiers(DEFAULT_REQUIREMENT_TIERS)
+    curve = RequirementTiers(DEFAULT_REQUIREMENT_TIERS, CURVE_MODE, round_to=100_000)
+
+    # Both implementations must agree before their timings mean anything
+    expected_kills, expected_deaths = loop_brackets(powers)
+    kills, deaths = brackets.evaluate(powers)
+    assert np.array_equal(kills, expected_kills) and np.array_equal(deaths, expected_deaths)
+
+    loop_seconds = best_of(lambda: loop_brackets(powers), repeats=1)
+    brackets_seconds = best_of(lambda: brackets.evaluate(powers))
+    curve_seconds = best_of(lambda: curve.evaluate(powers))
+
+    print(f"Governors: {governors}, tiers: {len(DEFAULT_REQUIREMENT_TIERS)}")
+    print(f"Python loop:           {loop_seconds * 1000:8.2f} ms")
+    print(f"brackets, searchsorted: {brackets_seconds * 1000:6.2f} ms ({loop_seconds / brackets_seconds:.0f}x)")
+    print(f"curve, interp:         {curve_seconds * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GOVERNORS)
@@ -0,0 +1,81 @@
+"""
+Benchmark of the !requirements evaluation: the former per-row iterrows() loop against
+data_processing.calculator.evaluate_requirements on a synthetic roster.
+Run from the project root: python -m benchmarks.bench_requirements [governors]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing.calculator import evaluate_requirements
+
+DEFAULT_GOVERNORS = 50_000
+
+
+def make_roster(governors: int, seed: int = 1662) -> pd.DataFrame:
+    """Builds a results-like frame with the columns used by !requirements."""
+    rng = np.random.default_rng(seed)
+    deads_before = rng.integers(0, 5_000_000, governors)
+    required_kills = rng.choice([0, 5_000_000, 15_000_000, 30_000_000], governors)
+    required_deaths = rng.choice([0, 500_000, 1_500_000, 3_000_000], governors)
+    return pd.DataFrame({
+        'Governor ID': rng.integers(10_000_000, 99_999_999, governors).astype(str),
+        'Governor Name': [f"Governor {i}" for i in range(governors)],
+        'Deads_before': deads_before,
+        'Deads_after': deads_before + rng.integers(0, 4_000_000, governors),
+        'Total Kills T4+T5 Change': rng.integers(-1_000, 40_000_000, governors),
+        'Required Kills': required_kills,
+        'Required Deaths': required_deaths,
+    })
+
+
+def legacy_requirements_loop(df: pd.DataFrame) -> list:
+    """The per-row loop !requirements used before evaluate_requirements."""
+    not_completed_players_data = []
+    for index, row in df.iterrows():
+        kills_gained = row['Total Kills T4+T5 Change']
+        deaths_gained = row['Deads_after'] - row['Deads_before']
+        kills_progress_percent = (kills_gained / row['Required Kills'] * 100) if row['Required Kills'] != 0 else (
+            100 if kills_gained >= 0 else 0)
+        deaths_progress_percent = (deaths_gained / row['Required Deaths'] * 100) if row['Required Deaths'] != 0 else (
+            100 if deaths_gained >= 0 else 0)
+        kills_needed = max(0, row['Required Kills'] - kills_gained)
+        deaths_needed = max(0, row['Required Deaths'] - deaths_gained)
+        if kills_needed > 0 or deaths_needed > 0:
+            not_completed_players_data.append({
+                'Governor ID': row['Governor ID'],
+                'Kills Needed': kills_needed,
+                'Deaths Needed': deaths_needed,
+                'Kills Progress': kills_progress_percent,
+                'Deaths Progress': deaths_progress_percent,
+            })
+    return not_completed_players_data
+
+
+def main(governors: int = DEFAULT_GOVERNORS):
+    df = make_roster(governors)
+
+    started = time.perf_counter()
+    legacy = legacy_requirements_loop(df)
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = evaluate_requirements(df)
+    vectorized_seconds = time.perf_counter() - started
+
+    # Both implementations must agree before their timings mean anything
+    assert len(legacy) == len(vectorized['Governor ID'])
+    assert [p['Governor ID'] for p in legacy] == vectorized['Governor ID'].tolist()
+    assert np.allclose([p['Kills Progress'] for p in legacy], vectorized['Kills Progress'])
+    assert np.array_equal([p['Deaths Needed'] for p in legacy], vectorized['Deaths Needed'])
+
+    print(f"Governors: {governors}, not completed: {len(legacy)}")
+    print(f"iterrows loop:         {legacy_seconds * 1000:10.1f} ms")
+    print(f"evaluate_requirements: {vectorized_seconds * 1000:10.1f} ms "
+          f"({legacy_seconds / vectorized_seconds:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GOVERNORS)
@@ -0,0 +1,86 @@
+"""
+Benchmark of the scoring engine: previewing several DKP formulas on a synthetic roster, the formulas
+written out with pandas column arithmetic one by one against data_processing.scoring.ScoringEngine.
+Run from the project root: python -m benchmarks.bench_scoring [governors]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing import scoring
+from data_processing.scoring import ScoringEngine
+
+DEFAULT_GOVERNORS = 100_000
+
+# Candidate formulas of a council meeting: the current DKP formula and three alternatives
+FORMULAS = {
+    'dkp': {'deads': 15, 't5': 10, 't4': 4},
+    'heavy_deads': {'deads': 20, 't5': 10, 't4': 3},
+    'with_t3': '15 * deads + 10 * t5 + 4 * t4 + t3',
+    'power_loss': '12 * deads + 10 * t5 + 4 * t4 + power_loss / 100',
+}
+
+
+def make_changes(governors: int, seed: int = 1662) -> pd.DataFrame:
+    """Builds a frame with the change columns of a results frame."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Power Change': rng.integers(-30_000_000, 10_000_000, governors),
+        'Kills Change': rng.integers(0, 500_000_000, governors),
+        'Deads Change': rng.integers(0, 3_000_000, governors),
+        'Tier 3 Kills Change': rng.integers(0, 5_000_000, governors),
+        'Tier 4 Kills Change': rng.integers(0, 20_000_000, governors),
+        'Tier 5 Kills Change': rng.integers(0, 20_000_000, governors),
+    })
+
+
+def pandas_formulas(df: pd.DataFrame) -> dict:
+    """The same formulas with pandas column arithmetic, one formula at a time."""
+    power_loss = (-df['Power Change']).clip(lower=0)
+    return {
+        'dkp': df['Deads Change'] * 15 + df['Tier 5 Kills Change'] * 10 + df['Tier 4 Kills Change'] * 4,
+        'heavy_deads': df['Deads Change'] * 20 + df['Tier 5 Kills Change'] * 10 + df['Tier 4 Kills Change'] * 3,
+        'with_t3': (df['Deads Change'] * 15 + df['Tier 5 Kills Change'] * 10 + df['Tier 4 Kills Change'] * 4
+                    + df['Tier 3 Kills Change']),
+        'power_loss': (df['Deads Change'] * 12 + df['Tier 5 Kills Change'] * 10 + df['Tier 4 Kills Change'] * 4
+                       + power_loss / 100),
+    }
+
+
+def best_of(function, repeats: int = 5) -> float:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(governors: int = DEFAULT_GOVERNORS):
+    df = make_changes(governors)
+
+    started = time.perf_counter()
+    engine = ScoringEngine(FORMULAS)
+    compile_seconds = time.perf_counter() - started
+
+    # Both implementations must agree before their timings mean anything
+    expected = pandas_formulas(df)
+    scores = engine.evaluate_frame(df)
+    for name, values in expected.items():
+        assert np.allclose(scores[name], values), name
+
+    pandas_seconds = best_of(lambda: pandas_formulas(df))
+    engine_seconds = best_of(lambda: engine.evaluate_frame(df))
+
+    print(f"Governors: {governors}, formulas: {len(FORMULAS)}, "
+          f"numexpr: {'installed' if scoring.numexpr is not None else 'not installed'}")
+    print(f"compile:             {compile_seconds * 1000:10.2f} ms")
+    print(f"pandas, one by one:  {pandas_seconds * 1000:10.2f} ms")
+    print(f"ScoringEngine:       {engine_seconds * 1000:10.2f} ms "
+          f"({pandas_seconds / engine_seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GOVERNORS)
@@ -1,17 +1,39 @@
+import asyncio
+import io
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import pandas as pd
 import numpy as np
 import logging
 import os
-from typing import List, Tuple
+import weakref
+from typing import Dict, List, Sequence, Set, Tuple
 
 # Imports of your other modules. Ensure paths are correct.
 # calculator.py now contains calculate_stats, calculate_period_stats, get_player_stats
-from data_processing.calculator import calculate_stats, calculate_period_stats, get_player_stats
-from utils.chart_generator import create_dual_semi_circular_progress
+from data_processing.calculator import calculate_stats, get_player_stats, get_overall_input_files, \
+    evaluate_requirements
+from data_processing.period_engine import calculate_all_period_stats
+from data_processing.kvk_registry import KvkRegistry, KvkPeriod, normalize_data_key, load_current_scoring, \
+    CURRENT_KVK_SCORING_FILE, PROJECT_ROOT
+from utils.chart_generator import ChartRenderService
 from utils.helpers import create_progress_bar, format_number_custom, create_embed
+from data_processing.governor_index import GovernorIndex
+from data_processing.kingdom_summary import KingdomSummary
+from data_processing.leaderboard import Leaderboard, METRIC_LABELS, LEADERBOARD_METRICS, resolve_metric
+from data_processing.export import EXPORT_FORMATS, check_format, results_exporter
+from data_processing.requirements import RequirementTiers, RequirementsConfigError, generate_requirements_file, \
+    REQUIREMENTS_CONFIG_FILE
+from data_processing.scoring import DKP_FORMULA_NAME, ScoringEngine, ScoringFormulaError
+from data_processing.dtypes import downcast_frame, frame_bytes
+from data_processing.timeseries_store import SnapshotTimeSeries, SCANS_DIR
+from data_processing.validation import ValidationReport
+from data_processing.whatif import WhatIfComparison, unavailable_metrics
 from bot.view import PaginationView
+from bot.file_watcher import SnapshotWatcher
+from bot.compute import CoalescingExecutor, monitor_loop_lag
+from bot.embed_cache import EmbedPageCache, LazyPages
+from bot.frame_cache import FrameCache, frame_cache_budget
 
 # Configure logging
 logger = logging.getLogger('discord')
@@ -19,30 +41,47 @@ logger = logging.getLogger('discord')
 # Constant for pagination
 ITEMS_PER_PAGE = 5
 
-# Dictionary to store DataFrames with processed period statistics
-# This will prevent re-reading and re-processing files on each request
-period_dataframes = {}
-
-# Dictionary for mapping period names to file paths
-# !!! IMPORTANT: Ensure these paths and file names match your actual structure !!!
-PERIOD_CONFIG = {
-    'zone5': {
-        'start': 'zone 5/start_zone5.xlsx',
-        'end': 'zone 5/end_zone5.xlsx'
-    },
-    'altars': {
-        'start': 'altars/start_altars.xlsx',
-        'end': 'altars/end_altars.xlsx'
-    },
-    'pass7': {
-        'start': 'pass 7/start_pass7.xlsx',
-        'end': 'pass 7/end_pass7.xlsx'
-    },
-    'kingsland': {
-        'start': 'kingsland/start_kingsland.xlsx',
-        'end': 'kingsland/end_kingsland.xlsx'
-    }
-}
+# How often (in seconds) snapshot files are checked for changes
+WATCH_INTERVAL_SECONDS = 30
+
+# Key used for the overall KVK statistics (result_df) in the input dependency map
+OVERALL_KEY = 'overall'
+
+# Number of alliances listed in the per-alliance rollup of !kd_stats and !pkd
+SUMMARY_TOP_ALLIANCES = 5
+
+# Number of players listed per section of a !whatif page (top of the variant, biggest moves up and down)
+WHATIF_LISTED_PLAYERS = 5
+# Number of entries listed per section of !validation (the attached workbook has all of them)
+VALIDATION_LISTED_ISSUES = 5
+
+# Name given to a formula typed in !whatif
+WHATIF_FORMULA_NAME = 'custom'
+
+# Computation key prefix used when several periods are calculated together by the batch period engine
+PERIODS_KEY = 'periods'
+
+
+class PreparedFrame:
+    """
+    A computed frame together with the structures the commands derive from it (GovernorIndex, KingdomSummary,
+    Leaderboard), all built in the compute worker thread so that _set_frame only assigns references on the
+    event loop. With downcast, the frame is first given the compact dtypes FrameCache stores period frames with.
+    """
+
+    def __init__(self, df: pd.DataFrame, downcast: bool = False):
+        self.df = downcast_frame(df) if downcast else df
+        self.nbytes = frame_bytes(self.df)
+        self.governor_index = GovernorIndex(self.df) if not self.df.empty else None
+        self.kingdom_summary = KingdomSummary(self.df) if not self.df.empty else None
+        self.leaderboard = Leaderboard(self.df) if not self.df.empty else None
+
+
+def prepare_period_frames(period_files: Dict[str, Tuple[str, str]], master_file: str,
+                          scoring: ScoringEngine) -> Dict[str, PreparedFrame]:
+    """Calculates periods with the batch period engine and prepares their frames (run in the compute worker)."""
+    frames = calculate_all_period_stats(period_files, master_file, scoring)
+    return {data_key: PreparedFrame(df, downcast=True) for data_key, df in frames.items()}
 
 
 class BotInstance:
@@ -51,7 +90,25 @@ class BotInstance:
         # Remove the default help command to implement our own or allow specific overrides
         self.bot.remove_command('help')
         self.result_df = pd.DataFrame()  # For overall KVK statistics
-        self.period_dataframes = {}  # For caching period data
+        self.registry = KvkRegistry.load()  # The running KVK and the KVKs of kvk_configs
+        # Period frames (data key -> DataFrame), least recently used ones are evicted over the memory budget
+        self.period_dataframes = FrameCache(frame_cache_budget(), on_evict=self._forget_frame)
+        self.watcher = SnapshotWatcher()  # Detects new snapshot files dropped in mid-KVK
+        self.watch_task = tasks.loop(seconds=WATCH_INTERVAL_SECONDS)(self.refresh_changed_inputs)
+        self.compute = CoalescingExecutor()  # Keeps heavy calculations off the Discord event loop
+        self.timeseries = SnapshotTimeSeries()  # Scans of the running KVK, for period statistics over time ranges
+        self.lag_monitor_task = None
+        self.data_generations = {}  # Data key (OVERALL_KEY or period name) -> version of the loaded frame
+        # Data key -> weak reference to the computed frame last swapped in, so that callers sharing one
+        # computation (see CoalescingExecutor) swap its result in only once
+        self._frame_sources = {}
+        self.embed_cache = EmbedPageCache()  # Pre-rendered pages of !top, !ptop and !requirements
+        self.governor_indexes = {}  # Data key -> GovernorIndex of the loaded frame
+        self.kingdom_summaries = {}  # Data key -> KingdomSummary of the loaded frame (!kd_stats, !pkd)
+        self.leaderboards = {}  # Data key -> Leaderboard of the loaded frame (!top, !ptop)
+        self.validation_report = None  # ValidationReport of the inputs of result_df (!validation)
+        self.chart_service = ChartRenderService()  # Renders !stats charts in worker threads and caches them
+        self._scoring_file = os.path.join(PROJECT_ROOT, CURRENT_KVK_SCORING_FILE)  # Reloaded when it changes
         self._setup_events()
         self._setup_commands()
 
@@ -60,7 +117,11 @@ class BotInstance:
         async def on_ready():
             logger.info(f'Logged in as {self.bot.user.name} ({self.bot.user.id})')
             print(f'Logged in as {self.bot.user.name} ({self.bot.user.id})')
+            if self.lag_monitor_task is None:
+                self.lag_monitor_task = asyncio.create_task(monitor_loop_lag())
             await self.load_initial_data()
+            if not self.watch_task.is_running():
+                self.watch_task.start()
 
         @self.bot.event
         async def on_command_error(ctx, error):
@@ -69,6 +130,8 @@ class BotInstance:
             elif isinstance(error, commands.BadArgument):
                 await ctx.send(
                     f"Error: Invalid argument type. Please check your input. Correct usage: `{ctx.command.usage}`")
+            elif isinstance(error, commands.MissingPermissions):
+                await ctx.send("Error: You do not have permission to use this command.")
             elif isinstance(error, commands.CommandNotFound):
                 pass  # Ignore if command not found
             else:
@@ -76,34 +139,199 @@ class BotInstance:
                 await ctx.send(f"An unexpected error occurred while executing the command: {error}")
 
     async def load_initial_data(self):
+        # Record the current state of all inputs, so that only later changes trigger a rebuild
+        self.watcher.prime(self._input_dependencies().keys())
         # Load main KVK data on startup
-        self.result_df = calculate_stats()
+        prepared, report = await self._calculate_overall()
+        self._set_frame(OVERALL_KEY, prepared)
+        self.validation_report = report
         if self.result_df.empty:
             logger.warning("Initial KVK data (results.xlsx) is empty or failed to load.")
         else:
             logger.info(f"Loaded initial KVK data with {len(self.result_df)} players.")
+        # Pre-warm period_dataframes: every period of the running KVK whose files are present, in one batch
+        await self._load_periods([period.data_key for period in self.registry.current.periods.values()])
+        # Catch up on the scans dropped in the scans folder while the bot was not running
+        await self._record_scans()
+
+    async def _record_scans(self):
+        """
+        Records the new scan workbooks of the scans folder in the time-series store (see
+        SnapshotTimeSeries.import_folder), so that period statistics can be calculated between any two
+        timestamps (calculate_period_stats(start_time=..., end_time=...)). Only that folder holds scans:
+        the before/after and period snapshot pairs are never recorded.
+        """
+        try:
+            recorded = await self.compute.run('timeseries', self.timeseries.import_folder, SCANS_DIR)
+        except OSError as e:
+            logger.error(f"Error while recording snapshots in the time-series store: {e}", exc_info=True)
+            return
+        if recorded:
+            logger.info(f"Recorded {recorded} snapshots in the time-series store.")
+
+    async def _calculate_overall(self) -> Tuple[PreparedFrame, ValidationReport]:
+        """
+        Calculates the overall KVK statistics in a worker thread, with the validation report of the inputs.
+        The caller stores the report (validation_report) only if it swaps the frame in, so that they always match.
+        """
+        def calculate(scoring: ScoringEngine) -> Tuple[PreparedFrame, ValidationReport]:
+            report = ValidationReport()
+            # The results frame already has compact dtypes (see calculate_stats)
+            return PreparedFrame(calculate_stats(scoring, report)), report
+
+        return await self.compute.run(OVERALL_KEY, calculate, self.registry.current.scoring)
+
+    def _set_frame(self, data_key: str, prepared: PreparedFrame):
+        """
+        Swaps in a newly computed frame (result_df for OVERALL_KEY, otherwise a period) with its prepared
+        structures and bumps its data generation, so that everything derived from the previous frame is rebuilt
+        on next use. Only references are assigned here. Swapping in the frame that is already loaded (e.g. by
+        another waiter of the same computation) does nothing.
+        """
+        df = prepared.df
+        source = self._frame_sources.get(data_key)
+        if source is not None and source() is df:
+            return
+        # Assign the derived structures first, so that a command never sees the new frame with the old ones
+        self.governor_indexes[data_key] = prepared.governor_index
+        self.kingdom_summaries[data_key] = prepared.kingdom_summary
+        self.leaderboards[data_key] = prepared.leaderboard
+        if data_key == OVERALL_KEY:
+            self.result_df = df
+        else:
+            self.period_dataframes.store(data_key, df, prepared.nbytes)
+        self._frame_sources[data_key] = weakref.ref(df)
+        self.data_generations[data_key] = self.data_generations.get(data_key, 0) + 1
+        self.embed_cache.invalidate(data_key)
+
+    def _forget_frame(self, data_key: str):
+        """Drops what was derived from a period frame evicted from period_dataframes."""
+        self.governor_indexes.pop(data_key, None)
+        self.kingdom_summaries.pop(data_key, None)
+        self.leaderboards.pop(data_key, None)
+        self._frame_sources.pop(data_key, None)
+        self.embed_cache.invalidate(data_key)
+
+    def _cached_pages(self, command: str, data_key: str, df: pd.DataFrame, builder) -> Sequence[discord.Embed]:
+        # df must be the frame currently stored for data_key, so that it matches the generation in the key
+        return self.embed_cache.get_or_build(command, data_key, self.data_generations.get(data_key, 0),
+                                             lambda: builder(df))
+
+    async def _load_periods(self, data_keys) -> Set[str]:
+        """
+        Calculates the given periods with the batch period engine (one pass per KVK) and stores the non-empty
+        frames. Periods whose files are missing are skipped; an empty result keeps the previously loaded frame.
+        Returns the data keys of the periods that were stored.
+        """
+        # Group the periods by KVK: they share its main player list
+        periods_by_kvk: Dict[str, List[KvkPeriod]] = {}
+        for data_key in data_keys:
+            period = self.registry.resolve(data_key)
+            if period is not None and period.has_snapshots:
+                periods_by_kvk.setdefault(period.kvk.slug, []).append(period)
+
+        loaded = set()
+        for periods in periods_by_kvk.values():
+            period_files = {period.data_key: (period.start_file, period.end_file) for period in periods}
+            # Requests for the same set of periods share one computation
+            compute_key = next(iter(period_files)) if len(period_files) == 1 else \
+                f"{PERIODS_KEY}:{','.join(sorted(period_files))}"
+            frames = await self.compute.run(compute_key, prepare_period_frames, period_files,
+                                            periods[0].kvk.master_file, periods[0].kvk.scoring)
+            for data_key, prepared in frames.items():
+                if prepared.df.empty:
+                    logger.warning(f"Processed data for period '{data_key}' is empty, keeping the previous data.")
+                    continue
+                self._set_frame(data_key, prepared)
+                loaded.add(data_key)
+                logger.info(f"Loaded data for period '{data_key}' with {len(prepared.df)} players.")
+        return loaded
+
+    def _input_dependencies(self) -> Dict[str, Set[str]]:
+        """
+        Maps every input workbook to the keys of the DataFrames built from it:
+        OVERALL_KEY for result_df and the period name for each entry of period_dataframes.
+        """
+        dependencies = {}
+        overall_files = get_overall_input_files()
+        for path in overall_files.values():
+            dependencies.setdefault(path, set()).add(OVERALL_KEY)
+        # The running KVK's scoring formulas score result_df and its periods
+        dependencies[self._scoring_file] = {OVERALL_KEY} | {
+            period.data_key for period in self.registry.current.periods.values() if period.start_file is not None}
+        for period in self.registry.periods():
+            if period.start_file is None:
+                continue  # The config describes no snapshot pair for the period
+            # The KVK's main player list (kvk_start_power.xlsx) is an input of each of its periods
+            for path in (period.start_file, period.end_file, period.kvk.master_file):
+                dependencies.setdefault(path, set()).add(period.data_key)
+        return dependencies
+
+    async def refresh_changed_inputs(self):
+        """
+        Records new scans and rebuilds only the DataFrames that depend on snapshot files changed since the last check.
+        New frames are fully built before being swapped in with a single reference assignment,
+        so commands that are already running keep working with the previous frame.
+        """
+        await self._record_scans()
+        dependencies = self._input_dependencies()
+        changed_files = self.watcher.poll(dependencies.keys())
+        if not changed_files:
+            return
+
+        stale_keys = set().union(*(dependencies[path] for path in changed_files))
+        logger.info(f"Input files changed: {', '.join(sorted(os.path.basename(p) for p in changed_files))}. "
+                    f"Rebuilding: {', '.join(sorted(stale_keys))}")
+        if self._scoring_file in changed_files:
+            # Computations keyed by the formulas (!whatif) pick up the new engine through its signature
+            self.registry.current.scoring = load_current_scoring()
+
+        try:
+            if OVERALL_KEY in stale_keys:
+                prepared, report = await self._calculate_overall()
+                if prepared.df.empty:
+                    logger.warning("Rebuilt KVK data is empty, keeping the previous data.")
+                else:
+                    self._set_frame(OVERALL_KEY, prepared)
+                    self.validation_report = report
+                    logger.info(f"Reloaded KVK data with {len(prepared.df)} players.")
+
+            # Stale periods are recalculated together, so snapshots they share are loaded only once.
+            # Periods of other KVKs are only recalculated if they are currently loaded.
+            current_periods = {period.data_key for period in self.registry.current.periods.values()}
+            stale_periods = {data_key for data_key in stale_keys - {OVERALL_KEY}
+                             if data_key in current_periods or data_key in self.period_dataframes}
+            if stale_periods:
+                await self._load_periods(sorted(stale_periods))
+        except Exception as e:
+            # Never let a broken workbook stop the watcher loop; the next change triggers a new attempt
+            logger.error(f"Error while rebuilding data after input change: {e}", exc_info=True)
 
     async def get_period_df(self, period_name: str) -> pd.DataFrame:
-        period_name = period_name.lower()
+        period_name = normalize_data_key(period_name)
+        period = self.registry.resolve(period_name)
 
-        # Check if the period name is valid based on PERIOD_CONFIG
-        if period_name not in PERIOD_CONFIG:
+        # Check if the period name is valid: a period of the running KVK or '<kvk>:<period>' from kvk_configs
+        if period is None:
             # Removed the raise ValueError, now handling directly
             await self.bot.get_channel(self.bot.last_command_channel_id).send(
-                f"Unknown period '{period_name}'. Available periods: {', '.join(PERIOD_CONFIG.keys())}")
+                f"Unknown period '{period_name}'. Available periods: "
+                f"{', '.join(self.registry.current.periods.keys())}. Use `!kvks` for periods of other KVKs.")
             return None
 
         # Check if data for this period is already cached
-        if period_name not in self.period_dataframes or self.period_dataframes[period_name].empty:
-            period_files = PERIOD_CONFIG[period_name]
-            start_file_path = period_files['start']
-            end_file_path = period_files['end']
+        period_df = self.period_dataframes.get(period_name)
+        if period_df is None or period_df.empty:
+            start_file_full_path, end_file_full_path = period.start_file, period.end_file
 
-            # Construct full paths relative to the script or data directory
-            start_file_full_path = os.path.join(os.getcwd(), start_file_path)
-            end_file_full_path = os.path.join(os.getcwd(), end_file_path)
+            if period.start_file is None:
+                await self.bot.get_channel(self.bot.last_command_channel_id).send(
+                    f"Period `{period_name}` has no snapshot files configured, so it has no period statistics."
+                )
+                logger.warning(f"Period '{period_name}' has no 'period_snapshots' entry in its KVK config.")
+                return None
 
-            if not os.path.exists(start_file_full_path) or not os.path.exists(end_file_full_path):
+            if not period.has_snapshots:
                 # Specific message if files do not exist (battle has not started or files missing)
                 # Removed file paths from the user-facing message
                 await self.bot.get_channel(self.bot.last_command_channel_id).send(
@@ -115,9 +343,8 @@ class BotInstance:
                 return None
 
             logger.info(f"Loading and processing data for period: {period_name}")
-            period_df = calculate_period_stats(start_file_full_path, end_file_full_path)
-
-            if period_df.empty:
+            # Concurrent requests for the same period share this single computation
+            if period_name not in await self._load_periods([period_name]):
                 # Specific message if data is empty after processing (calculation in progress or no meaningful data)
                 await self.bot.get_channel(self.bot.last_command_channel_id).send(
                     f"⏳ Results for period `{period_name.upper()}` are currently being calculated, or data is not yet available. Please try again later."
@@ -125,11 +352,272 @@ class BotInstance:
                 logger.warning(f"Processed data for period '{period_name}' is empty.")
                 return None
 
-            self.period_dataframes[period_name] = period_df  # Store for future use
-            return period_df
+            return self.period_dataframes[period_name]
         else:
             logger.info(f"Data for period '{period_name}' loaded from cache.")
-            return self.period_dataframes[period_name]
+            return period_df
+
+    @staticmethod
+    def _build_summary_embed(summary: KingdomSummary, title: str) -> discord.Embed:
+        """Formats the kingdom totals of !kd_stats and !pkd, with the per-alliance and per-power-bracket rollups."""
+        totals = summary.totals
+        embed = create_embed(title=title, description="", color=discord.Color.blue())
+        embed.add_field(name="⚔️ Total Kills Gained:", value=format_number_custom(totals.get('kills', 0)), inline=False)
+        embed.add_field(name="💀 Total Deaths Gained:", value=format_number_custom(totals.get('deaths', 0)), inline=False)
+        embed.add_field(name="💪 Change in Total Power:", value=format_number_custom(totals.get('power_change', 0)),
+                        inline=False)
+        embed.add_field(name="⚡ Current Total Power:", value=format_number_custom(totals.get('current_power', 0)),
+                        inline=False)
+
+        if summary.by_alliance is not None and not summary.by_alliance.empty:
+            lines = [f"**{alliance}** ({int(row['governors'])}): DKP {format_number_custom(row.get('dkp', 0))}, "
+                     f"kills {format_number_custom(row.get('kills', 0))}, "
+                     f"deaths {format_number_custom(row.get('deaths', 0))}"
+                     for alliance, row in summary.by_alliance.head(SUMMARY_TOP_ALLIANCES).iterrows()]
+            embed.add_field(name="🛡️ Top Alliances:", value="\n".join(lines), inline=False)
+
+        if summary.by_power_bracket is not None and not summary.by_power_bracket.empty:
+            lines = [f"**{bracket}** ({int(row['governors'])}): kills {format_number_custom(row.get('kills', 0))}, "
+                     f"deaths {format_number_custom(row.get('deaths', 0))}"
+                     for bracket, row in summary.by_power_bracket.iterrows()]
+            embed.add_field(name="📶 By Power Bracket:", value="\n".join(lines), inline=False)
+        return embed
+
+    @staticmethod
+    def _build_top_pages(df: pd.DataFrame, leaderboard: Leaderboard, metric: str = 'dkp') -> Sequence[discord.Embed]:
+        """Builds the pages of !top, rendered when first viewed. Returns an empty list if there are no players."""
+        player_count = leaderboard.size(metric)
+
+        if player_count == 0:
+            return []
+
+        total_pages = (player_count + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+        title = "🏆 Top Players (KVK Gains)" if metric == 'dkp' else f"🏆 Top Players by {METRIC_LABELS[metric]} (KVK Gains)"
+
+        def render(page: int) -> discord.Embed:
+            start_rank = page * ITEMS_PER_PAGE
+            current_page_players = df.iloc[leaderboard.positions(metric, start_rank, start_rank + ITEMS_PER_PAGE)]
+
+            embed = discord.Embed(
+                title=title,
+                color=discord.Color.gold()
+            )
+
+            for offset, (_, row) in enumerate(current_page_players.iterrows()):
+                current_rank = start_rank + offset + 1
+
+                field_name = f"#{current_rank}. {row['Governor Name']}"
+
+                # Ця частина залишена як було, щоб уникнути помилки, що виникла
+                # Якщо тут виникне помилка, ми знаємо, що потрібно буде перевірити
+                # попередню обробку цих колонок або перевірити, чи вони завжди є числами.
+                # За замовчуванням, вважаємо, що вони вже були оброблені або не містять NaN.
+                t4_kills_gained = row['Tier 4 Kills_after'] - row['Tier 4 Kills_before']
+                t5_kills_gained = row['Tier 5 Kills_after'] - row['Tier 5 Kills_before']
+
+                field_value = (
+                    f"🏅 DKP: {format_number_custom(row['DKP'])}\n"
+                    f"💀 Deaths Gained: {format_number_custom(row['Deads Change'])}\n"
+                    f"⚔️ Kill Points Gained: {format_number_custom(row['Kills Change'])}\n"
+                    f"T4 Kills Gained: {format_number_custom(t4_kills_gained)}\n"
+                    f"T5 Kills Gained: {format_number_custom(t5_kills_gained)}"
+                )
+                if metric == 'power':
+                    field_value += f"\n💪 Power Change: {format_number_custom(row['Power Change'])}"
+                embed.add_field(
+                    name=field_name,
+                    value=field_value,
+                    inline=False
+                )
+
+            embed.set_footer(text=f"Page {page + 1}/{total_pages}")
+            return embed
+
+        return LazyPages(total_pages, render)
+
+    @staticmethod
+    def _build_ptop_pages(df_period: pd.DataFrame, period_name: str, leaderboard: Leaderboard,
+                          metric: str = 'dkp') -> Sequence[discord.Embed]:
+        """
+        Builds the pages of !ptop (players with a metric value above 0), rendered when first viewed.
+        Returns an empty list if there are none.
+        """
+        # Players with a positive value are the head of the leaderboard order
+        player_count = leaderboard.size(metric, positive_only=True)
+
+        if player_count == 0:
+            return []
+
+        total_pages = (player_count + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+
+        def render(page: int) -> discord.Embed:
+            start_rank = page * ITEMS_PER_PAGE
+            players = df_period.iloc[leaderboard.positions(metric, start_rank, start_rank + ITEMS_PER_PAGE,
+                                                           positive_only=True)]
+            messages = []
+            for offset, (_, player) in enumerate(players.iterrows()):
+                dkp = format_number_custom(player.get('DKP', 0))
+                deads_gained = format_number_custom(player.get('Deads Change', 0))
+                kills_gained = format_number_custom(player.get('Kills Change', 0))
+                t4_kills_gained = format_number_custom(player.get('Tier 4 Kills Change', 0))
+                t5_kills_gained = format_number_custom(player.get('Tier 5 Kills Change', 0))
+                # The DKP leaderboard shows the period's DKP rank, the others the position by their metric
+                rank = int(player['Rank']) if metric == 'dkp' else start_rank + offset + 1
+
+                msg = (
+                    f"**#{rank}. {player['Governor Name']}** (ID: {player['Governor ID']})\n"
+                    f"  🏅 DKP: {dkp}\n"
+                    f"  💀 Deaths Gained: {deads_gained}\n"
+                    f"  ⚔️ Kill Points Gained: {kills_gained}\n"
+                    f"  T4 Kills Gained: {t4_kills_gained}\n"
+                    f"  T5 Kills Gained: {t5_kills_gained}"
+                )
+                if metric == 'power':
+                    msg += f"\n  💪 Power Change: {format_number_custom(player.get('Power Change', 0))}"
+                messages.append(msg)
+
+            embed = create_embed(
+                title=f"Top Players by {METRIC_LABELS[metric]} for {period_name.capitalize()} Period",
+                description="\n".join(messages),
+                color=discord.Color.purple()
+            )
+            embed.set_footer(text=f"Page {page + 1}/{total_pages}")
+            return embed
+
+        return LazyPages(total_pages, render)
+
+    @staticmethod
+    def _build_requirements_pages(df: pd.DataFrame) -> List[discord.Embed]:
+        """Builds the pages of !requirements. Returns an empty list if every player met the requirements."""
+        logging.debug("DEBUG: Starting processing of player data for requirements.")
+        not_completed = evaluate_requirements(df)
+        not_completed_count = len(not_completed['Governor ID'])
+
+        if not_completed_count == 0:
+            return []
+
+        all_req_embeds = []
+        for i in range(0, not_completed_count, ITEMS_PER_PAGE):
+            embed = create_embed(
+                title="⚠️ Players Not Meeting Requirements",
+                color=discord.Color.orange()
+            )
+
+            for j in range(i, min(i + ITEMS_PER_PAGE, not_completed_count)):
+                player_data = {key: values[j] for key, values in not_completed.items()}
+                field_value_parts = []
+
+                if player_data['Kills Done'] and not player_data['Deaths Done']:
+                    field_value_parts.append("Status: Kills requirement met, but deaths are still needed.")
+                elif not player_data['Kills Done'] and player_data['Deaths Done']:
+                    field_value_parts.append("Status: Deaths requirement met, but kills are still needed.")
+                elif not player_data['Kills Done'] and not player_data['Deaths Done']:
+                    field_value_parts.append("Status: Both requirements are pending.")
+
+                if player_data['Kills Done']:
+                    field_value_parts.append("✅ Kills: **Requirements met!**")
+                else:
+                    field_value_parts.append(f"⚔️ Kills: {create_progress_bar(player_data['Kills Progress'])}")
+                    field_value_parts.append(
+                        f"(Needs {format_number_custom(player_data['Kills Needed'])} more)")
+
+                if player_data['Deaths Done']:
+                    field_value_parts.append("✅ Deaths: **Requirements met!**")
+                else:
+                    field_value_parts.append(f"💀 Deaths: {create_progress_bar(player_data['Deaths Progress'])}")
+                    field_value_parts.append(
+                        f"(Needs {format_number_custom(player_data['Deaths Needed'])} more)")
+
+                field_value = "\n".join(field_value_parts)
+
+                embed.add_field(
+                    name=f"{player_data['Governor Name']} (ID: {player_data['Governor ID']})",
+                    value=field_value,
+                    inline=False
+                )
+
+            total_pages = (not_completed_count + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
+            embed.set_footer(text=f"Page {len(all_req_embeds) + 1}/{total_pages}")
+            all_req_embeds.append(embed)
+
+        return all_req_embeds
+
+    @staticmethod
+    def _build_validation_embed(report: ValidationReport) -> discord.Embed:
+        """Formats the validation report of the latest overall calculation for !validation."""
+        def id_lines(ids_by_source: Dict[str, np.ndarray]) -> str:
+            return "\n".join(
+                f"**{source}**: {len(ids)} ({', '.join(ids[:VALIDATION_LISTED_ISSUES])}"
+                f"{', ...' if len(ids) > VALIDATION_LISTED_ISSUES else ''})"
+                for source, ids in ids_by_source.items()) or "None"
+
+        def issue_lines(issues: pd.DataFrame, with_z_score: bool) -> str:
+            lines = [f"**{issue['Governor Name']}** (ID: {issue['Governor ID']}): {issue['Column']} "
+                     f"{format_number_custom(issue['Change'])}" + (f" (z = {issue['Z-score']})" if with_z_score else "")
+                     for _, issue in issues.head(VALIDATION_LISTED_ISSUES).iterrows()]
+            if len(issues) > VALIDATION_LISTED_ISSUES:
+                lines.append(f"...and {len(issues) - VALIDATION_LISTED_ISSUES} more")
+            return "\n".join(lines) or "None"
+
+        embed = create_embed(
+            title="🩺 Snapshot Validation",
+            description=report.summary(),
+            color=discord.Color.green() if report.issue_count == 0 else discord.Color.orange()
+        )
+        embed.add_field(name="👥 Duplicate Governor IDs:", value=id_lines(report.duplicates), inline=False)
+        embed.add_field(name="🚪 Dropped by Merges:", value=id_lines(report.dropped), inline=False)
+        embed.add_field(name="📉 Negative Changes:", value=issue_lines(report.negative_deltas, False), inline=False)
+        embed.add_field(name="⚠️ Outliers:", value=issue_lines(report.outliers, True), inline=False)
+        embed.add_field(name="❔ Missing Changes:", value=issue_lines(report.missing_changes, False), inline=False)
+        return embed
+
+    @staticmethod
+    def _build_whatif_report(df: pd.DataFrame, scoring: ScoringEngine,
+                             variants: List[str]) -> Tuple[WhatIfComparison, bytes]:
+        """Scores the formulas of !whatif and writes the comparison workbook (runs in a worker thread)."""
+        comparison = WhatIfComparison(df, scoring, variants)
+        workbook = io.BytesIO()
+        comparison.write_workbook(workbook)
+        return comparison, workbook.getvalue()
+
+    @staticmethod
+    def _build_whatif_embeds(comparison: WhatIfComparison) -> List[discord.Embed]:
+        """Builds one !whatif page per variant: how the variant reorders the DKP leaderboard."""
+        def shift_label(shift: int) -> str:
+            return f"▲{shift}" if shift > 0 else (f"▼{-shift}" if shift < 0 else "=")
+
+        def player_lines(row: int, positions) -> str:
+            return "\n".join(
+                f"**{comparison.governor_names[p]}** (ID: {comparison.governor_ids[p]}): "
+                f"#{comparison.ranks[0, p]} → #{comparison.ranks[row, p]} ({shift_label(comparison.shifts[row, p])})"
+                for p in positions) or "None"
+
+        summary = comparison.summary()
+        top_kept_column = summary.columns[-1]
+        baseline = comparison.formulas[comparison.baseline]
+        embeds = []
+        for row, name in enumerate(comparison.names[1:], start=1):
+            stats = summary.iloc[row - 1]
+            embed = create_embed(
+                title=f"🔀 What-if: {name}",
+                description=f"`{comparison.formulas[name].expression}`\ncompared with {comparison.baseline.upper()} "
+                            f"`{baseline.expression}`",
+                color=discord.Color.teal()
+            )
+            embed.add_field(name="📊 Rank Changes:", value=(
+                f"Governors moved: {format_number_custom(stats['Governors Moved'])}\n"
+                f"Mean rank shift: {format_number_custom(round(float(stats['Mean Rank Shift']), 2))}\n"
+                f"Largest rank shift: {format_number_custom(stats['Largest Rank Shift'])}\n"
+                f"{top_kept_column}: {format_number_custom(stats[top_kept_column])}"
+            ), inline=False)
+            embed.add_field(name=f"🏆 Top {WHATIF_LISTED_PLAYERS} with {name}:",
+                            value=player_lines(row, comparison.top(name, WHATIF_LISTED_PLAYERS)), inline=False)
+            movers = comparison.movers(name, WHATIF_LISTED_PLAYERS)
+            embed.add_field(name="📈 Moved Up the Most:", value=player_lines(row, movers['up']), inline=False)
+            embed.add_field(name="📉 Moved Down the Most:", value=player_lines(row, movers['down']), inline=False)
+            embed.set_footer(text=f"Page {row}/{len(comparison.names) - 1} · full comparison in whatif.xlsx")
+            embeds.append(embed)
+        return embeds
 
     def _setup_commands(self):
         # Store ctx.channel.id to send messages from get_period_df
@@ -167,7 +655,9 @@ class BotInstance:
                 await ctx.send("Data not yet loaded. Please wait or ensure 'results.xlsx' exists.")
                 return
 
-            player_stats = get_player_stats(self.result_df, player_id)
+            player_stats = get_player_stats(self.result_df, player_id, self.governor_indexes.get(OVERALL_KEY))
+            # Charts are cached per data version, so a reload of the data renders them again
+            chart_cache_key = (OVERALL_KEY, str(player_id).strip(), self.data_generations.get(OVERALL_KEY, 0))
 
             if player_stats:
                 embed = create_embed(
@@ -207,8 +697,9 @@ class BotInstance:
                     logger.debug(
                         f"Chart data for {player_id}: kills_comp={player_stats['kills_completion']:.2f}, deaths_comp={player_stats['deads_completion']:.2f}, req_kills={player_stats['required_kills']}, current_kills_t4t5={player_stats['total_t4_t5_kills_change']}, req_deaths={player_stats['required_deaths']}, deads_change={player_stats['deads_change']}")
 
-                    # Call create_dual_semi_circular_progress with all necessary arguments
-                    chart_path = create_dual_semi_circular_progress(
+                    # Render the chart in the background (or take it from the cache) with all necessary arguments
+                    chart_buffer = await self.chart_service.render(
+                        chart_cache_key,
                         player_stats['kills_completion'],
                         player_stats['deads_completion'],
                         player_stats['governor_name'],
@@ -218,23 +709,45 @@ class BotInstance:
                         player_stats['deads_change']
                     )
 
-                    if chart_path:
-                        logger.debug(f"Chart file path returned: {chart_path}")
-                        file = discord.File(chart_path, filename="progress_chart.png")
+                    if chart_buffer:
+                        # The chart is sent straight from memory, nothing is written to disk
+                        file = discord.File(chart_buffer, filename="progress_chart.png")
                         embed.set_image(url=f"attachment://progress_chart.png")
                         await ctx.send(file=file, embed=embed)
-                        os.remove(chart_path)
-                        logger.debug(f"Chart file {chart_path} sent and removed.")
+                        logger.debug(f"Chart for {player_id} sent.")
                     else:
                         logger.error(
-                            f"create_dual_semi_circular_progress returned None for player {player_id}. Chart not created.")
+                            f"Chart rendering returned None for player {player_id}. Chart not created.")
                         await ctx.send(embed=embed)
                 except Exception as e:
                     logger.error(f"Error creating or sending chart for {player_id}: {e}", exc_info=True)
                     await ctx.send(embed=embed)
 
             else:
-                await ctx.send(f"Player with ID **{player_id}** not found.")
+                await ctx.send(f"Player with ID **{player_id}** not found. Use `!find <name>` to look up an ID.")
+
+        @self.bot.command(name='find', help='Finds players by in-game name (prefix or approximate match). '
+                                            'Usage: !find <name>')
+        async def find(ctx, *, name: str):
+            df = self.result_df
+            index = self.governor_indexes.get(OVERALL_KEY)
+            if df.empty or index is None:
+                await ctx.send("Data not yet loaded. Please wait or ensure 'results.xlsx' exists.")
+                return
+
+            positions = index.find_by_name(name, limit=10)
+            if not positions:
+                await ctx.send(f"No players found matching **{name}**.")
+                return
+
+            matches = df.iloc[positions]
+            embed = create_embed(
+                title=f"🔎 Players matching: {name}",
+                description="\n".join(
+                    f"**{row['Governor Name']}** (ID: {row['Governor ID']})" for _, row in matches.iterrows()),
+                color=discord.Color.blue()
+            )
+            await ctx.send(embed=embed)
 
         @self.bot.command(name='kd_stats', help='Displays overall kingdom K/D statistics.')
         async def kd_stats(ctx):
@@ -256,32 +769,8 @@ class BotInstance:
                     await ctx.send(f"An error occurred: {error_msg}")
                     return
 
-                for col in ['Kills Change', 'Deads Change', 'Power_after', 'Power_at_KVK_start', 'Tier 4 Kills Change',
-                            'Tier 5 Kills Change', 'DKP']:
-                    if col in df.columns:
-                        df.loc[:, col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-
-                total_kills_gained = df['Kills Change'].sum()
-                total_deaths_gained = df['Deads Change'].sum()
-                total_t4_kills_gained = df['Tier 4 Kills Change'].sum()
-                total_t5_kills_gained = df['Tier 5 Kills Change'].sum()
-                total_dkp = df['DKP'].sum()
-                total_power_change = (df['Power_after'] - df['Power_at_KVK_start']).sum()
-                current_total_power = df['Power_after'].sum()
-
-                embed = create_embed(
-                    title="📊 Kingdom Overview",
-                    description="",
-                    color=discord.Color.blue()
-                )
-                embed.add_field(name="⚔️ Total Kills Gained:", value=format_number_custom(total_kills_gained),
-                                inline=False)
-                embed.add_field(name="💀 Total Deaths Gained:", value=format_number_custom(total_deaths_gained),
-                                inline=False)
-                embed.add_field(name="💪 Change in Total Power:", value=format_number_custom(total_power_change),
-                                inline=False)
-                embed.add_field(name="⚡ Current Total Power:", value=format_number_custom(current_total_power),
-                                inline=False)
+                # Totals and rollups are computed once per data version, when the frame is loaded
+                embed = self._build_summary_embed(self.kingdom_summaries[OVERALL_KEY], "📊 Kingdom Overview")
 
                 await ctx.send(embed=embed)
                 logging.info("kd_stats: Kingdom overview information sent.")
@@ -316,91 +805,15 @@ class BotInstance:
                     await ctx.send(f"An error occurred: {error_msg}")
                     return
 
-                for col in ['Required Kills', 'Required Deaths', 'Kill Points_before', 'Kill Points_after',
-                            'Deads_before', 'Deads_after', 'Total Kills T4+T5 Change']:
-                    df.loc[:, col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-                    if df.loc[:, col].dtype == 'float64' and (df.loc[:, col] == df.loc[:, col].astype(int)).all():
-                        df.loc[:, col] = df[col].astype(int)
-
-                logging.debug("DEBUG: Starting processing of player data for requirements.")
-                not_completed_players_data = []
-                for index, row in df.iterrows():
-                    kills_gained = row['Total Kills T4+T5 Change']
-                    deaths_gained = row['Deads_after'] - row['Deads_before']
-
-                    kills_progress_percent = (kills_gained / row['Required Kills'] * 100) if row[
-                                                                                                 'Required Kills'] != 0 else (
-                        100 if kills_gained >= 0 else 0)
-                    deaths_progress_percent = (deaths_gained / row['Required Deaths'] * 100) if row[
-                                                                                            'Required Deaths'] != 0 else (
-                        100 if deaths_gained >= 0 else 0)
-
-                    kills_needed = max(0, row['Required Kills'] - kills_gained)
-                    deaths_needed = max(0, row['Required Deaths'] - deaths_gained)
-
-                    if kills_needed > 0 or deaths_needed > 0:
-                        not_completed_players_data.append({
-                            'Governor Name': row['Governor Name'],
-                            'Governor ID': row['Governor ID'],
-                            'Kills Needed': kills_needed,
-                            'Deaths Needed': deaths_needed,
-                            'Kills Progress': kills_progress_percent,
-                            'Deaths Progress': deaths_progress_percent,
-                            'Kills Done': (kills_needed == 0),
-                            'Deaths Done': (deaths_needed == 0)
-                        })
-
-                if not not_completed_players_data:
+                # evaluate_requirements converts the columns on its own, the shared frame is left untouched
+                all_req_embeds = self._cached_pages('requirements', OVERALL_KEY, df, self._build_requirements_pages)
+
+                if not all_req_embeds:
                     embed = discord.Embed(title="🎉 All players have met the requirements!", color=discord.Color.green())
                     await ctx.send(embed=embed)
                     logging.info("INFO: All players have met the requirements.") # ИСПОЛЬЗУЕМ commands_logger
                     return
 
-                all_req_embeds = []
-                for i in range(0, len(not_completed_players_data), ITEMS_PER_PAGE):
-                    current_page_players = not_completed_players_data[i:i + ITEMS_PER_PAGE]
-
-                    embed = create_embed(
-                        title="⚠️ Players Not Meeting Requirements",
-                        color=discord.Color.orange()
-                    )
-
-                    for player_data in current_page_players:
-                        field_value_parts = []
-
-                        if player_data['Kills Done'] and not player_data['Deaths Done']:
-                            field_value_parts.append("Status: Kills requirement met, but deaths are still needed.")
-                        elif not player_data['Kills Done'] and player_data['Deaths Done']:
-                            field_value_parts.append("Status: Deaths requirement met, but kills are still needed.")
-                        elif not player_data['Kills Done'] and not player_data['Deaths Done']:
-                            field_value_parts.append("Status: Both requirements are pending.")
-
-                        if player_data['Kills Done']:
-                            field_value_parts.append("✅ Kills: **Requirements met!**")
-                        else:
-                            field_value_parts.append(f"⚔️ Kills: {create_progress_bar(player_data['Kills Progress'])}")
-                            field_value_parts.append(
-                                f"(Needs {format_number_custom(player_data['Kills Needed'])} more)")
-
-                        if player_data['Deaths Done']:
-                            field_value_parts.append("✅ Deaths: **Requirements met!**")
-                        else:
-                            field_value_parts.append(f"💀 Deaths: {create_progress_bar(player_data['Deaths Progress'])}")
-                            field_value_parts.append(
-                                f"(Needs {format_number_custom(player_data['Deaths Needed'])} more)")
-
-                        field_value = "\n".join(field_value_parts)
-
-                        embed.add_field(
-                            name=f"{player_data['Governor Name']} (ID: {player_data['Governor ID']})",
-                            value=field_value,
-                            inline=False
-                        )
-
-                    total_pages = (len(not_completed_players_data) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-                    embed.set_footer(text=f"Page {len(all_req_embeds) + 1}/{total_pages}")
-                    all_req_embeds.append(embed)
-
                 view = PaginationView(all_req_embeds)
                 message = await ctx.send(embed=all_req_embeds[0], view=view)
                 view.message = message
@@ -410,15 +823,60 @@ class BotInstance:
                 logging.exception("ERROR: An unexpected error occurred in !req command.") # ИСПОЛЬЗУЕМ commands_logger
                 await ctx.send(f"An unexpected error occurred while processing the !req command: {str(e)}")
 
-        @self.bot.command(name='top', help='Displays top players by DKP. Usage: !top')
-        async def top(ctx):
-            logging.debug("top: Викликано команду !top.")
+        @self.bot.command(name='genreq',
+                          help='Regenerates kvk_requirements.xlsx from the power at KVK start with the tiers of '
+                               f'{REQUIREMENTS_CONFIG_FILE} (administrators only). Usage: !genreq')
+        @commands.has_permissions(administrator=True)
+        async def genreq(ctx):
+            logging.debug(f"genreq: Command called by {ctx.author}.")
+            try:
+                tiers = RequirementTiers.load()
+            except RequirementsConfigError as e:
+                await ctx.send(f"Error: {REQUIREMENTS_CONFIG_FILE} cannot be used: {e}")
+                return
+            try:
+                df_requirements, backup_path = await self.compute.run('genreq', generate_requirements_file, tiers)
+            except Exception as e:
+                logging.exception("ERROR: An unexpected error occurred in !genreq command.")
+                await ctx.send(f"An error occurred while generating the requirements: {str(e)}")
+                return
+
+            # Recalculate right away: the watcher only reports a file once it has stayed the same for two polls.
+            # Priming it with the new workbook keeps the next poll from recalculating the results again.
+            self.watcher.prime([get_overall_input_files()['requirements']])
+            try:
+                prepared, report = await self._calculate_overall()
+            except Exception as e:
+                logging.exception("ERROR: Recalculating the results after !genreq failed.")
+                await ctx.send(f"Requirements regenerated, but recalculating the results failed: {str(e)}")
+                return
+            if prepared.df.empty:
+                logger.warning("Results recalculated after !genreq are empty, keeping the previous data.")
+            else:
+                self._set_frame(OVERALL_KEY, prepared)
+                self.validation_report = report
+            backup_note = f" The previous workbook is kept as `{os.path.basename(backup_path)}`." if backup_path else ""
+            await ctx.send(f"Requirements of {len(df_requirements)} governors regenerated "
+                           f"({tiers.mode}, {len(tiers.powers)} tiers).{backup_note}")
+            logging.info(f"genreq: Regenerated the requirements of {len(df_requirements)} governors.")
+
+        @self.bot.command(name='top',
+                          help='Displays top players by DKP, or by another metric '
+                               f'({", ".join(LEADERBOARD_METRICS)}). Usage: !top [metric]')
+        async def top(ctx, metric: str = 'dkp'):
+            logging.debug(f"top: Викликано команду !top ({metric}).")
             try:
                 df = self.result_df
                 if df.empty:
                     await ctx.send("Error: Data not loaded. Please ensure data files are present and bot restarted.")
                     return
 
+                leaderboard = self.leaderboards.get(OVERALL_KEY)
+                metric_name = resolve_metric(metric)
+                if metric_name is None or metric_name not in leaderboard.metrics:
+                    await ctx.send(f"Unknown metric '{metric}'. Available metrics: {', '.join(leaderboard.metrics)}.")
+                    return
+
                 # Перевірка наявності стовпців для !top
                 required_cols_top = ['DKP', 'Deads Change', 'Kills Change', 'Tier 4 Kills_after', 'Tier 4 Kills_before',
                                      'Tier 5 Kills_after', 'Tier 5 Kills_before', 'Governor Name']
@@ -429,56 +887,15 @@ class BotInstance:
                     await ctx.send(f"An error occurred: {error_msg}. Please check data integrity.")
                     return
 
-                # Конвертація DKP до числового типу (як було раніше)
-                df.loc[:, 'DKP'] = pd.to_numeric(df['DKP'], errors='coerce').fillna(0)
-
-                result_sorted = df.sort_values(by='DKP', ascending=False)
+                # Pages are slices of the leaderboard built when the data was loaded, nothing is sorted here
+                all_top_embeds = self._cached_pages(f'top:{metric_name}', OVERALL_KEY, df,
+                                                    lambda df: self._build_top_pages(df, leaderboard, metric_name))
 
-                if result_sorted.empty:
+                if not all_top_embeds:
                     await ctx.send("No players found to display in top list.")
                     logging.info("top: Не знайдено гравців для відображення у списку TOP.")
                     return
 
-                all_top_embeds = []
-                for i in range(0, len(result_sorted), ITEMS_PER_PAGE):
-                    current_page_players = result_sorted.iloc[i:i + ITEMS_PER_PAGE]
-
-                    embed = discord.Embed(
-                        title="🏆 Top Players (KVK Gains)",
-                        color=discord.Color.gold()
-                    )
-
-                    start_rank = i
-
-                    for local_index, row in current_page_players.iterrows():
-                        current_rank = start_rank + current_page_players.index.get_loc(row.name) + 1
-
-                        field_name = f"#{current_rank}. {row['Governor Name']}"
-
-                        # Ця частина залишена як було, щоб уникнути помилки, що виникла
-                        # Якщо тут виникне помилка, ми знаємо, що потрібно буде перевірити
-                        # попередню обробку цих колонок або перевірити, чи вони завжди є числами.
-                        # За замовчуванням, вважаємо, що вони вже були оброблені або не містять NaN.
-                        t4_kills_gained = row['Tier 4 Kills_after'] - row['Tier 4 Kills_before']
-                        t5_kills_gained = row['Tier 5 Kills_after'] - row['Tier 5 Kills_before']
-
-                        field_value = (
-                            f"🏅 DKP: {format_number_custom(row['DKP'])}\n"
-                            f"💀 Deaths Gained: {format_number_custom(row['Deads Change'])}\n"
-                            f"⚔️ Kill Points Gained: {format_number_custom(row['Kills Change'])}\n"
-                            f"T4 Kills Gained: {format_number_custom(t4_kills_gained)}\n"
-                            f"T5 Kills Gained: {format_number_custom(t5_kills_gained)}"
-                        )
-                        embed.add_field(
-                            name=field_name,
-                            value=field_value,
-                            inline=False
-                        )
-
-                    total_pages = (len(result_sorted) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-                    embed.set_footer(text=f"Page {len(all_top_embeds) + 1}/{total_pages}")
-                    all_top_embeds.append(embed)
-
                 view = PaginationView(all_top_embeds)
                 message = await ctx.send(embed=all_top_embeds[0], view=view)
                 view.message = message
@@ -497,13 +914,13 @@ class BotInstance:
                 return
 
             player_id = str(player_id).strip()
-            player_data = df_period[df_period['Governor ID'] == player_id]
+            position = self.governor_indexes[normalize_data_key(period_name)].position(player_id)
 
-            if player_data.empty:
+            if position is None:
                 await ctx.send(f"Player with ID: {player_id} not found for period `{period_name}`.")
                 return
 
-            player = player_data.iloc[0]
+            player = df_period.iloc[position]
 
             p_stats = {
                 'governor_name': player.get('Governor Name', 'N/A'),
@@ -547,10 +964,17 @@ class BotInstance:
             await ctx.send(embed=embed)
             logging.info(f"pstat: Sent stats for period {period_name}, ID: {player_id}")
 
-        @self.bot.command(name='ptop', help='Displays top players by DKP for a specific period. '
-                                            'Usage: !ptop <period_name>')
-        async def ptop(ctx, period_name: str):
-            logging.debug(f"ptop: Command called for period {period_name}.")
+        @self.bot.command(name='ptop',
+                          help='Displays top players by DKP, or by another metric '
+                               f'({", ".join(LEADERBOARD_METRICS)}), for a specific period. '
+                               'Usage: !ptop <period_name> [metric]')
+        async def ptop(ctx, period_name: str, metric: str = 'dkp'):
+            logging.debug(f"ptop: Command called for period {period_name} ({metric}).")
+
+            metric_name = resolve_metric(metric)
+            if metric_name is None:
+                await ctx.send(f"Unknown metric '{metric}'. Available metrics: {', '.join(LEADERBOARD_METRICS)}.")
+                return
 
             df_period = await self.get_period_df(period_name)  # get_period_df now handles messages
             if df_period is None:
@@ -565,62 +989,155 @@ class BotInstance:
                         f"Error: Column '{col}' not found in data for period '{period_name}'. Ensure 'calculator.py' is updated and calculates all necessary metrics for periods.")
                     return
 
-            df_period.loc[:, 'DKP'] = pd.to_numeric(df_period['DKP'], errors='coerce').fillna(0)
-
-            # Sort by DKP for the period
-            sorted_df = df_period.sort_values(by='DKP', ascending=False)
-
-            messages = []
+            data_key = normalize_data_key(period_name)
+            leaderboard = self.leaderboards[data_key]
+            if metric_name not in leaderboard.metrics:
+                await ctx.send(f"Metric '{metric}' is not available for period '{period_name}'. "
+                               f"Available metrics: {', '.join(leaderboard.metrics)}.")
+                return
 
-            for index, player in sorted_df.iterrows():
-                # Only include players with DKP > 0 for ptop
-                if player['DKP'] <= 0:
-                    continue
+            # Pages are slices of the leaderboard built when the period was loaded, nothing is sorted here
+            embeds = self._cached_pages(f'ptop:{metric_name}', data_key, df_period,
+                                        lambda df: self._build_ptop_pages(df, data_key, leaderboard, metric_name))
 
-                dkp = format_number_custom(player.get('DKP', 0))
-                deads_gained = format_number_custom(player.get('Deads Change', 0))
-                kills_gained = format_number_custom(player.get('Kills Change', 0))
-                t4_kills_gained = format_number_custom(player.get('Tier 4 Kills Change', 0))
-                t5_kills_gained = format_number_custom(player.get('Tier 5 Kills Change', 0))
+            if not embeds:
+                await ctx.send(f"No significant {METRIC_LABELS[metric_name]} data found for period '{period_name}'.")
+                return
 
-                msg = (
-                    f"**#{int(player['Rank'])}. {player['Governor Name']}** (ID: {player['Governor ID']})\n"
-                    f"  🏅 DKP: {dkp}\n"
-                    f"  💀 Deaths Gained: {deads_gained}\n"
-                    f"  ⚔️ Kill Points Gained: {kills_gained}\n"
-                    f"  T4 Kills Gained: {t4_kills_gained}\n"
-                    f"  T5 Kills Gained: {t5_kills_gained}"
-                )
-                messages.append(msg)
+            view = PaginationView(embeds)
+            message = await ctx.send(embed=embeds[0], view=view)
+            view.message = message
+            logging.info(f"ptop: Sent {len(embeds)} pages of top players for period {period_name}.")
 
-                # Limit to top 50 entries to avoid overly long output
-                #if len(messages) >= 50:
-                   # break
+        @self.bot.command(name='results',
+                          help='Sends the overall KVK results as a file '
+                               f'({", ".join(EXPORT_FORMATS)}). Usage: !results [format=xlsx]')
+        async def results(ctx, fmt: str = 'xlsx'):
+            fmt = fmt.strip().lower().lstrip('.')
+            try:
+                check_format(fmt)
+            except ValueError as e:
+                await ctx.send(f"Error: {e}")
+                return
+            if self.result_df.empty:
+                await ctx.send("Error: Data not loaded. Please ensure data files are present and bot restarted.")
+                return
+            try:
+                # Exports run in the background after each calculation; wait for the pending one if needed
+                path = await asyncio.wrap_future(results_exporter.get(fmt))
+            except Exception as e:
+                logging.exception("ERROR: An unexpected error occurred in !results command.")
+                await ctx.send(f"An error occurred while exporting the results: {str(e)}")
+                return
+            await ctx.send(file=discord.File(path, filename=os.path.basename(path)))
+            logging.info(f"results: Sent {os.path.basename(path)}.")
+
+        @self.bot.command(name='validation', aliases=['validate'],
+                          help='Shows the problems found in the snapshots of the latest calculation: duplicate IDs, '
+                               'governors dropped by the merges, negative changes and outliers. Usage: !validation')
+        async def validation(ctx):
+            report = self.validation_report
+            if report is None:
+                await ctx.send("Error: Data not loaded yet, no validation report is available.")
+                return
+            embed = self._build_validation_embed(report)
+            if report.issue_count == 0:
+                await ctx.send(embed=embed)
+                return
+            workbook = io.BytesIO()
+            report.write_workbook(workbook)
+            workbook.seek(0)
+            await ctx.send(embed=embed, file=discord.File(workbook, filename="validation.xlsx"))
+            logging.info(f"validation: Sent the validation report ({report.issue_count} issues).")
+
+        @self.bot.command(name='whatif',
+                          help='Compares the DKP leaderboard with other scoring formulas: the variants of '
+                               'kvk_scoring.json, one of them by name, or a typed formula over deads, t4, t5, '
+                               'kill_points, power and power_loss (the overall results have no T1-T3 kills). '
+                               'Usage: !whatif [formula], e.g. !whatif 20*deads + 10*t5 + 3*t4')
+        async def whatif(ctx, *, formula: str = None):
+            logging.debug(f"whatif: Command called ({formula}).")
+            df = self.result_df
+            if df.empty:
+                await ctx.send("Error: Data not loaded. Please ensure data files are present and bot restarted.")
+                return
 
-            if not messages:
-                await ctx.send(f"No significant DKP data found for period '{period_name}'.")
+            scoring = self.registry.current.scoring
+            if formula is not None and formula.strip() == DKP_FORMULA_NAME:
+                await ctx.send(f"`{DKP_FORMULA_NAME}` is the formula every variant is compared with. "
+                               f"Name a variant or type a formula, e.g. `!whatif 20*deads + 10*t5 + 3*t4`.")
                 return
+            if formula is None:
+                variants = [name for name in scoring.formulas if name != DKP_FORMULA_NAME]
+                if not variants:
+                    await ctx.send("No scoring variants are configured in kvk_scoring.json. "
+                                   "Type a formula instead, e.g. `!whatif 20*deads + 10*t5 + 3*t4`.")
+                    return
+            elif formula.strip() in scoring.formulas:
+                variants = [formula.strip()]
+            else:
+                try:
+                    # The typed formula is compiled next to the KVK's formulas, which are reused as compiled
+                    scoring = ScoringEngine({**scoring.formulas, WHATIF_FORMULA_NAME: formula})
+                except ScoringFormulaError as e:
+                    await ctx.send(f"Invalid formula: {e}")
+                    return
+                variants = [WHATIF_FORMULA_NAME]
+
+            # Formulas whose terms have no change column in the results would rank with those terms as 0
+            unavailable = {name: unavailable_metrics(df, scoring.formulas[name])
+                           for name in [DKP_FORMULA_NAME] + variants}
+            unavailable = {name: metrics for name, metrics in unavailable.items() if metrics}
+            if unavailable:
+                message = "the overall results have no changes of " + "; ".join(
+                    f"{', '.join(metrics)} (used by `{name}`)" for name, metrics in unavailable.items()) + "."
+                variants = [name for name in variants if name not in unavailable]
+                # Without a formula, the configured variants that can be scored are still compared
+                if formula is not None or DKP_FORMULA_NAME in unavailable or not variants:
+                    await ctx.send(f"Cannot compare: {message}")
+                    return
+                await ctx.send(f"Skipping {', '.join(f'`{name}`' for name in unavailable)}: {message}")
 
-            embeds = []
-            for i in range(0, len(messages), ITEMS_PER_PAGE):
-                chunk = messages[i:i + ITEMS_PER_PAGE]
-                description = "\n".join(chunk)
-                embed = create_embed(
-                    title=f"Top Players by DKP for {period_name.capitalize()} Period",
-                    description=description,
-                    color=discord.Color.purple()
-                )
-                total_pages = (len(messages) + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
-                embed.set_footer(text=f"Page {len(embeds) + 1}/{total_pages}")
-                embeds.append(embed)
+            try:
+                # All formulas are scored and ranked together in a worker thread; the key holds the formulas
+                # themselves, so a computation made with an edited kvk_scoring.json is never shared with an older one
+                comparison, workbook = await self.compute.run(
+                    ('whatif', self.data_generations.get(OVERALL_KEY, 0), scoring.signature, tuple(variants)),
+                    self._build_whatif_report, df, scoring, variants)
+            except Exception as e:
+                logging.exception("ERROR: An unexpected error occurred in !whatif command.")
+                await ctx.send(f"An error occurred while processing the !whatif command: {str(e)}")
+                return
 
-            if embeds:
-                view = PaginationView(embeds)
-                message = await ctx.send(embed=embeds[0], view=view)
-                view.message = message
-                logging.info(f"ptop: Sent {len(embeds)} pages of top players for period {period_name}.")
-            else:
-                await ctx.send(f"Could not form top list for period '{period_name}'.")
+            embeds = self._build_whatif_embeds(comparison)
+            if not embeds:
+                await ctx.send("Nothing to compare: no scoring variant differs from the DKP formula.")
+                return
+            view = PaginationView(embeds)
+            message = await ctx.send(embed=embeds[0], view=view,
+                                     file=discord.File(io.BytesIO(workbook), filename="whatif.xlsx"))
+            view.message = message
+            logging.info(f"whatif: Sent the comparison of {variants} with the DKP formula.")
+
+        @self.bot.command(name='kvks', help='Lists the known KVKs and the period names to use with !ptop, !pstat '
+                                            'and !pkd. Usage: !kvks')
+        async def kvks(ctx):
+            embed = create_embed(
+                title="🗺️ KVKs and Periods",
+                description="✅ - period data available, ⏳ - battle not started yet, "
+                            "➖ - no snapshot files configured",
+                color=discord.Color.blue()
+            )
+            for kvk in self.registry.kvks.values():
+                periods = [f"{'➖' if period.start_file is None else '✅' if period.has_snapshots else '⏳'} "
+                           f"`{period.data_key}`" for period in kvk.periods.values()]
+                embed.add_field(name=kvk.name, value="\n".join(periods) or "No periods.", inline=False)
+            cache_stats = self.period_dataframes.stats()
+            embed.set_footer(text=f"Loaded period frames: {cache_stats['frames']} "
+                                  f"({cache_stats['bytes'] / 1024 / 1024:.1f}/{cache_stats['max_bytes'] / 1024 / 1024:.0f} MB), "
+                                  f"hits {cache_stats['hits']}, misses {cache_stats['misses']}, "
+                                  f"evictions {cache_stats['evictions']}")
+            await ctx.send(embed=embed)
 
         @self.bot.command(name='pkd', help='Displays kingdom K/D statistics for a specific period. '
                                            'Usage: !pkd <period_name>')
@@ -637,24 +1154,8 @@ class BotInstance:
                     await ctx.send(f"Error: Column '{col}' not found in period data for '{period_name}'. Ensure 'calculator.py' calculates all necessary period metrics.")
                     return
 
-            for col in required_cols_for_pkd:
-                df_period.loc[:, col] = pd.to_numeric(df_period[col], errors='coerce').fillna(0)
-
-
-            total_kills_change_period = df_period['Kills Change'].sum()
-            total_deads_change_period = df_period['Deads Change'].sum()
-            total_power_change_period = df_period['Power Change'].sum()
-            current_total_power_period = df_period['Power_after'].sum()
-
-            embed = create_embed(
-                title=f"📊 Kingdom Overview (Period: {period_name.upper()})",
-                description="",
-                color=discord.Color.blue()
-            )
-            embed.add_field(name="⚔️ Total Kills Gained:", value=format_number_custom(total_kills_change_period), inline=False)
-            embed.add_field(name="💀 Total Deaths Gained:", value=format_number_custom(total_deads_change_period), inline=False)
-            embed.add_field(name="💪 Change in Total Power:", value=format_number_custom(total_power_change_period), inline=False)
-            embed.add_field(name="⚡ Current Total Power:", value=format_number_custom(current_total_power_period), inline=False)
+            embed = self._build_summary_embed(self.kingdom_summaries[normalize_data_key(period_name)],
+                                              f"📊 Kingdom Overview (Period: {period_name.upper()})")
 
             await ctx.send(embed=embed)
             logging.info(f"pkd: Sent K/D statistics for period {period_name}.")
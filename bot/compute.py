@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable
+
+# Configure logging for the background computation helpers
+logger = logging.getLogger('bot.compute')
+
+# Worker threads for workbook parsing and statistics calculation
+DEFAULT_MAX_WORKERS = 2
+
+# Event loop lag monitor settings (in seconds)
+LAG_CHECK_INTERVAL = 0.5
+LAG_WARNING_THRESHOLD = 0.1
+
+
+class CoalescingExecutor:
+    """
+    Runs blocking calculations in a worker pool instead of on the Discord event loop.
+    Calls made with the same key while a calculation is still running share its result,
+    so ten users asking for the same period at once trigger a single computation.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kvk-calc')
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    @staticmethod
+    def _timed_call(key: Hashable, func: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            logger.info(f"Computation '{key}' finished in {time.perf_counter() - started:.2f}s in a worker thread.")
+
+    async def run(self, key: Hashable, func: Callable, *args):
+        """Runs func(*args) in the worker pool, or joins the computation already running for key."""
+        future = self._in_flight.get(key)
+        if future is not None:
+            logger.debug(f"Joining computation '{key}' that is already in progress.")
+        else:
+            dispatch_started = time.perf_counter()
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._timed_call, key, func, *args)
+            self._in_flight[key] = future
+            # Remove the entry once the computation ends, whichever waiter is still around
+            future.add_done_callback(lambda done, k=key: self._in_flight.pop(k, None)
+                                     if self._in_flight.get(k) is done else None)
+            logger.debug(f"Computation '{key}' dispatched; event loop blocked for "
+                         f"{(time.perf_counter() - dispatch_started) * 1000:.2f} ms.")
+        # shield() keeps the shared computation alive if one of the waiting commands is cancelled
+        return await asyncio.shield(future)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def monitor_loop_lag(interval: float = LAG_CHECK_INTERVAL, threshold: float = LAG_WARNING_THRESHOLD):
+    """Logs how long the event loop was blocked whenever a wake-up arrives later than the threshold."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected_wakeup = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = loop.time() - expected_wakeup
+        if lag > threshold:
+            logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms.")
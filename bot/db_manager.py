@@ -1,8 +1,16 @@
 import sqlite3
 import os
 import logging
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import repeat
+import numpy as np
 import pandas as pd
 
+from data_processing.kvk_registry import KvkConfig, KvkConfigError
+from data_processing.schema import IMPORT_SCHEMA
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('db_manager')
@@ -10,22 +18,96 @@ logger = logging.getLogger('db_manager')
 # Путь к файлу базы данных.
 # PROJECT_ROOT теперь указывает на директорию 'kd1662'.
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-DB_FILE = os.path.join(PROJECT_ROOT, 'data', 'kvk_data.db')
+# Переменная окружения KVK_DB_FILE позволяет указать другой файл (например, для бенчмарков)
+DB_FILE = os.getenv('KVK_DB_FILE', os.path.join(PROJECT_ROOT, 'data', 'kvk_data.db'))
+
+# Размер кэша подготовленных выражений на одно соединение
+CACHED_STATEMENTS = 256
+# Объём файла базы, отображаемый в память (mmap), в байтах
+MMAP_SIZE = 256 * 1024 * 1024
+# Размер кэша страниц (в КиБ, отрицательное значение) обычный и на время массового импорта
+DEFAULT_CACHE_SIZE = -2000
+BULK_CACHE_SIZE = -65536
+
+# У каждого потока своё постоянное соединение (sqlite3 не разрешает делить соединение между потоками)
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+# Схема проверяется один раз за процесс, при первом подключении к базе
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def _open_connection():
+    conn = sqlite3.connect(DB_FILE, cached_statements=CACHED_STATEMENTS)
+    conn.row_factory = sqlite3.Row # Позволяет получать строки как объекты с доступом по имени столбца
+    # WAL позволяет читать во время записи, NORMAL безопасен в режиме WAL и не делает fsync на каждый коммит
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
 
 def get_db_connection():
-    """Устанавливает соединение с базой данных."""
-    try:
-        conn = sqlite3.connect(DB_FILE)
-        conn.row_factory = sqlite3.Row # Позволяет получать строки как объекты с доступом по имени столбца
-        logger.info(f"Успешно подключено к базе данных: {DB_FILE}")
+    """
+    Возвращает постоянное соединение с базой данных для текущего потока.
+    Соединение создаётся один раз и переиспользуется всеми запросами этого потока,
+    вместе с его кэшем подготовленных выражений и курсором.
+    """
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
         return conn
+    try:
+        conn = _open_connection()
     except sqlite3.Error as e:
         logger.error(f"Ошибка подключения к базе данных: {e}")
         return None
+    _local.conn = conn
+    _local.cursor = conn.cursor()
+    with _connections_lock:
+        _connections.append(conn)
+    logger.info(f"Успешно подключено к базе данных: {DB_FILE} (поток {threading.current_thread().name})")
+    _ensure_schema(conn)
+    return conn
 
-def create_tables():
-    """Создает необходимые таблицы в базе данных, если они не существуют."""
-    conn = get_db_connection()
+
+def _ensure_schema(conn):
+    """Создаёт таблицы и обновляет схему при первом подключении процесса, до первого запроса чтения."""
+    global _schema_ready
+    with _schema_lock:
+        if not _schema_ready:
+            _schema_ready = create_tables(conn)
+
+
+def get_db_cursor():
+    """Возвращает переиспользуемый курсор соединения текущего потока (или None, если подключиться не удалось)."""
+    if get_db_connection() is None:
+        return None
+    return _local.cursor
+
+
+def close_all_connections():
+    """Закрывает все соединения пула (например, при остановке бота)."""
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _connections.clear()
+    # Соединение текущего потока закрыто, следующий вызов откроет новое
+    _local.__dict__.clear()
+
+
+def create_tables(conn=None) -> bool:
+    """
+    Создает необходимые таблицы в базе данных, если они не существуют, и обновляет схему.
+    Вызывается автоматически при первом подключении процесса (см. get_db_connection), а не при загрузке
+    модуля: иначе каждый процесс ProcessPoolExecutor, импортирующий модуль на платформах со spawn,
+    открывал бы базу. Возвращает True, если схема проверена/создана.
+    """
+    conn = conn or get_db_connection()
     if conn:
         try:
             cursor = conn.cursor()
@@ -63,61 +145,204 @@ def create_tables():
                 )
             ''')
 
+            # Таблица рангов игроков по каждой метрике, заполняется при импорте (см. _materialize_ranks)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS kvk_ranks (
+                    kvk_id TEXT NOT NULL,
+                    period_key TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    player_id INTEGER NOT NULL,
+                    rank INTEGER NOT NULL,
+                    PRIMARY KEY (kvk_id, period_key, metric, player_id)
+                ) WITHOUT ROWID
+            ''')
+
+            _migrate_schema(cursor)
+
             conn.commit()
             logger.info("Таблицы базы данных успешно проверены/созданы.")
+            return True
         except sqlite3.Error as e:
             logger.error(f"Ошибка при создании таблиц: {e}")
-        finally:
-            conn.close()
+            conn.rollback()
+    return False
 
-def import_data_from_excel(file_path: str, kvk_name: str, period_key: str):
+def _migrate_schema(cursor):
     """
-    Импортирует данные из Excel-файла в базу данных.
-    Принимает kvk_name (название KVK) вместо kvk_number.
+    Обновляет схему существующей базы до SCHEMA_VERSION (номер версии хранится в PRAGMA user_version).
+    Версия 2: покрывающие индексы (kvk_id, period_key, <метрика>) для топов и таблица рангов kvk_ranks.
     """
+    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    for metric in ALLOWED_METRICS:
+        # Индекс содержит все столбцы запроса топа, поэтому он выполняется без чтения самой таблицы
+        cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_kvk_data_{metric}
+            ON kvk_data (kvk_id, period_key, {metric}, player_name, alliance_tag)
+        ''')
+    # Ранги для данных, импортированных до появления таблицы рангов
+    _materialize_ranks(cursor)
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    logger.info(f"Схема базы данных обновлена с версии {version} до {SCHEMA_VERSION}.")
+
+def _materialize_ranks(cursor, kvk_name: str = None, period_key: str = None):
+    """
+    Пересчитывает ранги игроков по всем метрикам с помощью RANK() OVER для одного периода KVK
+    (или для всей базы, если kvk_name не указан). Ранг совпадает с прежним расчётом:
+    1 + количество игроков периода с большим значением метрики.
+    """
+    where, args = ("WHERE kvk_id = ? AND period_key = ?", (kvk_name, period_key)) if kvk_name is not None else ("", ())
+    cursor.execute(f"DELETE FROM kvk_ranks {where}", args)
+    for metric in ALLOWED_METRICS:
+        cursor.execute(f'''
+            INSERT INTO kvk_ranks (kvk_id, period_key, metric, player_id, rank)
+            SELECT kvk_id, period_key, '{metric}', player_id,
+                   RANK() OVER (PARTITION BY kvk_id, period_key ORDER BY {metric} DESC)
+            FROM kvk_data {where}
+        ''', args)
+
+# Текущая версия схемы базы данных (PRAGMA user_version)
+SCHEMA_VERSION = 2
+
+# Тексты запросов собраны в константы: одинаковый текст запроса берётся из кэша
+# подготовленных выражений соединения и не компилируется повторно
+INSERT_PERIOD_SQL = "INSERT OR IGNORE INTO kvk_periods (kvk_id, period_key, period_name) VALUES (?, ?, ?)"
+INSERT_KVK_DATA_SQL = '''
+    INSERT OR REPLACE INTO kvk_data (
+        kvk_id, period_key, player_id, player_name, alliance_tag,
+        kills, death, resource_gathered, alliance_help,
+        ruins_captured, pass_occupied, kill_points
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SELECT_PLAYER_SQL = '''
+    SELECT * FROM kvk_data
+    WHERE kvk_id = ? AND period_key = ? AND player_id = ?
+'''
+SELECT_PERIOD_PLAYERS_SQL = '''
+    SELECT * FROM kvk_data
+    WHERE kvk_id = ? AND period_key = ?
+'''
+SELECT_PLAYER_ALL_PERIODS_SQL = '''
+    SELECT period_key, kills, death, resource_gathered, alliance_help,
+           ruins_captured, pass_occupied, kill_points
+    FROM kvk_data
+    WHERE kvk_id = ? AND player_id = ?
+    ORDER BY period_key
+'''
+SELECT_KVK_NAMES_SQL = "SELECT DISTINCT kvk_id FROM kvk_data ORDER BY kvk_id"
+SELECT_KVK_PERIODS_SQL = "SELECT period_key, period_name FROM kvk_periods WHERE kvk_id = ? ORDER BY period_key"
+
+# Защита от SQL-инъекций: метрика подставляется в текст запроса только из этого списка
+ALLOWED_METRICS = ['kills', 'death', 'resource_gathered', 'alliance_help',
+                   'ruins_captured', 'pass_occupied', 'kill_points']
+# Тексты запросов по метрикам строятся один раз, а не при каждом вызове
+TOP_PLAYERS_SQL = {metric: f'''
+    SELECT player_name, alliance_tag, {metric}
+    FROM kvk_data
+    WHERE kvk_id = ? AND period_key = ?
+    ORDER BY {metric} DESC
+    LIMIT ?
+''' for metric in ALLOWED_METRICS}
+# Ранг читается из kvk_ranks по первичному ключу
+SELECT_PLAYER_RANK_SQL = '''
+    SELECT rank FROM kvk_ranks
+    WHERE kvk_id = ? AND period_key = ? AND metric = ? AND player_id = ?
+'''
+
+# Размер пачки строк для executemany при импорте
+IMPORT_CHUNK_SIZE = 5000
+# Числовые столбцы таблицы kvk_data, заполняемые при импорте (заголовки Excel - см. IMPORT_SCHEMA)
+IMPORT_INT_COLUMNS = ['kills', 'death', 'resource_gathered', 'alliance_help',
+                      'ruins_captured', 'pass_occupied', 'kill_points']
+
+def read_import_arrays(file_path: str) -> dict:
+    """
+    Читает Excel-файл периода и преобразует нужные столбцы в типизированные массивы NumPy
+    (player_id, player_name, alliance_tag и числовые столбцы IMPORT_INT_COLUMNS).
+    Заголовки (русские или английские, без учёта регистра и пробелов) сопоставляются через IMPORT_SCHEMA.
+    Пустые и нечисловые значения становятся 0, строки без ID игрока отбрасываются.
+    Функция не обращается к базе, поэтому её можно выполнять в отдельных процессах.
+    """
+    df = IMPORT_SCHEMA.canonicalize(pd.read_excel(file_path))
+    if 'player_id' not in df.columns:
+        raise KeyError('ID')
+
+    def int_column(name):
+        if name not in df.columns:
+            return np.zeros(len(df), dtype=np.int64)
+        return pd.to_numeric(df[name], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+
+    def text_column(name, default):
+        if name not in df.columns:
+            return np.full(len(df), default, dtype=object)
+        return df[name].fillna(default).astype(str).to_numpy(dtype=object)
+
+    player_ids = pd.to_numeric(df['player_id'], errors='coerce')
+    valid = player_ids.notna().to_numpy()
+    if not valid.all():
+        logger.warning(f"В файле {file_path} пропущено строк без ID игрока: {int((~valid).sum())}")
+
+    arrays = {
+        'player_id': player_ids.fillna(0).to_numpy(dtype=np.int64),
+        'player_name': text_column('player_name', 'Неизвестно'),
+        'alliance_tag': text_column('alliance_tag', ''),
+    }
+    for column in IMPORT_INT_COLUMNS:
+        arrays[column] = int_column(column)
+    return {column: values[valid] for column, values in arrays.items()}
+
+def _insert_import_arrays(cursor, arrays: dict, kvk_name: str, period_key: str):
+    """Передаёт строки в executemany пачками по IMPORT_CHUNK_SIZE, не собирая весь список кортежей в памяти."""
+    columns = ['player_id', 'player_name', 'alliance_tag'] + list(IMPORT_INT_COLUMNS)
+    total = len(arrays['player_id'])
+    for start in range(0, total, IMPORT_CHUNK_SIZE):
+        # tolist() переводит значения NumPy в обычные int/str, которые понимает sqlite3
+        chunk = [arrays[column][start:start + IMPORT_CHUNK_SIZE].tolist() for column in columns]
+        cursor.executemany(INSERT_KVK_DATA_SQL,
+                           zip(repeat(kvk_name), repeat(period_key), *chunk))
+    return total
+
+def _write_import(arrays: dict, kvk_name: str, period_key: str, period_name: str = None) -> int:
+    """Записывает подготовленные массивы одного периода в базу одной транзакцией и возвращает число строк."""
     conn = get_db_connection()
     if not conn:
-        return False
-
+        raise sqlite3.OperationalError("нет соединения с базой данных")
+    cursor = get_db_cursor()
     try:
-        df = pd.read_excel(file_path)
-        cursor = conn.cursor()
-
+        # На время массовой загрузки: без fsync и с увеличенным кэшем страниц.
+        # Внутри try, чтобы finally всегда возвращал соединению пула обычные настройки
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.execute(f"PRAGMA cache_size={BULK_CACHE_SIZE}")
+        cursor.execute("BEGIN")
         # Проверяем и добавляем период, если его нет
-        period_name = period_key # Можно расширить для более красивых названий периодов
-        cursor.execute("INSERT OR IGNORE INTO kvk_periods (kvk_id, period_key, period_name) VALUES (?, ?, ?)",
-                       (kvk_name, period_key, period_name))
-
-        # Подготовка данных для вставки
-        data_to_insert = []
-        for index, row in df.iterrows():
-            # Заменяем NaN на None для корректной вставки в БД
-            data_to_insert.append((
-                kvk_name,
-                period_key,
-                int(row.get('ID', 0)), # Убедимся, что ID - целое число
-                str(row.get('Имя', 'Неизвестно')),
-                str(row.get('Тег Альянса', '')),
-                int(row.get('Убийства', 0)),
-                int(row.get('Смерти', 0)),
-                int(row.get('Собранные Ресурсы', 0)),
-                int(row.get('Помощь Альянса', 0)),
-                int(row.get('Захваченные Руины', 0)),
-                int(row.get('Занятые Проходы', 0)),
-                int(row.get('Очки Убийств', 0))
-            ))
-
+        cursor.execute(INSERT_PERIOD_SQL, (kvk_name, period_key, period_name or period_key))
         # Вставляем данные, заменяя существующие при конфликте (по kvk_id, period_key, player_id)
-        cursor.executemany('''
-            INSERT OR REPLACE INTO kvk_data (
-                kvk_id, period_key, player_id, player_name, alliance_tag,
-                kills, death, resource_gathered, alliance_help,
-                ruins_captured, pass_occupied, kill_points
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', data_to_insert)
-
+        rows = _insert_import_arrays(cursor, arrays, kvk_name, period_key)
+        # Ранги периода пересчитываются в той же транзакции, что и сами данные
+        _materialize_ranks(cursor, kvk_name, period_key)
         conn.commit()
-        logger.info(f"Данные для KVK '{kvk_name}' периода '{period_key}' успешно импортированы из {file_path}.")
+        return rows
+    finally:
+        # Соединение остаётся открытым для следующих запросов, незавершённая транзакция откатывается
+        if conn.in_transaction:
+            conn.rollback()
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size={DEFAULT_CACHE_SIZE}")
+
+def import_data_from_excel(file_path: str, kvk_name: str, period_key: str, period_name: str = None):
+    """
+    Импортирует данные из Excel-файла в базу данных.
+    Принимает kvk_name (название KVK) вместо kvk_number.
+    period_name - отображаемое название периода (по умолчанию совпадает с period_key).
+    """
+    try:
+        started = time.perf_counter()
+        arrays = read_import_arrays(file_path)
+        rows = _write_import(arrays, kvk_name, period_key, period_name)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Данные для KVK '{kvk_name}' периода '{period_key}' успешно импортированы из {file_path}: "
+                    f"{rows} строк за {elapsed:.2f} с ({rows / elapsed if elapsed else 0:.0f} строк/с).")
         return True
     except FileNotFoundError:
         logger.error(f"Файл не найден: {file_path}")
@@ -128,173 +353,160 @@ def import_data_from_excel(file_path: str, kvk_name: str, period_key: str):
     except Exception as e:
         logger.error(f"Ошибка при импорте данных из Excel: {e}")
         return False
-    finally:
-        conn.close()
+
+def import_kvk_directory(kvk_dir: str, workers: int = None):
+    """
+    Импортирует все файлы периодов одного KVK из папки kvk_configs/<название KVK>.
+    Файлы периодов определяются по config.json: <period_key><default_period_file_suffix>,
+    а для периода 'full_kvk' - full_kvk_file. Название KVK совпадает с названием папки.
+    Excel-файлы читаются параллельно в отдельных процессах, запись в базу идёт последовательно
+    (SQLite допускает только одного писателя). Возвращает {period_key: True/False}.
+    """
+    kvk_name = os.path.basename(os.path.normpath(kvk_dir))
+    try:
+        # config.json разбирается и проверяется так же, как в реестре KVK бота
+        kvk = KvkConfig.from_directory(kvk_dir)
+    except KvkConfigError as e:
+        logger.error(f"Не удалось прочитать config.json для KVK '{kvk_name}': {e}")
+        return {}
+
+    files = {}
+    for period_key, period in kvk.periods.items():
+        if os.path.exists(period.stats_file):
+            files[period_key] = period.stats_file
+        else:
+            logger.info(f"Для периода '{period_key}' KVK '{kvk_name}' нет файла {period.stats_file}, пропускаем.")
+
+    results = {}
+    if not files:
+        return results
+    # Рабочие процессы только читают Excel-файлы и базу не открывают: схему проверяет основной процесс
+    # при первом подключении (в _write_import)
+    started = time.perf_counter()
+    total_rows = 0
+    with ProcessPoolExecutor(max_workers=workers or min(len(files), os.cpu_count() or 1)) as executor:
+        futures = {executor.submit(read_import_arrays, file_path): period_key for period_key, file_path in files.items()}
+        for future in as_completed(futures):
+            period_key = futures[future]
+            try:
+                total_rows += _write_import(future.result(), kvk_name, period_key, kvk.periods[period_key].display_name)
+                results[period_key] = True
+            except Exception as e:
+                logger.error(f"Ошибка при импорте периода '{period_key}' KVK '{kvk_name}' из {files[period_key]}: {e}")
+                results[period_key] = False
+    elapsed = time.perf_counter() - started
+    logger.info(f"KVK '{kvk_name}': импортировано периодов {sum(results.values())}/{len(files)}, "
+                f"{total_rows} строк за {elapsed:.2f} с ({total_rows / elapsed if elapsed else 0:.0f} строк/с).")
+    return results
 
 def get_player_data(kvk_name: str, period_key: str, player_id: int = None):
     """
     Получает данные игрока(ов) для указанного KVK и периода.
     Принимает kvk_name (название KVK).
     """
-    conn = get_db_connection()
-    if not conn:
+    cursor = get_db_cursor()
+    if not cursor:
         return []
     try:
-        cursor = conn.cursor()
         if player_id:
-            cursor.execute('''
-                SELECT * FROM kvk_data
-                WHERE kvk_id = ? AND period_key = ? AND player_id = ?
-            ''', (kvk_name, period_key, player_id))
+            cursor.execute(SELECT_PLAYER_SQL, (kvk_name, period_key, player_id))
         else:
-            cursor.execute('''
-                SELECT * FROM kvk_data
-                WHERE kvk_id = ? AND period_key = ?
-            ''', (kvk_name, period_key))
+            cursor.execute(SELECT_PERIOD_PLAYERS_SQL, (kvk_name, period_key))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
     except sqlite3.Error as e:
         logger.error(f"Ошибка при получении данных игрока: {e}")
         return []
-    finally:
-        conn.close()
 
 def get_top_players(kvk_name: str, period_key: str, metric: str, limit: int = 5):
     """
     Получает топ игроков по указанной метрике для данного KVK и периода.
     Принимает kvk_name (название KVK).
     """
-    conn = get_db_connection()
-    if not conn:
+    cursor = get_db_cursor()
+    if not cursor:
         return []
     try:
-        cursor = conn.cursor()
         # Защита от SQL-инъекций: убедимся, что metric - это допустимый столбец
-        allowed_metrics = ['kills', 'death', 'resource_gathered', 'alliance_help',
-                           'ruins_captured', 'pass_occupied', 'kill_points']
-        if metric not in allowed_metrics:
+        if metric not in ALLOWED_METRICS:
             logger.warning(f"Попытка запроса по недопустимой метрике: {metric}")
             return []
 
-        query = f'''
-            SELECT player_name, alliance_tag, {metric}
-            FROM kvk_data
-            WHERE kvk_id = ? AND period_key = ?
-            ORDER BY {metric} DESC
-            LIMIT ?
-        '''
-        cursor.execute(query, (kvk_name, period_key, limit))
+        cursor.execute(TOP_PLAYERS_SQL[metric], (kvk_name, period_key, limit))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
     except sqlite3.Error as e:
         logger.error(f"Ошибка при получении топ игроков: {e}")
         return []
-    finally:
-        conn.close()
 
 def get_player_rank(kvk_name: str, period_key: str, player_id: int, metric: str):
     """
     Получает ранг игрока по указанной метрике для данного KVK и периода.
     Принимает kvk_name (название KVK).
     """
-    conn = get_db_connection()
-    if not conn:
+    cursor = get_db_cursor()
+    if not cursor:
         return None
     try:
-        cursor = conn.cursor()
-        allowed_metrics = ['kills', 'death', 'resource_gathered', 'alliance_help',
-                           'ruins_captured', 'pass_occupied', 'kill_points']
-        if metric not in allowed_metrics:
+        if metric not in ALLOWED_METRICS:
             logger.warning(f"Попытка запроса ранга по недопустимой метрике: {metric}")
             return None
 
-        # Получаем значение метрики для конкретного игрока
-        cursor.execute(f'''
-            SELECT {metric} FROM kvk_data
-            WHERE kvk_id = ? AND period_key = ? AND player_id = ?
-        ''', (kvk_name, period_key, player_id))
-        player_metric_value = cursor.fetchone()
+        # Ранг заранее рассчитан при импорте (RANK() OVER), здесь только поиск по ключу
+        cursor.execute(SELECT_PLAYER_RANK_SQL, (kvk_name, period_key, metric, player_id))
+        row = cursor.fetchone()
 
-        if not player_metric_value:
+        if not row:
             return None # Игрок не найден или нет данных
 
-        player_metric_value = player_metric_value[metric]
-
-        # Считаем количество игроков с метрикой выше или равной нашей
-        cursor.execute(f'''
-            SELECT COUNT(*) + 1 FROM kvk_data
-            WHERE kvk_id = ? AND period_key = ? AND {metric} > ?
-        ''', (kvk_name, period_key, player_metric_value))
-        rank = cursor.fetchone()[0]
-
-        return rank
+        return row['rank']
     except sqlite3.Error as e:
         logger.error(f"Ошибка при получении ранга игрока: {e}")
         return None
-    finally:
-        conn.close()
 
 def get_player_stats_for_all_periods(kvk_name: str, player_id: int):
     """
     Получает статистику игрока по всем периодам для указанного KVK.
     Принимает kvk_name (название KVK).
     """
-    conn = get_db_connection()
-    if not conn:
+    cursor = get_db_cursor()
+    if not cursor:
         return []
     try:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT period_key, kills, death, resource_gathered, alliance_help,
-                   ruins_captured, pass_occupied, kill_points
-            FROM kvk_data
-            WHERE kvk_id = ? AND player_id = ?
-            ORDER BY period_key
-        ''', (kvk_name, player_id))
+        cursor.execute(SELECT_PLAYER_ALL_PERIODS_SQL, (kvk_name, player_id))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
     except sqlite3.Error as e:
         logger.error(f"Ошибка при получении статистики игрока по всем периодам: {e}")
         return []
-    finally:
-        conn.close()
 
 def get_all_kvk_names():
     """
     Получает список всех уникальных названий KVK, присутствующих в базе данных.
     """
-    conn = get_db_connection()
-    if not conn:
+    cursor = get_db_cursor()
+    if not cursor:
         return []
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT DISTINCT kvk_id FROM kvk_data ORDER BY kvk_id")
+        cursor.execute(SELECT_KVK_NAMES_SQL)
         rows = cursor.fetchall()
         return [row['kvk_id'] for row in rows]
     except sqlite3.Error as e:
         logger.error(f"Ошибка при получении списка KVK: {e}")
         return []
-    finally:
-        conn.close()
 
 def get_kvk_periods(kvk_name: str):
     """
     Получает список всех периодов для указанного KVK.
     Принимает kvk_name (название KVK).
     """
-    conn = get_db_connection()
-    if not conn:
+    cursor = get_db_cursor()
+    if not cursor:
         return []
     try:
-        cursor = conn.cursor()
-        cursor.execute("SELECT period_key, period_name FROM kvk_periods WHERE kvk_id = ? ORDER BY period_key", (kvk_name,))
+        cursor.execute(SELECT_KVK_PERIODS_SQL, (kvk_name,))
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
     except sqlite3.Error as e:
         logger.error(f"Ошибка при получении периодов для KVK '{kvk_name}': {e}")
         return []
-    finally:
-        conn.close()
-
-# Вызов создания таблиц при загрузке модуля
-create_tables()
@@ -0,0 +1,66 @@
+import logging
+from typing import Callable, Dict, Hashable, Sequence, Tuple
+
+import discord
+
+# Configure logging for the embed page cache
+logger = logging.getLogger('bot.embed_cache')
+
+
+class LazyPages(Sequence):
+    """
+    Pages of a list command rendered on first access with render(page number), so that opening a long
+    leaderboard only builds the pages that are actually viewed. Rendered pages are kept, and like the
+    pages of EmbedPageCache they are shared between PaginationViews.
+    """
+
+    def __init__(self, count: int, render: Callable[[int], discord.Embed]):
+        self._count = count
+        self._render = render
+        self._rendered: Dict[int, discord.Embed] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, page: int) -> discord.Embed:
+        if page < 0:
+            page += self._count
+        if not 0 <= page < self._count:
+            raise IndexError(page)
+        embed = self._rendered.get(page)
+        if embed is None:
+            embed = self._render(page)
+            self._rendered[page] = embed
+        return embed
+
+
+class EmbedPageCache:
+    """
+    Keeps the paginated embeds of list commands (!top, !ptop, !requirements), so that they are built
+    once per data version instead of on every invocation.
+    Entries are keyed by (command, data key, data generation); the data key is OVERALL_KEY or a period name.
+    The pages are a list, or a LazyPages sequence whose pages are rendered when first viewed.
+    The cached embeds are shared between PaginationViews and must not be modified after they are built.
+    """
+
+    def __init__(self):
+        self._pages: Dict[Tuple[str, Hashable, int], Sequence[discord.Embed]] = {}
+
+    def get_or_build(self, command: str, data_key: Hashable, generation: int,
+                     builder: Callable[[], Sequence[discord.Embed]]) -> Sequence[discord.Embed]:
+        """Returns the cached pages for this data version, building them with builder() on a miss."""
+        cache_key = (command, data_key, generation)
+        pages = self._pages.get(cache_key)
+        if pages is None:
+            pages = builder()
+            self._pages[cache_key] = pages
+            logger.debug(f"Built {len(pages)} pages for '{command}' ({data_key}, generation {generation}).")
+        return pages
+
+    def invalidate(self, data_key: Hashable):
+        """Drops every cached page built from the given frame."""
+        stale = [cache_key for cache_key in self._pages if cache_key[1] == data_key]
+        for cache_key in stale:
+            del self._pages[cache_key]
+        if stale:
+            logger.debug(f"Invalidated {len(stale)} cached page sets for '{data_key}'.")
@@ -0,0 +1,54 @@
+import logging
+import os
+from typing import Iterable, Set
+
+# Configure logging for the file watcher
+logger = logging.getLogger('bot.file_watcher')
+
+
+class SnapshotWatcher:
+    """
+    Detects changes of snapshot workbooks by polling their mtime and size.
+    A change is only reported once the file has stayed the same for two consecutive polls,
+    so a workbook that is still being copied into place is never picked up half-written.
+    """
+
+    def __init__(self):
+        self._known = {}  # path -> signature the data currently in memory was built from
+        self._pending = {}  # path -> new signature seen once, waiting to settle
+
+    @staticmethod
+    def _signature(path: str):
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None  # Missing files have a signature too, so deletions are detected
+        return file_stat.st_mtime_ns, file_stat.st_size
+
+    def prime(self, paths: Iterable[str]):
+        """Records the current state of the given files as the baseline."""
+        for path in paths:
+            self._known[path] = self._signature(path)
+            self._pending.pop(path, None)
+
+    def poll(self, paths: Iterable[str]) -> Set[str]:
+        """Returns the files that changed (and settled) since the previous poll."""
+        changed = set()
+        for path in paths:
+            signature = self._signature(path)
+            if path not in self._known:
+                # First time we see this path: it becomes the baseline, nothing depends on it yet
+                self._known[path] = signature
+                continue
+            if signature == self._known[path]:
+                self._pending.pop(path, None)
+                continue
+            if self._pending.get(path) == signature:
+                del self._pending[path]
+                self._known[path] = signature
+                changed.add(path)
+                logger.info(f"Snapshot file changed: {path}")
+            else:
+                self._pending[path] = signature
+                logger.debug(f"Snapshot file is changing, waiting for it to settle: {path}")
+        return changed
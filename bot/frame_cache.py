@@ -0,0 +1,96 @@
+import logging
+import os
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+import pandas as pd
+
+from data_processing.dtypes import downcast_frame, frame_bytes
+
+# Configure logging for the frame cache
+logger = logging.getLogger('bot.frame_cache')
+
+# Memory budget for the cached period frames, in megabytes (KVK_FRAME_CACHE_MB overrides it)
+DEFAULT_FRAME_CACHE_MB = 256
+
+
+def frame_cache_budget() -> int:
+    """Returns the configured frame cache budget in bytes."""
+    return int(float(os.getenv('KVK_FRAME_CACHE_MB', DEFAULT_FRAME_CACHE_MB)) * 1024 * 1024)
+
+
+class FrameCache:
+    """
+    Period frames keyed by data key, evicted least recently used first once their total deep memory
+    usage (DataFrame.memory_usage(deep=True)) exceeds the byte budget, so that old seasons do not pin RAM.
+    Frames are stored with compact dtypes (see data_processing.dtypes.downcast_frame); read them back from the cache.
+    store() takes a frame that was already downcast and measured (e.g. in a worker thread) as it is.
+    The most recently stored frame is always kept, even if it alone exceeds the budget.
+    on_evict(data_key) is called for every evicted frame, so that structures derived from it can be dropped.
+    get() counts hits and misses; together with evictions they are reported by stats().
+    """
+
+    def __init__(self, max_bytes: int, on_evict: Optional[Callable[[Hashable], None]] = None):
+        self.max_bytes = max_bytes
+        self._on_evict = on_evict
+        self._frames: 'OrderedDict[Hashable, pd.DataFrame]' = OrderedDict()
+        self._sizes = {}
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, data_key) -> bool:
+        return data_key in self._frames
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def __getitem__(self, data_key) -> pd.DataFrame:
+        df = self._frames[data_key]
+        self._frames.move_to_end(data_key)
+        return df
+
+    def get(self, data_key, default=None):
+        if data_key not in self._frames:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return self[data_key]
+
+    def keys(self):
+        return self._frames.keys()
+
+    def __setitem__(self, data_key, df: pd.DataFrame):
+        original_size = frame_bytes(df)
+        df = downcast_frame(df)
+        size = frame_bytes(df)
+        logger.debug(f"Frame '{data_key}' downcast from {original_size / 1024:.0f} KB to {size / 1024:.0f} KB.")
+        self.store(data_key, df, size)
+
+    def store(self, data_key, df: pd.DataFrame, size: int):
+        """Stores a frame that already has compact dtypes, whose frame_bytes() is size, without converting it."""
+        self.pop(data_key)
+        self._frames[data_key] = df
+        self._sizes[data_key] = size
+        self.total_bytes += size
+        while self.total_bytes > self.max_bytes and len(self._frames) > 1:
+            evicted_key = next(iter(self._frames))
+            self.pop(evicted_key)
+            self.evictions += 1
+            logger.info(f"Evicted frame '{evicted_key}' from the frame cache "
+                        f"({self.total_bytes / 1024 / 1024:.1f} of {self.max_bytes / 1024 / 1024:.0f} MB in use).")
+            if self._on_evict is not None:
+                self._on_evict(evicted_key)
+
+    def pop(self, data_key, default=None):
+        df = self._frames.pop(data_key, None)
+        if df is None:
+            return default
+        self.total_bytes -= self._sizes.pop(data_key)
+        return df
+
+    def stats(self) -> dict:
+        """Returns the cache counters and its memory usage."""
+        return {'frames': len(self._frames), 'bytes': self.total_bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
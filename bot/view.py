@@ -2,6 +2,7 @@ import discord.ui
 import discord # Додайте, якщо потрібен discord.Embed або discord.Color
 
 class PaginationView(discord.ui.View):
+    # The embeds may be shared with other views (see bot.embed_cache), so they are only read here
     def __init__(self, embeds: list[discord.Embed], timeout=180):
         super().__init__(timeout=timeout)
         self.embeds = embeds
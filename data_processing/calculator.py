@@ -2,18 +2,76 @@ import pandas as pd
 import numpy as np
 import logging
 import os
+from functools import lru_cache
+
+from data_processing.snapshot_cache import read_snapshot
+from data_processing.dtypes import compact_results_frame
+from data_processing.export import results_exporter
+from data_processing.governor_index import GovernorIndex
+from data_processing.schema import SNAPSHOT_SCHEMA
+from data_processing.period_engine import SnapshotStack, OPTIONAL_PERIOD_METRICS, calculate_all_period_stats, \
+    calculate_stacked_periods
+from data_processing.scoring import DKP_FORMULA_NAME, ScoringEngine, change_column
+from data_processing.kvk_registry import KvkConfig
+from data_processing.timeseries_store import SnapshotTimeSeries
+from data_processing.validation import NON_DECREASING_METRICS, ValidationReport
 
 # Configure logging for the calculator module
 logger = logging.getLogger('data_processing.calculator')
 
+# Canonical snapshot columns (see SNAPSHOT_SCHEMA) renamed per snapshot to avoid conflicts during merging
+START_POWER_COLUMNS = {'Power': 'Power_at_KVK_start'}
+BEFORE_METRICS_COLUMNS = {
+    'Kill Points': 'Kill Points_before', 'Deads': 'Deads_before',
+    'Tier 4 Kills': 'Tier 4 Kills_before', 'Tier 5 Kills': 'Tier 5 Kills_before',
+    'Power': 'Power_before'
+}
+AFTER_METRICS_COLUMNS = {
+    'Kill Points': 'Kill Points_after', 'Deads': 'Deads_after',
+    'Tier 4 Kills': 'Tier 4 Kills_after', 'Tier 5 Kills': 'Tier 5 Kills_after',
+    'Power': 'Power_after', 'Governor Name': 'Governor Name_after', 'Alliance': 'Alliance_after'
+}
+# T1-T3 kills are only read for scoring formulas that use them, if both snapshots have them
+BEFORE_METRICS_COLUMNS.update({metric: f'{metric}_before' for metric in OPTIONAL_PERIOD_METRICS})
+AFTER_METRICS_COLUMNS.update({metric: f'{metric}_after' for metric in OPTIONAL_PERIOD_METRICS})
+
+
+def get_overall_input_files() -> dict:
+    """
+    Returns the full paths of the workbooks read by calculate_stats, keyed by their role.
+    'start_power' is also the master player list used by calculate_period_stats.
+    """
+    project_root = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    return {
+        'start_power': os.path.join(project_root, 'kvk_start_power.xlsx'),
+        'before_metrics': os.path.join(project_root, 'kvk_before_metrics.xlsx'),
+        'after_metrics': os.path.join(project_root, 'kvk_after_metrics.xlsx'),
+        'requirements': os.path.join(project_root, 'kvk_requirements.xlsx'),
+    }
+
 
-def calculate_stats():
+@lru_cache(maxsize=1)
+def _default_scoring() -> ScoringEngine:
+    """The running KVK's scoring formulas, loaded once, for callers that do not pass the registry's engine."""
+    return KvkConfig.current().scoring
+
+
+def calculate_stats(scoring: ScoringEngine = None, report: ValidationReport = None):
     """
     Calculates overall KVK statistics based on initial, intermediate, and final metrics.
     The list of players is strictly filtered by the 'kvk_start_power.xlsx' file.
     Input files for overall KVK stats are expected in the project root directory.
-    The output file is saved in the 'results' subfolder within the project root.
+    The results are exported to the 'results' subfolder within the project root in the background
+    (see data_processing.export.results_exporter); the frame is returned without waiting for the export.
+    DKP is scored with the DKP formula of scoring: the bot passes the engine its KvkRegistry loaded; by default
+    the running KVK's formulas are loaded once (see KvkConfig.current).
+    The snapshots are validated before scoring (duplicate IDs, governors dropped by the merges, negative and
+    outlier changes); pass report to receive the ValidationReport, the summary is logged in any case.
     """
+    if scoring is None:
+        scoring = _default_scoring()
+    if report is None:
+        report = ValidationReport()
     # Get the absolute path to the directory of the current script (calculator.py)
     script_dir = os.path.dirname(os.path.abspath(__file__))
     # Determine the project root directory: assuming 'data_processing' is one level below
@@ -26,14 +84,11 @@ def calculate_stats():
     # --- END DEBUG OUTPUTS ---
 
     # Define paths to input files, which are located in the project root directory
-    start_power_file = os.path.join(project_root, 'kvk_start_power.xlsx')
-    before_metrics_file = os.path.join(project_root, 'kvk_before_metrics.xlsx')
-    after_metrics_file = os.path.join(project_root, 'kvk_after_metrics.xlsx')
-    requirements_file = os.path.join(project_root, 'kvk_requirements.xlsx')  # Optional file
-
-    # Define the path for the output file, which will be saved in the 'results' folder
-    output_file = os.path.join(project_root, 'results/results.xlsx')
-    output_dir = os.path.dirname(output_file)
+    input_files = get_overall_input_files()
+    start_power_file = input_files['start_power']
+    before_metrics_file = input_files['before_metrics']
+    after_metrics_file = input_files['after_metrics']
+    requirements_file = input_files['requirements']  # Optional file
 
     # --- DEBUG OUTPUTS ---
     print(f"DEBUG (calculate_stats): Looking for KVK start power file at: {start_power_file}")
@@ -57,19 +112,19 @@ def calculate_stats():
         return pd.DataFrame()
 
     try:
-        # Load required Excel files
-        df_start_kvk = pd.read_excel(start_power_file)
+        # Load required Excel files (through the columnar snapshot cache)
+        df_start_kvk = read_snapshot(start_power_file)
         logger.info(f"File '{os.path.basename(start_power_file)}' successfully loaded. Shape: {df_start_kvk.shape}")
-        df_before_metrics = pd.read_excel(before_metrics_file)
+        df_before_metrics = read_snapshot(before_metrics_file)
         logger.info(
             f"File '{os.path.basename(before_metrics_file)}' successfully loaded. Shape: {df_before_metrics.shape}")
-        df_after_metrics = pd.read_excel(after_metrics_file)
+        df_after_metrics = read_snapshot(after_metrics_file)
         logger.info(
             f"File '{os.path.basename(after_metrics_file)}' successfully loaded. Shape: {df_after_metrics.shape}")
 
         df_req = pd.DataFrame()  # Initialize requirements DataFrame as empty
         if os.path.exists(requirements_file):
-            df_req = pd.read_excel(requirements_file)
+            df_req = read_snapshot(requirements_file)
             logger.info(
                 f"Optional requirements file '{os.path.basename(requirements_file)}' successfully loaded. Shape: {df_req.shape}")
         else:
@@ -80,10 +135,12 @@ def calculate_stats():
         logger.error(f"Error loading one or more Excel files for overall KVK statistics: {e}")
         return pd.DataFrame()
 
-    # Standardize column names by stripping leading/trailing whitespace
-    for df_item in [df_start_kvk, df_before_metrics, df_after_metrics, df_req]:
-        if not df_item.empty:
-            df_item.columns = [col.strip() for col in df_item.columns]
+    # Resolve English/Russian header variants to canonical names (cached per header layout)
+    df_start_kvk = SNAPSHOT_SCHEMA.canonicalize(df_start_kvk)
+    df_before_metrics = SNAPSHOT_SCHEMA.canonicalize(df_before_metrics)
+    df_after_metrics = SNAPSHOT_SCHEMA.canonicalize(df_after_metrics)
+    if not df_req.empty:
+        df_req = SNAPSHOT_SCHEMA.canonicalize(df_req)
 
     # Ensure 'Governor ID' column is of string type in all DataFrames for accurate merging
     df_start_kvk['Governor ID'] = df_start_kvk['Governor ID'].astype(str)
@@ -91,59 +148,33 @@ def calculate_stats():
     df_after_metrics['Governor ID'] = df_after_metrics['Governor ID'].astype(str)
     if not df_req.empty:
         df_req['Governor ID'] = df_req['Governor ID'].astype(str)
+    # Duplicate IDs would multiply rows in the merges below
+    for path, df_input in ((start_power_file, df_start_kvk), (before_metrics_file, df_before_metrics),
+                           (after_metrics_file, df_after_metrics), (requirements_file, df_req)):
+        if not df_input.empty:
+            report.check_duplicates(os.path.basename(path), df_input['Governor ID'].to_numpy())
 
     logger.debug(
         f"Governor IDs after type conversion: df_start_kvk examples: {df_start_kvk['Governor ID'].head().tolist()}")
 
     # Rename columns for clarity and to avoid conflicts during merging
-    # Include Russian column names and exact names provided by the user
-    df_start_kvk_renamed_cols = {
-        'Power': 'Power_at_KVK_start',
-        'Мощь': 'Power_at_KVK_start'
-    }
-    df_before_metrics_renamed_cols = {
-        'Kill Points': 'Kill Points_before', 'Очки Убийств': 'Kill Points_before',
-        'Dead Troops': 'Deads_before', 'Deaths': 'Deads_before',
-        'Погибшие войска': 'Deads_before', 'Смерти': 'Deads_before',
-        'Deads': 'Deads_before',  # Exact name from user
-        'T4 Kills': 'Tier 4 Kills_before', 'Убийства Т4': 'Tier 4 Kills_before',
-        'Tier 4 Kills': 'Tier 4 Kills_before',  # Exact name from user
-        'T5 Kills': 'Tier 5 Kills_before', 'Убийства Т5': 'Tier 5 Kills_before',
-        'Tier 5 Kills': 'Tier 5 Kills_before',  # Exact name from user
-        'Power': 'Power_before', 'Мощь': 'Power_before'
-    }
-    df_after_metrics_renamed_cols = {
-        'Kill Points': 'Kill Points_after', 'Очки Убийств': 'Kill Points_after',
-        'Dead Troops': 'Deads_after', 'Deaths': 'Deads_after',
-        'Погибшие войска': 'Deads_after', 'Смерти': 'Deads_after',
-        'Deads': 'Deads_after',  # Exact name from user
-        'T4 Kills': 'Tier 4 Kills_after', 'Убийства Т4': 'Tier 4 Kills_after',
-        'Tier 4 Kills': 'Tier 4 Kills_after',  # Exact name from user
-        'T5 Kills': 'Tier 5 Kills_after', 'Убийства Т5': 'Tier 5 Kills_after',
-        'Tier 5 Kills': 'Tier 5 Kills_after',  # Exact name from user
-        'Power': 'Power_after', 'Мощь': 'Power_after',
-        'Governor Name': 'Governor Name_after', 'Имя Губернатора': 'Governor Name_after'
-    }
-
-    # Create mappings, keeping only keys that exist in the DataFrame
-    def create_valid_rename_map(df, rename_dict):
-        return {k: v for k, v in rename_dict.items() if k in df.columns}
-
-    df_start_kvk = df_start_kvk.rename(columns=create_valid_rename_map(df_start_kvk, df_start_kvk_renamed_cols))
-    df_before_metrics = df_before_metrics.rename(
-        columns=create_valid_rename_map(df_before_metrics, df_before_metrics_renamed_cols))
-    df_after_metrics = df_after_metrics.rename(
-        columns=create_valid_rename_map(df_after_metrics, df_after_metrics_renamed_cols))
+    df_start_kvk = df_start_kvk.rename(columns=START_POWER_COLUMNS)
+    df_before_metrics = df_before_metrics.rename(columns=BEFORE_METRICS_COLUMNS)
+    df_after_metrics = df_after_metrics.rename(columns=AFTER_METRICS_COLUMNS)
 
     # Select only the necessary columns from each DataFrame before merging
     # Important: use the new, renamed column names
     df_start_kvk = df_start_kvk[['Governor ID', 'Power_at_KVK_start']]
+    optional_metrics = [metric for metric in OPTIONAL_PERIOD_METRICS
+                        if metric in scoring.dkp.metrics and BEFORE_METRICS_COLUMNS[metric] in df_before_metrics.columns
+                        and AFTER_METRICS_COLUMNS[metric] in df_after_metrics.columns]
     df_before_metrics = df_before_metrics[
         ['Governor ID', 'Kill Points_before', 'Deads_before', 'Tier 4 Kills_before', 'Tier 5 Kills_before',
-         'Power_before']]
+         'Power_before'] + [BEFORE_METRICS_COLUMNS[metric] for metric in optional_metrics]]
     df_after_metrics = df_after_metrics[
         ['Governor ID', 'Governor Name_after', 'Kill Points_after', 'Deads_after', 'Tier 4 Kills_after',
-         'Tier 5 Kills_after', 'Power_after']]
+         'Tier 5 Kills_after', 'Power_after'] + [col for col in ['Alliance_after'] if col in df_after_metrics.columns]
+        + [AFTER_METRICS_COLUMNS[metric] for metric in optional_metrics]]
     if not df_req.empty:
         df_req = df_req[['Governor ID', 'Required Kills', 'Required Deaths']]
 
@@ -154,7 +185,10 @@ def calculate_stats():
 
     # Inner merge with 'before' metrics: keeps only players present in BOTH 'kvk_start_power' AND 'kvk_before_metrics'.
     # Players present in 'kvk_start_power' but missing from 'kvk_before_metrics' are excluded.
+    ids_before_merge = df_final['Governor ID'].to_numpy()
     df_final = pd.merge(df_final, df_before_metrics, on='Governor ID', how='inner')
+    report.record_merge(f"{os.path.basename(start_power_file)} -> {os.path.basename(before_metrics_file)}",
+                        ids_before_merge, df_final['Governor ID'].to_numpy())
     logger.info(f"After inner merge with '{os.path.basename(before_metrics_file)}': {len(df_final)} players remaining.")
     if df_final.empty:
         logger.warning(
@@ -163,7 +197,10 @@ def calculate_stats():
 
     # Inner merge with 'after' metrics: further keeps only players present in the current 'df_final' AND in 'kvk_after_metrics'.
     # Players who were present in previous stages but disappeared by the 'after metrics' snapshot are now excluded.
+    ids_before_merge = df_final['Governor ID'].to_numpy()
     df_final = pd.merge(df_final, df_after_metrics, on='Governor ID', how='inner')
+    report.record_merge(f"{os.path.basename(before_metrics_file)} -> {os.path.basename(after_metrics_file)}",
+                        ids_before_merge, df_final['Governor ID'].to_numpy())
     logger.info(f"After inner merge with '{os.path.basename(after_metrics_file)}': {len(df_final)} players remaining.")
     if df_final.empty:
         logger.warning(
@@ -190,26 +227,48 @@ def calculate_stats():
         'Tier 4 Kills_before', 'Tier 4 Kills_after',
         'Tier 5 Kills_before', 'Tier 5 Kills_after',
         'Required Kills', 'Required Deaths'
-    ]
+    ] + [f'{metric}{suffix}' for metric in optional_metrics for suffix in ('_before', '_after')]
+    missing_cells = {}
     for col in numeric_cols_to_fill:
         if col in df_final.columns:
-            # Convert to numeric type (errors coerce to NaN), then fill NaN with zeros
-            df_final[col] = pd.to_numeric(df_final[col], errors='coerce').fillna(0)
-
-    # Calculate metric changes during the KVK period
-    df_final['Power Change'] = df_final['Power_after'] - df_final['Power_at_KVK_start']
-    df_final['Kills Change'] = df_final['Kill Points_after'] - df_final['Kill Points_before']
-    df_final['Deads Change'] = df_final['Deads_after'] - df_final['Deads_before']
-    df_final['Tier 4 Kills Change'] = df_final['Tier 4 Kills_after'] - df_final['Tier 4 Kills_before']
-    df_final['Tier 5 Kills Change'] = df_final['Tier 5 Kills_after'] - df_final['Tier 5 Kills_before']
+            # Convert to numeric type (errors coerce to NaN), then fill NaN with zeros; the missing cells are
+            # remembered so that validation reports their changes as missing rather than as a jump from 0
+            df_final[col] = pd.to_numeric(df_final[col], errors='coerce')
+            missing_cells[col] = df_final[col].isna().to_numpy()
+            df_final[col] = df_final[col].fillna(0)
+
+    # Calculate metric changes during the KVK period: change column -> (end column, start column)
+    # (T1-T3 changes are only used for scoring and are not part of the output)
+    change_operands = {
+        'Power Change': ('Power_after', 'Power_at_KVK_start'),
+        'Kills Change': ('Kill Points_after', 'Kill Points_before'),
+        'Deads Change': ('Deads_after', 'Deads_before'),
+        'Tier 4 Kills Change': ('Tier 4 Kills_after', 'Tier 4 Kills_before'),
+        'Tier 5 Kills Change': ('Tier 5 Kills_after', 'Tier 5 Kills_before'),
+    }
+    change_operands.update({change_column(metric): (f'{metric}_after', f'{metric}_before')
+                            for metric in optional_metrics})
+    for col, (end_col, start_col) in change_operands.items():
+        df_final[col] = df_final[end_col] - df_final[start_col]
     df_final['Total Kills T4+T5 Change'] = df_final['Tier 4 Kills Change'] + df_final['Tier 5 Kills Change']
 
-    # Calculate DKP (Disciplinary Kill Points) using the specified formula
-    df_final['DKP'] = (
-            (df_final['Deads Change'] * 15) +  # Зміна смертей
-            (df_final['Tier 5 Kills Change'] * 10) +  # Зміна T5 вбивств
-            (df_final['Tier 4 Kills Change'] * 4)  # Зміна T4 вбивств
-    )
+    # Validate the changes before they are scored: counters that went down, implausible jumps and changes
+    # whose start or end value is missing (NaN here, scored with the missing value as 0)
+    def unfilled_change(col: str) -> np.ndarray:
+        end_col, start_col = change_operands[col]
+        return np.where(missing_cells[end_col] | missing_cells[start_col], np.nan,
+                        df_final[col].to_numpy(dtype=np.float64))
+
+    change_columns = ['Power Change'] + [change_column(metric) for metric in NON_DECREASING_METRICS
+                                         if change_column(metric) in df_final.columns]
+    report.check_changes(df_final['Governor ID'].to_numpy(), df_final['Governor Name_after'].to_numpy(),
+                         {col: unfilled_change(col) for col in change_columns},
+                         non_decreasing=[change_column(metric) for metric in NON_DECREASING_METRICS])
+    logger.info(f"Snapshot validation: {report.summary()}")
+
+    # Calculate DKP (Disciplinary Kill Points) with the KVK's compiled DKP formula
+    # (metrics missing from the snapshots are scored as 0, with a warning)
+    df_final['DKP'] = scoring.evaluate_frame(df_final, [DKP_FORMULA_NAME])[DKP_FORMULA_NAME]
 
     # Calculate completion percentages for kill and death requirements
     # Handle division by zero (Required Kills/Deaths = 0) and infinite values
@@ -228,13 +287,16 @@ def calculate_stats():
 
     # Use governor name from 'after' snapshot, fill missing names with 'Unknown Governor'
     df_final['Governor Name'] = df_final['Governor Name_after'].fillna('Unknown Governor')
+    # Alliance tag from the 'after' snapshot, if the snapshots have one (used by the per-alliance rollups)
+    if 'Alliance_after' in df_final.columns:
+        df_final['Alliance'] = df_final['Alliance_after'].fillna('')
 
     # Set matchmaking_power to the power from the 'after' snapshot
     df_final['matchmaking_power'] = df_final['Power_after']
 
     # Define the final set of columns for the output DataFrame
     final_cols = [
-        'Governor ID', 'Governor Name', 'matchmaking_power', 'Power_at_KVK_start',
+        'Governor ID', 'Governor Name', 'Alliance', 'matchmaking_power', 'Power_at_KVK_start',
         'Kill Points_before', 'Kill Points_after', 'Kills Change',
         'Deads_before', 'Deads_after', 'Deads Change',
         'Power_before', 'Power_after', 'Power Change',
@@ -247,13 +309,6 @@ def calculate_stats():
     final_cols = [col for col in final_cols if col in df_final.columns]
     df_final = df_final[final_cols]
 
-    # Convert float columns to integer type if all values are whole numbers
-    for col in df_final.columns:
-        if pd.api.types.is_float_dtype(df_final[col]):
-            # Check that all non-NaN values are equal to their integer conversion
-            if (df_final[col].dropna() == df_final[col].dropna().astype(int)).all():
-                df_final.loc[:, col] = df_final[col].astype(int)
-
     # Ensure Governor ID is of string type for consistent display/usage
     df_final['Governor ID'] = df_final['Governor ID'].astype(str)
 
@@ -262,55 +317,47 @@ def calculate_stats():
         logger.warning("Final DataFrame is empty. No data to save to 'results.xlsx'.")
         return pd.DataFrame()
 
-    # Save the processed data to the specified output file
-    try:
-        # Create the 'results' directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
-        logger.info(f"Ensured output directory '{output_dir}' exists.")
-        df_final.to_excel(output_file, index=False)
-        logger.info(f"Processed data successfully saved to {output_file}")
-    except Exception as e:
-        logger.error(f"Error saving processed data to {output_file}: {e}")
-        return pd.DataFrame()
+    # Export results.xlsx (and the other configured formats) in the background; the frame is handed over
+    # as it is and never modified afterwards, compact_results_frame builds a new one
+    results_exporter.submit(df_final)
+
+    # The workbook keeps full precision; the frame kept in memory by the bot is compacted
+    # (whole-valued counters back to integers, categorical text columns, float32 percentages)
+    df_final = compact_results_frame(df_final)
 
     logger.info("Overall KVK statistics successfully processed.")
     return df_final
 
 
-def calculate_period_stats(start_file_path: str, end_file_path: str):
+def calculate_period_stats(start_file_path: str = None, end_file_path: str = None,
+                           start_time=None, end_time=None, store: SnapshotTimeSeries = None,
+                           scoring: ScoringEngine = None):
     """
     Calculates statistics for a specific period (e.g., zone, altar) between two snapshot files.
     The main player list is strictly determined by 'kvk_start_power.xlsx' from the project root directory.
     Only players present in 'kvk_start_power.xlsx' AND in BOTH start_file_path and end_file_path are included.
     'start_file_path' and 'end_file_path' must be full paths, including the period folder.
+    Instead of two files, a time range (start_time, end_time) can be given: the period is then calculated
+    from the scans recorded in the time-series snapshot store (the default SnapshotTimeSeries if store is None),
+    using every governor's last scan at or before each timestamp; governors must have been scanned by
+    start_time and again after it.
+    DKP is scored with scoring, as in calculate_stats.
+    To calculate several periods, use calculate_all_period_stats, which loads shared snapshots only once.
     """
-    logger.info(
-        f"Starting data processing for period: {os.path.basename(start_file_path)} -> {os.path.basename(end_file_path)}")
-
-    # Get the absolute path to the directory of the current script (calculator.py)
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    # Determine the project root directory where 'kvk_start_power.xlsx' is located
-    project_root = os.path.abspath(os.path.join(script_dir, os.pardir))
+    # Path to the main KVK start power file (located in the project root directory)
+    start_kvk_power_file = get_overall_input_files()['start_power']
 
-    # --- DEBUG OUTPUTS ---
-    print(f"DEBUG (calculate_period_stats): Script directory: {script_dir}")
-    print(f"DEBUG (calculate_period_stats): Project root directory: {project_root}")
-    print(f"DEBUG (calculate_period_stats): Received start_file_path: {start_file_path}")
-    print(f"DEBUG (calculate_period_stats): Received end_file_path: {end_file_path}")
-    # --- END DEBUG OUTPUTS ---
+    if scoring is None:
+        scoring = _default_scoring()
 
-    # Path to the main KVK start power file (located in the project root directory)
-    start_kvk_power_file = os.path.join(project_root, 'kvk_start_power.xlsx')
+    if start_time is not None or end_time is not None:
+        return _calculate_time_range_stats(start_time, end_time, store or SnapshotTimeSeries(), start_kvk_power_file,
+                                           scoring)
 
-    # --- DEBUG OUTPUTS ---
-    print(f"DEBUG (calculate_period_stats): Looking for main KVK power file at: {start_kvk_power_file}")
-    # --- END DEBUG OUTPUTS ---
+    logger.info(
+        f"Starting data processing for period: {os.path.basename(start_file_path)} -> {os.path.basename(end_file_path)}")
 
     # Check for the existence of critical input files for period calculation
-    if not os.path.exists(start_kvk_power_file):
-        logger.error(
-            f"Critical error: KVK start power file '{os.path.basename(start_kvk_power_file)}' not found. Cannot calculate period statistics based on the main player list.")
-        return pd.DataFrame()
     if not os.path.exists(start_file_path):
         logger.error(
             f"Critical error: Period start file '{os.path.basename(start_file_path)}' not found. Cannot calculate period statistics.")
@@ -320,161 +367,57 @@ def calculate_period_stats(start_file_path: str, end_file_path: str):
             f"Critical error: Period end file '{os.path.basename(end_file_path)}' not found. Cannot calculate period statistics.")
         return pd.DataFrame()
 
-    try:
-        # Load the main player list from kvk_start_power.xlsx
-        df_master_players = pd.read_excel(start_kvk_power_file)
-        logger.info(
-            f"File '{os.path.basename(start_kvk_power_file)}' (main player list) successfully loaded for period statistics. Shape: {df_master_players.shape}")
-        # Load period start and end snapshot files
-        df_start = pd.read_excel(start_file_path)
-        logger.info(f"File '{os.path.basename(start_file_path)}' successfully loaded. Shape: {df_start.shape}")
-        df_end = pd.read_excel(end_file_path)
-        logger.info(f"File '{os.path.basename(end_file_path)}' successfully loaded. Shape: {df_end.shape}")
-    except Exception as e:
-        logger.error(f"Error loading Excel files for period statistics or main player list: {e}")
-        return pd.DataFrame()
-
-    # Standardize column names in all loaded DataFrames
-    for df_item in [df_master_players, df_start, df_end]:
-        if not df_item.empty:
-            df_item.columns = [col.strip() for col in df_item.columns]
-
-    # Ensure 'Governor ID' column is of string type in all relevant DataFrames for reliable merging
-    df_master_players['Governor ID'] = df_master_players['Governor ID'].astype(str)
-    df_start['Governor ID'] = df_start['Governor ID'].astype(str)
-    df_end['Governor ID'] = df_end['Governor ID'].astype(str)
-
-    # Get unique Governor IDs from the main player list (kvk_start_power.xlsx)
-    master_player_ids = df_master_players['Governor ID'].unique()
-    logger.info(
-        f"Main player list from '{os.path.basename(start_kvk_power_file)}' contains {len(master_player_ids)} players.")
-
-    # Filter period start and end DataFrames to include ONLY players present in the master list.
-    df_start_filtered = df_start[df_start['Governor ID'].isin(master_player_ids)].copy()
-    df_end_filtered = df_end[df_end['Governor ID'].isin(master_player_ids)].copy()
-    logger.info(
-        f"File '{os.path.basename(start_file_path)}' filtered (based on master list): {len(df_start_filtered)} players (from original {len(df_start)})")
-    logger.info(
-        f"File '{os.path.basename(end_file_path)}' filtered (based on master list): {len(df_end_filtered)} players (from original {len(df_end)})")
-
-    # Define column renames for period files
-    period_renamed_cols = {
-        'Kill Points': 'Kill Points', 'Очки Убийств': 'Kill Points',
-        'Dead Troops': 'Deads', 'Deaths': 'Deads',
-        'Погибшие войска': 'Deads', 'Смерти': 'Deads',
-        'Deads': 'Deads',  # Exact name from user
-        'T4 Kills': 'Tier 4 Kills', 'Убийства Т4': 'Tier 4 Kills',
-        'Tier 4 Kills': 'Tier 4 Kills',  # Exact name from user
-        'T5 Kills': 'Tier 5 Kills', 'Убийства Т5': 'Tier 5 Kills',
-        'Tier 5 Kills': 'Tier 5 Kills',  # Exact name from user
-        'Power': 'Power', 'Мощь': 'Power',
-        'Governor Name': 'Governor Name', 'Имя Губернатора': 'Governor Name'
-    }
+    period_key = f"{os.path.basename(start_file_path)} -> {os.path.basename(end_file_path)}"
+    period_df = calculate_all_period_stats({period_key: (start_file_path, end_file_path)},
+                                           start_kvk_power_file, scoring).get(period_key, pd.DataFrame())
 
-    # Rename columns in filtered start and end period DataFrames
-    def create_valid_rename_map(df, rename_dict):
-        return {k: v for k, v in rename_dict.items() if k in df.columns}
-
-    df_start_filtered = df_start_filtered.rename(
-        columns=create_valid_rename_map(df_start_filtered, period_renamed_cols))
-    df_end_filtered = df_end_filtered.rename(columns=create_valid_rename_map(df_end_filtered, period_renamed_cols))
+    logger.info("Period data processing completed.")
+    return period_df
 
-    # Now perform an INNER merge between the filtered start and end snapshots.
-    # This ensures that only players present in the master list AND in BOTH period snapshots are included.
-    df_merged = pd.merge(df_end_filtered, df_start_filtered, on='Governor ID', suffixes=('_end', '_start'), how='inner')
-    logger.info(
-        f"Inner merge for period after master list filtering. Common players (present in master, '{os.path.basename(start_file_path)}' AND '{os.path.basename(end_file_path)}'): {len(df_merged)}")
 
-    if df_merged.empty:
-        logger.warning(
-            f"No common players found for period statistics after applying '{os.path.basename(start_kvk_power_file)}' filter and inner merge. Check 'Governor ID' column for matches across all relevant files.")
+def _calculate_time_range_stats(start_time, end_time, store: SnapshotTimeSeries, start_kvk_power_file: str,
+                                scoring: ScoringEngine):
+    """Period statistics between two timestamps of the time-series snapshot store."""
+    if start_time is None or end_time is None:
+        logger.error("Both start_time and end_time are required to calculate period statistics for a time range.")
+        return pd.DataFrame()
+    if not os.path.exists(start_kvk_power_file):
+        logger.error(
+            f"Critical error: KVK start power file '{os.path.basename(start_kvk_power_file)}' not found. Cannot calculate period statistics based on the main player list.")
         return pd.DataFrame()
 
-    # Fill NaN values in numeric columns (e.g., if a metric was missing for a player in a snapshot) with zeros.
-    numeric_cols = ['Power', 'Kill Points', 'Deads', 'Tier 4 Kills', 'Tier 5 Kills']
-    for col in numeric_cols:
-        if f'{col}_start' in df_merged.columns:
-            df_merged[f'{col}_start'] = pd.to_numeric(df_merged[f'{col}_start'], errors='coerce').fillna(0)
-        if f'{col}_end' in df_merged.columns:
-            df_merged[f'{col}_end'] = pd.to_numeric(df_merged[f'{col}_end'], errors='coerce').fillna(0)
-
-    # Determine Governor Name: prefer name from '_end' snapshot, if missing use '_start', then 'Unknown Governor'.
-    df_merged['Governor Name'] = df_merged['Governor Name_end'].fillna(df_merged['Governor Name_start']).fillna(
-        'Unknown Governor')
-
-    # Calculate metric changes for this period
-    df_merged['Kills Change'] = df_merged['Kill Points_end'] - df_merged['Kill Points_start']
-    df_merged['Deads Change'] = df_merged['Deads_end'] - df_merged['Deads_start']
-
-    df_merged['Power Change'] = df_merged['Power_end'] - df_merged['Power_start']
-    df_merged['Tier 4 Kills Change'] = df_merged['Tier 4 Kills_end'] - df_merged['Tier 4 Kills_start']
-    df_merged['Tier 5 Kills Change'] = df_merged['Tier 5 Kills_end'] - df_merged['Tier 5 Kills_start']
-    df_merged['Total Kills T4+T5 Change'] = df_merged['Tier 4 Kills Change'] + df_merged['Tier 5 Kills Change']
-
-    # Calculate DKP (consistent with overall KVK statistics)
-    df_merged['DKP'] = (
-            (df_merged['Deads Change'] * 15) +  # Зміна смертей
-            (df_merged['Tier 5 Kills Change'] * 10) +  # Зміна T5 вбивств
-            (df_merged['Tier 4 Kills Change'] * 4)  # Зміна T4 вбивств
-    )
-
-    # Rank players by DKP for the period
-    df_merged['Rank'] = df_merged['DKP'].rank(ascending=False, method='min').astype(int)
-
-    # Select and rename columns for the final period DataFrame output
-    period_df = df_merged[[
-        'Governor ID', 'Governor Name',
-        'Power_start', 'Power_end', 'Power Change',
-        'Kill Points_start', 'Kill Points_end', 'Kills Change',
-        'Deads_start', 'Deads_end', 'Deads Change',
-        'Tier 4 Kills_start', 'Tier 4 Kills_end', 'Tier 4 Kills Change',
-        'Tier 5 Kills_start', 'Tier 5 Kills_end', 'Tier 5 Kills Change',
-        'Total Kills T4+T5 Change', 'DKP', 'Rank'
-    ]].copy()
-
-    # Rename 'Power_end' to 'Power_after' for consistency in output naming
-    period_df.rename(columns={'Power_end': 'Power_after'}, inplace=True)
-
-    # Debug log for a sample player to verify period calculations
-    if not period_df.empty:
-        if 'Governor ID' in period_df.columns and not period_df['Governor ID'].empty:
-            sample_player_id = period_df['Governor ID'].iloc[0]
-            sample_player = period_df[period_df['Governor ID'] == sample_player_id].iloc[0]
-            logger.debug(f"DEBUGGING {sample_player_id} (Period Stats Raw Data):")
-            logger.debug(
-                f"   Period: {os.path.basename(start_file_path).split('.')[0]} -> {os.path.basename(end_file_path).split('.')[0]}")
-            logger.debug(
-                f"   Power_start: {sample_player['Power_start']:.1f}, Power_end: {sample_player['Power_after']:.1f}, Power Change: {sample_player['Power Change']:.1f}")
-            logger.debug(
-                f"   KP_start: {sample_player['Kill Points_start']:.1f}, KP_end: {sample_player['Kill Points_end']:.1f}, Kills Change: {sample_player['Kills Change']:.1f}")
-            logger.debug(
-                f"   Deads_start: {sample_player['Deads_start']:.1f}, Deads_end: {sample_player['Deads_end']:.1f}, Deads Change: {sample_player['Deads Change']:.1f}")
-            logger.debug(
-                f"   T4_start: {sample_player['Tier 4 Kills_start']:.1f}, T4_end: {sample_player['Tier 4 Kills_end']:.1f}, T4 Change: {sample_player['Tier 4 Kills Change']:.1f}")
-            logger.debug(
-                f"   T5_start: {sample_player['Tier 5 Kills_start']:.1f}, T5_end: {sample_player['Tier 5 Kills_end']:.1f}, T5 Change: {sample_player['Tier 5 Kills Change']:.1f}")
-            logger.debug(f"   Total T4+T5 Change: {sample_player['Total Kills T4+T5 Change']:.1f}")
-        else:
-            logger.warning(
-                "Period DataFrame is not empty but 'Governor ID' column is missing or empty. Skipping debug log.")
+    period_key = f"{pd.Timestamp(start_time)} -> {pd.Timestamp(end_time)}"
+    logger.info(f"Starting data processing for time range: {period_key}")
+    try:
+        df_master_players = SNAPSHOT_SCHEMA.canonicalize(read_snapshot(start_kvk_power_file))
+        snapshots = [store.as_of(start_time), store.as_of(end_time, scanned_after=start_time)]
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading scans for time range {period_key}: {e}")
+        return pd.DataFrame()
 
+    stack = SnapshotStack(df_master_players['Governor ID'].astype(str), snapshots)
+    period_df = calculate_stacked_periods(stack, {period_key: (0, 1)}, scoring)[period_key]
     logger.info("Period data processing completed.")
     return period_df
 
 
-def get_player_stats(df: pd.DataFrame, player_id: str):
+def get_player_stats(df: pd.DataFrame, player_id: str, index: GovernorIndex = None):
     """
     Extracts statistics for a specific player from a DataFrame.
+    If the GovernorIndex built for df is given, the player row is found without scanning the frame.
     """
     player_id = str(player_id).strip()  # Ensure ID is a string and stripped of whitespace
-    player_data = df[df['Governor ID'] == player_id]
+    if index is not None:
+        position = index.position(player_id)
+        player = df.iloc[position] if position is not None else None
+    else:
+        player_data = df[df['Governor ID'] == player_id]
+        player = player_data.iloc[0] if not player_data.empty else None  # The first (and only) row for the player
 
-    if player_data.empty:
+    if player is None:
         logger.warning(f"Player with ID {player_id} not found in the main DataFrame.")
         return None
 
-    player = player_data.iloc[0]  # Get the first (and only) row for the player
-
     # Return player statistics as a dictionary
     return {
         'governor_id': player.get('Governor ID'),
@@ -495,3 +438,47 @@ def get_player_stats(df: pd.DataFrame, player_id: str):
         'deads_completion': player.get('Deads Completion'),
         'rank': player.get('Rank')
     }
+
+
+def _numeric_column(df: pd.DataFrame, col: str) -> np.ndarray:
+    """Returns a column as a NumPy array with non-numeric values replaced by 0, without touching df."""
+    values = pd.to_numeric(df[col], errors='coerce')
+    if pd.api.types.is_integer_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    return values.fillna(0).to_numpy(dtype=np.float64)
+
+
+def _progress_percent(gained: np.ndarray, required: np.ndarray) -> np.ndarray:
+    # A zero requirement counts as 100% done, unless the player went backwards
+    progress = np.where(gained >= 0, 100.0, 0.0)
+    np.divide(gained * 100.0, required, out=progress, where=(required != 0))
+    return progress
+
+
+def evaluate_requirements(df: pd.DataFrame) -> dict:
+    """
+    Vectorized evaluation of kill and death requirements for the overall KVK results frame.
+    Returns a dictionary of NumPy arrays (in frame order) describing only the players who have not
+    met at least one requirement: 'Governor Name', 'Governor ID', 'Kills Needed', 'Deaths Needed',
+    'Kills Progress', 'Deaths Progress', 'Kills Done' and 'Deaths Done'.
+    The input DataFrame is not modified.
+    """
+    kills_gained = _numeric_column(df, 'Total Kills T4+T5 Change')
+    deaths_gained = _numeric_column(df, 'Deads_after') - _numeric_column(df, 'Deads_before')
+    required_kills = _numeric_column(df, 'Required Kills')
+    required_deaths = _numeric_column(df, 'Required Deaths')
+
+    kills_needed = np.maximum(0, required_kills - kills_gained)
+    deaths_needed = np.maximum(0, required_deaths - deaths_gained)
+    not_completed = (kills_needed > 0) | (deaths_needed > 0)
+
+    return {
+        'Governor Name': df['Governor Name'].to_numpy()[not_completed],
+        'Governor ID': df['Governor ID'].to_numpy()[not_completed],
+        'Kills Needed': kills_needed[not_completed],
+        'Deaths Needed': deaths_needed[not_completed],
+        'Kills Progress': _progress_percent(kills_gained, required_kills)[not_completed],
+        'Deaths Progress': _progress_percent(deaths_gained, required_deaths)[not_completed],
+        'Kills Done': (kills_needed == 0)[not_completed],
+        'Deaths Done': (deaths_needed == 0)[not_completed],
+    }
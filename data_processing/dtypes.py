@@ -0,0 +1,78 @@
+import logging
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Configure logging for the dtype optimization module
+logger = logging.getLogger('data_processing.dtypes')
+
+# Integer columns become int32 only if every value is below this magnitude, so that the sum or
+# difference of two values (e.g. a change between two snapshots) cannot overflow int32 either
+INT32_SAFE_LIMIT = 2 ** 30
+
+# Text columns are stored as categoricals if at most this share of their values is distinct, otherwise they stay
+# object columns. Arrow-backed strings are deliberately not used even when pyarrow happens to be installed
+# (it is not a requirement), so that the compact dtypes are the same on every installation.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Percentages of the results frame, stored as float32 (display precision is two decimals)
+PERCENT_COLUMNS = ('Kills Completion', 'Deads Completion')
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    """Deep memory usage of a frame, index included."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _compact_integers(values: pd.Series) -> pd.Series:
+    if values.empty or (values.min() > -INT32_SAFE_LIMIT and values.max() < INT32_SAFE_LIMIT):
+        return values.astype(np.int32)
+    return values.astype(np.int64)
+
+
+def _compact_column(values: pd.Series, float32_allowed: bool) -> Optional[pd.Series]:
+    """Returns the compact version of one column, or None if it stays as it is."""
+    if pd.api.types.is_bool_dtype(values):
+        return None
+    if pd.api.types.is_integer_dtype(values):
+        compact = _compact_integers(values)
+        return compact if compact.dtype != values.dtype else None
+    if pd.api.types.is_float_dtype(values):
+        if not values.isna().any() and (values == np.trunc(values)).all():
+            # Whole-valued counters (e.g. after a left merge filled with zeros) become integers again
+            return _compact_integers(values)
+        if values.dtype.itemsize > 4:
+            as_float32 = values.astype(np.float32)
+            if float32_allowed or as_float32.astype(values.dtype).equals(values):
+                return as_float32
+        return None
+    if values.dtype == object and len(values):
+        if values.nunique(dropna=False) <= len(values) * CATEGORY_MAX_UNIQUE_RATIO:
+            return values.astype('category')
+    return None
+
+
+def downcast_frame(df: pd.DataFrame, float32_columns: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Returns df with compact column dtypes:
+    - integer columns and whole-valued float columns -> int32 (see INT32_SAFE_LIMIT), otherwise int64;
+    - other float columns -> float32 if every value survives the round trip, or unconditionally for float32_columns;
+    - text columns -> categoricals if they are repetitive (see CATEGORY_MAX_UNIQUE_RATIO).
+    Columns that are not converted are shared with df, which is not modified.
+    """
+    float32_columns = set(float32_columns)
+    converted = {}
+    for col in df.columns:
+        compact = _compact_column(df[col], col in float32_columns)
+        if compact is not None:
+            converted[col] = compact
+    return df.assign(**converted) if converted else df
+
+
+def compact_results_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Dtype optimization stage of the overall results frame: compact counters, strings and float32 percentages."""
+    compact = downcast_frame(df, float32_columns=PERCENT_COLUMNS)
+    logger.info(f"Results frame compacted from {frame_bytes(df) / 1024:.0f} KB to {frame_bytes(compact) / 1024:.0f} KB "
+                f"({len(df)} governors).")
+    return compact
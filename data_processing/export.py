@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import openpyxl
+import pandas as pd
+
+try:
+    import xlsxwriter  # Optional: fastest streaming workbook writer (constant_memory mode)
+except ImportError:
+    xlsxwriter = None
+
+try:
+    import pyarrow  # noqa: F401  Optional: needed by the Parquet export only (not in requirements.txt)
+except ImportError:
+    pyarrow = None
+
+# Configure logging for the results export module
+logger = logging.getLogger('data_processing.export')
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+RESULTS_DIR = os.path.join(PROJECT_ROOT, 'results')
+RESULTS_BASENAME = 'results'
+
+# Formats the exporter knows; Parquet needs pyarrow
+KNOWN_EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+# Formats the results can be exported to on this installation
+EXPORT_FORMATS = tuple(fmt for fmt in KNOWN_EXPORT_FORMATS if fmt != 'parquet' or pyarrow is not None)
+# Formats written after every calculation (KVK_EXPORT_FORMATS overrides it, e.g. "xlsx,csv");
+# the other formats are written on request
+DEFAULT_EXPORT_FORMATS = ('xlsx',)
+
+# Sheet name of results.xlsx (the one DataFrame.to_excel used to write)
+RESULTS_SHEET_NAME = 'Sheet1'
+
+
+def check_format(fmt: str) -> None:
+    """Raises ValueError with a user-facing message if fmt cannot be exported on this installation."""
+    if fmt in EXPORT_FORMATS:
+        return
+    if fmt in KNOWN_EXPORT_FORMATS:
+        raise ValueError(f"Export format '{fmt}' needs pyarrow, which is not installed; "
+                         f"available formats: {', '.join(EXPORT_FORMATS)}.")
+    raise ValueError(f"Unknown export format '{fmt}'; available formats: {', '.join(EXPORT_FORMATS)}.")
+
+
+def export_formats() -> Tuple[str, ...]:
+    """Returns the configured formats written after every calculation; unknown formats are ignored with a warning."""
+    configured = os.getenv('KVK_EXPORT_FORMATS')
+    if configured is None:
+        return DEFAULT_EXPORT_FORMATS
+    formats = []
+    for fmt in configured.split(','):
+        fmt = fmt.strip().lower().lstrip('.')
+        if not fmt or fmt in formats:
+            continue
+        try:
+            check_format(fmt)
+        except ValueError as e:
+            logger.warning(f"KVK_EXPORT_FORMATS: {e} It is ignored.")
+            continue
+        formats.append(fmt)
+    return tuple(formats)
+
+
+def _rows(df: pd.DataFrame) -> Iterator[tuple]:
+    """Rows of df as tuples of Python values, missing values as None (written as empty cells)."""
+    columns = [df[col].astype(object).where(df[col].notna(), None).tolist() for col in df.columns]
+    return zip(*columns)
+
+
+def write_xlsx(df: pd.DataFrame, path: str) -> None:
+    """
+    Writes df as a workbook row by row with a streaming writer: xlsxwriter in constant_memory mode if it
+    is installed, openpyxl in write-only mode otherwise. Neither keeps the sheet's cells in memory.
+    """
+    header = [str(col) for col in df.columns]
+    if xlsxwriter is not None:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'nan_inf_to_errors': True})
+        worksheet = workbook.add_worksheet(RESULTS_SHEET_NAME)
+        worksheet.write_row(0, 0, header)
+        for r, row in enumerate(_rows(df), start=1):
+            worksheet.write_row(r, 0, row)
+        workbook.close()
+        return
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet(RESULTS_SHEET_NAME)
+    worksheet.append(header)
+    for row in _rows(df):
+        worksheet.append(row)
+    workbook.save(path)
+
+
+def write_frame(df: pd.DataFrame, path: str, fmt: str) -> None:
+    """
+    Writes df to path in one of EXPORT_FORMATS. The file is written next to path and then moved over it,
+    so a download never sees a half-written file.
+    """
+    check_format(fmt)
+    partial_path = f"{path}.partial"
+    try:
+        if fmt == 'xlsx':
+            write_xlsx(df, partial_path)
+        elif fmt == 'csv':
+            # UTF-8 with a BOM, so that Excel shows Cyrillic governor names correctly
+            df.to_csv(partial_path, index=False, encoding='utf-8-sig')
+        else:
+            df.to_parquet(partial_path, index=False)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, path)
+
+
+class ResultsExporter:
+    """
+    Writes the overall results (results/results.<format>) in a background worker thread, so that
+    calculate_stats returns the computed frame without waiting for the workbook.
+    submit() hands over a newly computed frame and schedules the formats of export_formats(); get() returns
+    a Future of the path of one format for the latest frame, exporting it on request if needed.
+    Exports are coalesced: an export that has not started yet always writes the latest submitted frame,
+    so a burst of recalculations writes each format once. Exports run one at a time, so files are never
+    written concurrently.
+    """
+
+    def __init__(self, output_dir: str = RESULTS_DIR, basename: str = RESULTS_BASENAME,
+                 formats: Iterable[str] = None):
+        self.output_dir = output_dir
+        self.basename = basename
+        self.formats = tuple(formats) if formats is not None else export_formats()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._frame: Optional[pd.DataFrame] = None
+        self._generation = 0
+        self._pending: Dict[str, Future] = {}  # Format -> scheduled export that has not started yet
+        self._running: Dict[str, Tuple[Future, int]] = {}  # Format -> export being written, with its frame generation
+        self._exported: Dict[str, str] = {}  # Format -> path written from the latest frame
+
+    def path(self, fmt: str) -> str:
+        return os.path.join(self.output_dir, f"{self.basename}.{fmt}")
+
+    def submit(self, df: pd.DataFrame) -> Dict[str, Future]:
+        """Hands over a newly computed results frame (which must not be modified afterwards) and schedules its export."""
+        with self._lock:
+            self._frame = df
+            self._generation += 1
+            self._exported.clear()
+            return {fmt: self._schedule(fmt) for fmt in self.formats}
+
+    def get(self, fmt: str) -> Future:
+        """
+        Returns a Future of the path of the latest frame exported as fmt: already done if it was written,
+        otherwise the export of the latest frame that is being written or pending (scheduled here if there
+        is none). Raises ValueError for an unknown
+        format, a format this installation cannot write (see check_format) or if no frame was submitted yet.
+        """
+        check_format(fmt)
+        with self._lock:
+            if self._frame is None:
+                raise ValueError("No results have been calculated yet.")
+            if fmt in self._exported:
+                done = Future()
+                done.set_result(self._exported[fmt])
+                return done
+            running = self._running.get(fmt)
+            if running is not None and running[1] == self._generation:
+                return running[0]
+            return self._schedule(fmt)
+
+    def _schedule(self, fmt: str) -> Future:
+        # Called with the lock held
+        future = self._pending.get(fmt)
+        if future is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='kvk-export')
+            future = self._executor.submit(self._export, fmt)
+            self._pending[fmt] = future
+        return future
+
+    def _export(self, fmt: str) -> str:
+        with self._lock:
+            # _schedule stores the future with the lock held, so it is always there when the export starts.
+            # From now on a newer frame needs a new export, while get() for this frame joins this one.
+            future = self._pending.pop(fmt)
+            df, generation = self._frame, self._generation
+            self._running[fmt] = (future, generation)
+        path = self.path(fmt)
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            write_frame(df, path, fmt)
+        except Exception as e:
+            logger.error(f"Error saving processed data to {path}: {e}")
+            with self._lock:
+                self._running.pop(fmt, None)
+            raise
+        with self._lock:
+            if generation == self._generation:
+                self._exported[fmt] = path
+            self._running.pop(fmt, None)
+        logger.info(f"Processed data successfully saved to {path} ({len(df)} governors).")
+        return path
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+
+
+# Exporter of the overall KVK results, fed by calculate_stats
+results_exporter = ResultsExporter()
@@ -0,0 +1,101 @@
+import bisect
+import logging
+from collections import Counter
+from typing import List, Optional
+
+import pandas as pd
+
+# Configure logging for the governor index module
+logger = logging.getLogger('data_processing.governor_index')
+
+# Minimal trigram similarity (Jaccard) for a fuzzy name match to be returned
+FUZZY_MIN_SCORE = 0.3
+
+
+def normalize_name(name) -> str:
+    """Case- and whitespace-insensitive form of a governor name used for lookups."""
+    return ' '.join(str(name).casefold().split())
+
+
+def _trigrams(normalized_name: str) -> set:
+    padded = f"  {normalized_name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class GovernorIndex:
+    """
+    Lookup structures for one loaded results or period frame, built once when the frame is loaded:
+    - Governor ID -> row position, for O(1) player lookups;
+    - names sorted in normalized form, for prefix search with bisect;
+    - a trigram index over names, for fuzzy search.
+    Positions refer to df.iloc of the frame the index was built from.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        ids = df['Governor ID'].astype(str).str.strip().to_numpy()
+        self._positions = {}
+        for position, governor_id in enumerate(ids):
+            # Keep the first row of a duplicated ID, as a boolean scan followed by iloc[0] would
+            self._positions.setdefault(governor_id, position)
+
+        # astype(object) first: the column may be categorical, which cannot be filled with a new value
+        names = df['Governor Name'].astype(object).fillna('').to_numpy() if 'Governor Name' in df.columns \
+            else [''] * len(df)
+        normalized = [normalize_name(name) for name in names]
+        order = sorted(range(len(normalized)), key=normalized.__getitem__)
+        self._sorted_names = [normalized[position] for position in order]
+        self._sorted_positions = order
+
+        self._name_trigrams = []
+        self._trigram_postings = {}
+        for position, name in enumerate(normalized):
+            grams = _trigrams(name) if name else set()
+            self._name_trigrams.append(len(grams))
+            for gram in grams:
+                self._trigram_postings.setdefault(gram, []).append(position)
+
+        logger.debug(f"Governor index built for {len(self._positions)} governors.")
+
+    def __len__(self):
+        return len(self._positions)
+
+    def position(self, governor_id) -> Optional[int]:
+        """Returns the row position of a Governor ID, or None if it is not in the frame."""
+        return self._positions.get(str(governor_id).strip())
+
+    def find_prefix(self, query: str, limit: int = 10) -> List[int]:
+        """Returns row positions of governors whose normalized name starts with the query."""
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        matches = []
+        i = bisect.bisect_left(self._sorted_names, prefix)
+        while i < len(self._sorted_names) and self._sorted_names[i].startswith(prefix) and len(matches) < limit:
+            matches.append(self._sorted_positions[i])
+            i += 1
+        return matches
+
+    def find_fuzzy(self, query: str, limit: int = 10) -> List[int]:
+        """Returns row positions of the governors whose names share the most trigrams with the query."""
+        query_grams = _trigrams(normalize_name(query))
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self._trigram_postings.get(gram, ()))
+        scored = []
+        for position, common in shared.items():
+            score = common / (len(query_grams) + self._name_trigrams[position] - common)
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((score, position))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [position for _, position in scored[:limit]]
+
+    def find_by_name(self, query: str, limit: int = 10) -> List[int]:
+        """Prefix matches first, completed with fuzzy matches, without duplicates."""
+        matches = self.find_prefix(query, limit)
+        if len(matches) < limit:
+            for position in self.find_fuzzy(query, limit):
+                if position not in matches:
+                    matches.append(position)
+                    if len(matches) >= limit:
+                        break
+        return matches
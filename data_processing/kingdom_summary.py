@@ -0,0 +1,66 @@
+import logging
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Configure logging for the kingdom summary module
+logger = logging.getLogger('data_processing.kingdom_summary')
+
+# Summed metrics: summary key -> column of the results and period frames
+SUMMARY_COLUMNS = {
+    'kills': 'Kills Change',
+    'deaths': 'Deads Change',
+    'tier4_kills': 'Tier 4 Kills Change',
+    'tier5_kills': 'Tier 5 Kills Change',
+    'dkp': 'DKP',
+    'current_power': 'Power_after',
+}
+
+# Brackets of current power used by the per-bracket rollup (lower bound included)
+POWER_BRACKET_EDGES = [0, 10_000_000, 25_000_000, 50_000_000, 75_000_000, 100_000_000, np.inf]
+POWER_BRACKET_LABELS = ['<10M', '10M-25M', '25M-50M', '50M-75M', '75M-100M', '100M+']
+
+# Label of governors without an alliance tag in the per-alliance rollup
+NO_ALLIANCE_LABEL = 'No alliance'
+
+
+class KingdomSummary:
+    """
+    Kingdom-wide aggregates of one results or period frame, computed once when the frame is loaded:
+    - totals: {summary key: sum} for the SUMMARY_COLUMNS present in the frame, plus 'power_change'
+      (from 'Power_at_KVK_start' in the overall results, otherwise the frame's 'Power Change');
+    - by_alliance: the same sums and a 'governors' count per alliance, by DKP (or kills) descending,
+      or None if the frame has no 'Alliance' column;
+    - by_power_bracket: the same per bracket of current power (POWER_BRACKET_LABELS), or None without 'Power_after'.
+    Non-numeric cells count as 0. The frame itself is not modified.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.governors = len(df)
+        metrics = pd.DataFrame({key: pd.to_numeric(df[col], errors='coerce').fillna(0)
+                                for key, col in SUMMARY_COLUMNS.items() if col in df.columns}, index=df.index)
+        if 'Power_after' in df.columns and 'Power_at_KVK_start' in df.columns:
+            metrics['power_change'] = metrics['current_power'] - pd.to_numeric(
+                df['Power_at_KVK_start'], errors='coerce').fillna(0)
+        elif 'Power Change' in df.columns:
+            metrics['power_change'] = pd.to_numeric(df['Power Change'], errors='coerce').fillna(0)
+
+        self.totals = metrics.sum().to_dict()
+        metrics['governors'] = 1
+
+        self.by_alliance: Optional[pd.DataFrame] = None
+        if 'Alliance' in df.columns:
+            alliances = df['Alliance'].astype(object).fillna('').astype(str).str.strip()
+            order_by = 'dkp' if 'dkp' in metrics.columns else 'governors'
+            self.by_alliance = metrics.groupby(alliances.where(alliances != '', NO_ALLIANCE_LABEL).to_numpy(),
+                                               sort=False).sum().sort_values(order_by, ascending=False)
+
+        self.by_power_bracket: Optional[pd.DataFrame] = None
+        if 'current_power' in metrics.columns:
+            brackets = pd.cut(metrics['current_power'], bins=POWER_BRACKET_EDGES, labels=POWER_BRACKET_LABELS,
+                              right=False)
+            self.by_power_bracket = metrics.groupby(brackets, observed=True).sum()
+
+        logger.debug(f"Kingdom summary built for {self.governors} governors "
+                     f"({0 if self.by_alliance is None else len(self.by_alliance)} alliances).")
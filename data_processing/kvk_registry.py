@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+from typing import Dict, Iterator, List, Optional
+
+from data_processing.scoring import ScoringEngine, ScoringFormulaError
+
+# Configure logging for the KVK registry module
+logger = logging.getLogger('data_processing.kvk_registry')
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+KVK_CONFIGS_DIR = os.path.join(PROJECT_ROOT, 'kvk_configs')
+
+# Name of the running KVK, whose snapshot files live in the project root directory
+CURRENT_KVK_NAME = 'current'
+
+# Periods of the running KVK, in the config.json format with file names relative to the project root
+CURRENT_KVK_CONFIG_FILE = 'kvk_current.json'
+
+# Optional scoring formulas of the running KVK (the 'scoring' object of a config.json), in the project root
+CURRENT_KVK_SCORING_FILE = 'kvk_scoring.json'
+
+# config.json defaults
+DEFAULT_PERIOD_FILE_SUFFIX = '_stats.xlsx'
+DEFAULT_START_POWER_FILE = 'kvk_start_power.xlsx'
+
+
+def normalize_data_key(name: str) -> str:
+    """
+    Normalized form of a KVK name, period key or data key, used for every lookup of a period:
+    casefolded, surrounding whitespace removed and inner whitespace runs replaced by '_'.
+    """
+    return '_'.join(name.casefold().split())
+
+
+def load_current_scoring() -> ScoringEngine:
+    """
+    The scoring formulas of the running KVK from kvk_scoring.json, or the default DKP formula if the file
+    is absent or unusable.
+    """
+    scoring_path = os.path.join(PROJECT_ROOT, CURRENT_KVK_SCORING_FILE)
+    if os.path.exists(scoring_path):
+        try:
+            with open(scoring_path, 'r', encoding='utf-8') as f:
+                return ScoringEngine.from_config(json.load(f))
+        except (OSError, ValueError) as e:
+            # ScoringFormulaError is a ValueError; keep the bot running with the default formula
+            logger.error(f"'{CURRENT_KVK_SCORING_FILE}' is ignored, using the default DKP formula: {e}")
+    return ScoringEngine()
+
+
+class KvkConfigError(ValueError):
+    """Raised when a KVK config.json is missing or cannot be used."""
+
+
+class KvkPeriod:
+    """
+    One period of a KVK.
+    data_key identifies the period's frame in the bot: the bare period key for the running KVK
+    (e.g. 'zone5'), '<kvk slug>:<period key>' for the KVKs from kvk_configs (e.g. 'king_of_the_nile:altars').
+    start_file and end_file are the period's snapshot pair (None if the config describes none), stats_file
+    the per-period workbook imported into the database.
+    """
+
+    def __init__(self, kvk: 'KvkConfig', key: str, display_name: str, start_file: Optional[str] = None,
+                 end_file: Optional[str] = None, stats_file: Optional[str] = None):
+        self.kvk = kvk
+        self.key = key
+        self.display_name = display_name
+        self.data_key = normalize_data_key(key) if kvk.slug == CURRENT_KVK_NAME \
+            else f"{kvk.slug}:{normalize_data_key(key)}"
+        self.start_file = start_file
+        self.end_file = end_file
+        self.stats_file = stats_file
+
+    @property
+    def has_snapshots(self) -> bool:
+        """True if the period has a snapshot pair and both of its files exist."""
+        return self.start_file is not None and os.path.exists(self.start_file) and os.path.exists(self.end_file)
+
+
+def _relative_path(directory: str, relative: str, setting: str) -> str:
+    """Joins a path from config.json to the KVK directory, refusing paths that leave it."""
+    if not isinstance(relative, str) or not relative or os.path.isabs(relative):
+        raise KvkConfigError(f"'{setting}' must be a file name relative to the KVK folder, got {relative!r}.")
+    path = os.path.normpath(os.path.join(directory, relative))
+    if os.path.commonpath([path, os.path.normpath(directory)]) != os.path.normpath(directory):
+        raise KvkConfigError(f"'{setting}' points outside of the KVK folder: {relative!r}.")
+    return path
+
+
+class KvkConfig:
+    """
+    A KVK and its periods.
+    Folders in kvk_configs are loaded with from_directory(); their config.json supports:
+    - 'periods': {period key: display name} (required);
+    - 'default_period_file_suffix' and 'full_kvk_file': per-period workbooks imported into the database;
+    - 'period_snapshots': {period key: {'start': file, 'end': file}}, the snapshot pair of each period
+      (a period without one has no period statistics in the bot);
+    - 'start_power_file': the main player list (default: kvk_start_power.xlsx);
+    - 'scoring': {formula name: weights or expression}, the DKP formula ('dkp', default deads x15 + T5 x10
+      + T4 x4) and scoring variants (see data_processing.scoring.ScoringFormula).
+    All file names are relative to the KVK folder. Missing files are not errors (a battle that has not
+    started yet has no files), they are reported in issues.
+    The running KVK is loaded with current() from kvk_current.json, in the same format with file names
+    relative to the project root.
+    """
+
+    def __init__(self, name: str, directory: str, master_file: str):
+        self.name = name
+        self.slug = normalize_data_key(name)
+        self.directory = directory
+        self.master_file = master_file
+        self.periods: Dict[str, KvkPeriod] = {}
+        self.issues: List[str] = []
+        self.scoring = ScoringEngine()
+
+    @classmethod
+    def current(cls, config_file: str = CURRENT_KVK_CONFIG_FILE) -> 'KvkConfig':
+        """
+        The running KVK: its periods and snapshot files from kvk_current.json (relative to the project root),
+        kvk_start_power.xlsx as the master list and the scoring formulas of kvk_scoring.json, if present
+        (the default DKP formula otherwise). An unusable kvk_current.json is logged and leaves the running KVK
+        without periods, so that the overall statistics are still served.
+        """
+        try:
+            kvk = cls._from_config(CURRENT_KVK_NAME, PROJECT_ROOT, os.path.join(PROJECT_ROOT, config_file))
+        except KvkConfigError as e:
+            logger.error(f"'{config_file}' is ignored, the running KVK has no periods: {e}")
+            kvk = cls(CURRENT_KVK_NAME, PROJECT_ROOT, os.path.join(PROJECT_ROOT, DEFAULT_START_POWER_FILE))
+        kvk.scoring = load_current_scoring()
+        return kvk
+
+    @classmethod
+    def from_directory(cls, directory: str) -> 'KvkConfig':
+        """Loads and validates kvk_configs/<KVK name>/config.json. Raises KvkConfigError if it cannot be used."""
+        name = os.path.basename(os.path.normpath(directory))
+        return cls._from_config(name, directory, os.path.join(directory, 'config.json'))
+
+    @classmethod
+    def _from_config(cls, name: str, directory: str, config_path: str) -> 'KvkConfig':
+        """Loads and validates a config file whose file names are relative to directory."""
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise KvkConfigError(f"Cannot read '{config_path}': {e}")
+        if not isinstance(config, dict):
+            raise KvkConfigError(f"'{config_path}' must contain a JSON object.")
+
+        periods = config.get('periods')
+        if not isinstance(periods, dict) or not periods or \
+                not all(isinstance(key, str) and isinstance(value, str) for key, value in periods.items()):
+            raise KvkConfigError("'periods' must be a non-empty object of period key -> display name.")
+        suffix = config.get('default_period_file_suffix', DEFAULT_PERIOD_FILE_SUFFIX)
+        if not isinstance(suffix, str) or not suffix.endswith('.xlsx'):
+            raise KvkConfigError(f"'default_period_file_suffix' must end with '.xlsx', got {suffix!r}.")
+        snapshots = config.get('period_snapshots', {})
+        if not isinstance(snapshots, dict):
+            raise KvkConfigError("'period_snapshots' must be an object of period key -> {'start', 'end'}.")
+
+        kvk = cls(name, directory, _relative_path(
+            directory, config.get('start_power_file', DEFAULT_START_POWER_FILE), 'start_power_file'))
+        try:
+            kvk.scoring = ScoringEngine.from_config(config.get('scoring'))
+        except ScoringFormulaError as e:
+            raise KvkConfigError(str(e))
+        for key, display_name in periods.items():
+            if key == 'full_kvk' and 'full_kvk_file' in config:
+                stats_file = _relative_path(directory, config['full_kvk_file'], 'full_kvk_file')
+            else:
+                stats_file = _relative_path(directory, f"{key}{suffix}", 'default_period_file_suffix')
+            start_file = end_file = None
+            if key in snapshots:
+                pair = snapshots[key]
+                if not isinstance(pair, dict) or 'start' not in pair or 'end' not in pair:
+                    raise KvkConfigError(f"'period_snapshots.{key}' must be an object with 'start' and 'end'.")
+                start_file = _relative_path(directory, pair['start'], f"period_snapshots.{key}.start")
+                end_file = _relative_path(directory, pair['end'], f"period_snapshots.{key}.end")
+            kvk.periods[key] = KvkPeriod(kvk, key, display_name, start_file, end_file, stats_file)
+
+        for key in snapshots:
+            if key not in periods:
+                kvk.issues.append(f"'period_snapshots' describes unknown period '{key}'.")
+        kvk.validate_files()
+        return kvk
+
+    def validate_files(self):
+        """Records the file layout problems that can be detected without reading the workbooks."""
+        for period in self.periods.values():
+            if period.start_file is None:
+                continue
+            start_exists, end_exists = os.path.exists(period.start_file), os.path.exists(period.end_file)
+            if start_exists != end_exists:
+                present, missing = (period.start_file, period.end_file) if start_exists else (period.end_file, period.start_file)
+                self.issues.append(f"Period '{period.key}' has '{os.path.basename(present)}' "
+                                   f"but not '{os.path.basename(missing)}'.")
+        if any(period.has_snapshots for period in self.periods.values()) and not os.path.exists(self.master_file):
+            self.issues.append(f"Period snapshots are present but the main player list "
+                               f"'{os.path.basename(self.master_file)}' is missing.")
+
+
+class KvkRegistry:
+    """
+    All known KVKs: the running one and every valid folder of kvk_configs, loaded once.
+    Periods are looked up by their data key (see KvkPeriod).
+    """
+
+    def __init__(self, kvks: List[KvkConfig]):
+        self.kvks: Dict[str, KvkConfig] = {kvk.slug: kvk for kvk in kvks}
+        self._periods: Dict[str, KvkPeriod] = {
+            period.data_key: period for kvk in kvks for period in kvk.periods.values()}
+
+    @classmethod
+    def load(cls, configs_dir: str = KVK_CONFIGS_DIR) -> 'KvkRegistry':
+        kvks = [KvkConfig.current()]
+        for issue in kvks[0].issues:
+            logger.warning(f"{CURRENT_KVK_CONFIG_FILE}: {issue}")
+        if os.path.isdir(configs_dir):
+            for name in sorted(os.listdir(configs_dir)):
+                directory = os.path.join(configs_dir, name)
+                if not os.path.isdir(directory):
+                    continue
+                try:
+                    kvk = KvkConfig.from_directory(directory)
+                except KvkConfigError as e:
+                    logger.error(f"KVK config '{name}' is ignored: {e}")
+                    continue
+                if kvk.slug in (known.slug for known in kvks):
+                    logger.error(f"KVK config '{name}' is ignored: its name clashes with another KVK.")
+                    continue
+                for issue in kvk.issues:
+                    logger.warning(f"KVK config '{name}': {issue}")
+                kvks.append(kvk)
+        registry = cls(kvks)
+        logger.info(f"KVK registry loaded: {len(registry.kvks)} KVKs, {len(registry._periods)} periods.")
+        return registry
+
+    @property
+    def current(self) -> KvkConfig:
+        return self.kvks[CURRENT_KVK_NAME]
+
+    def resolve(self, data_key: str) -> Optional[KvkPeriod]:
+        """Returns the period with this data key (compared with normalize_data_key), or None."""
+        return self._periods.get(normalize_data_key(data_key))
+
+    def periods(self) -> Iterator[KvkPeriod]:
+        return iter(self._periods.values())
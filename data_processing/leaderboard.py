@@ -0,0 +1,71 @@
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Configure logging for the leaderboard module
+logger = logging.getLogger('data_processing.leaderboard')
+
+# Metrics players can be ranked by: metric name -> column of the results and period frames
+LEADERBOARD_METRICS = {
+    'dkp': 'DKP',
+    'kills': 'Kills Change',
+    'deaths': 'Deads Change',
+    't4': 'Tier 4 Kills Change',
+    't5': 'Tier 5 Kills Change',
+    'power': 'Power Change',
+}
+
+# Other accepted spellings of the metric names
+METRIC_ALIASES = {
+    'kp': 'kills', 'killpoints': 'kills', 'deads': 'deaths', 'dead': 'deaths',
+    'tier4': 't4', 't4kills': 't4', 'tier5': 't5', 't5kills': 't5', 'powerchange': 'power',
+}
+
+# Metric names as shown in leaderboard titles
+METRIC_LABELS = {
+    'dkp': 'DKP', 'kills': 'Kill Points Gained', 'deaths': 'Deaths Gained',
+    't4': 'T4 Kills Gained', 't5': 'T5 Kills Gained', 'power': 'Power Change',
+}
+
+
+def resolve_metric(name: str) -> Optional[str]:
+    """Returns the metric name for a user-typed metric (case, spaces, '-' and '_' ignored), or None."""
+    key = ''.join(ch for ch in name.casefold() if ch not in ' -_')
+    return key if key in LEADERBOARD_METRICS else METRIC_ALIASES.get(key)
+
+
+class Leaderboard:
+    """
+    Rankings of one results or period frame, built once when the frame is loaded: for each metric of
+    LEADERBOARD_METRICS present in the frame, the row positions sorted by that metric in descending order
+    (a stable argsort, so ties keep the frame order) and the number of players with a positive value,
+    who form the head of the order.
+    A page of a leaderboard is then a slice of the permutation; positions refer to df.iloc of the frame.
+    Non-numeric cells count as 0.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self._orders: Dict[str, np.ndarray] = {}
+        self._positive_counts: Dict[str, int] = {}
+        for metric, col in LEADERBOARD_METRICS.items():
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+            self._orders[metric] = np.argsort(-values, kind='stable')
+            self._positive_counts[metric] = int(np.count_nonzero(values > 0))
+        logger.debug(f"Leaderboard built for {len(df)} governors and metrics {list(self._orders)}.")
+
+    @property
+    def metrics(self):
+        """Metrics available for this frame."""
+        return list(self._orders)
+
+    def size(self, metric: str, positive_only: bool = False) -> int:
+        """Number of ranked players (only those with a value above 0 if positive_only)."""
+        return self._positive_counts[metric] if positive_only else len(self._orders[metric])
+
+    def positions(self, metric: str, start: int, stop: int, positive_only: bool = False) -> np.ndarray:
+        """Row positions of the players ranked start..stop-1 (0-based) by metric."""
+        return self._orders[metric][start:min(stop, self.size(metric, positive_only))]
@@ -1,22 +1,36 @@
+import numpy as np
+import openpyxl
 import pandas as pd
 
+from data_processing.schema import SNAPSHOT_SCHEMA
+
+# Canonical snapshot columns; header aliases are resolved by SNAPSHOT_SCHEMA
+SNAPSHOT_COLUMNS = SNAPSHOT_SCHEMA.columns
+
+# Columns that are always kept as text, whatever their cell values look like
+TEXT_COLUMNS = {'Governor ID', 'Governor Name', 'Alliance'}
+
+# Number of rows converted to arrays at once by iter_snapshot_batches
+DEFAULT_BATCH_SIZE = 50_000
+
+
 def load_and_prepare_data(before_file, after_file, requirements_file):
     try:
-        before = pd.read_excel(before_file, header=0)
+        before = read_snapshot_streaming(before_file, columns=None, canonical_headers=False)
     except FileNotFoundError:
         raise FileNotFoundError(f"Error: File '{before_file}' not found.")
     if before.empty:
         raise ValueError(f"Error: File '{before_file}' is empty or has no data.")
 
     try:
-        after = pd.read_excel(after_file, header=0)
+        after = read_snapshot_streaming(after_file, columns=None, canonical_headers=False)
     except FileNotFoundError:
         raise FileNotFoundError(f"Error: File '{after_file}' not found.")
     if after.empty:
         raise ValueError(f"Error: File '{after_file}' is empty or has no data.")
 
     try:
-        requirements = pd.read_excel(requirements_file, header=0)
+        requirements = read_snapshot_streaming(requirements_file, columns=None, canonical_headers=False)
     except FileNotFoundError:
         raise FileNotFoundError(f"Error: File '{requirements_file}' not found.")
     if requirements.empty:
@@ -33,4 +47,89 @@ def load_and_prepare_data(before_file, after_file, requirements_file):
     after['Governor ID'] = after['Governor ID'].fillna('').astype(str).str.strip()
     requirements['Governor ID'] = requirements['Governor ID'].fillna('').astype(str).str.strip()
 
-    return before, after, requirements
\ No newline at end of file
+    return before, after, requirements
+
+
+def _governor_id_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _typed_array(name: str, values: list) -> np.ndarray:
+    """Converts one column of a batch: IDs and names to text, numeric columns to int64 (float64 if a cell is missing)."""
+    if name == 'Governor ID':
+        return np.array([_governor_id_text(value) for value in values], dtype=object)
+    if name not in TEXT_COLUMNS:
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            if all(isinstance(value, int) for value in values):
+                return np.array(values, dtype=np.int64)
+            return np.array(values, dtype=np.float64)
+        if all(value is None or isinstance(value, (int, float)) for value in values):
+            return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array([np.nan if value is None else value for value in values], dtype=object)
+
+
+def _header_positions(header, columns=None) -> dict:
+    """Maps header positions to the stripped header text, as the workbook spells it (the first duplicate wins)."""
+    positions = {}
+    for position, cell in enumerate(header):
+        name = str(cell).strip() if cell is not None else ''
+        if name and name not in positions.values() and (columns is None or name in columns):
+            positions[position] = name
+    return positions
+
+
+def iter_snapshot_batches(file_path: str, columns=SNAPSHOT_COLUMNS, batch_size: int = DEFAULT_BATCH_SIZE,
+                          typed: bool = True, canonical_headers: bool = True):
+    """
+    Streams the first sheet of a workbook with openpyxl in read-only mode and yields dictionaries
+    {canonical column name: typed NumPy array} of at most batch_size rows (object arrays of the cell values
+    as they are, e.g. numeric Governor IDs as numbers, if not typed).
+    Only the projected columns are kept, so peak memory depends on the projected columns and the batch
+    size, not on the size of the sheet. Headers are resolved to canonical names with SNAPSHOT_SCHEMA
+    (the first matching header wins); with canonical_headers=False the stripped headers of the sheet are kept
+    as they are. Requested columns missing from the sheet are not returned.
+    """
+    convert = _typed_array if typed else (lambda name, values: np.array(values, dtype=object))
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        wanted = None if columns is None else set(columns)
+        if canonical_headers:
+            positions = SNAPSHOT_SCHEMA.positions(header, wanted)
+        else:
+            positions = _header_positions(header, wanted)
+        batch = {name: [] for name in positions.values()}
+        row_count = 0
+        yielded = False
+        for row in rows:
+            if not any(cell is not None for cell in row):
+                continue  # Skip blank rows, as pd.read_excel does
+            for position, name in positions.items():
+                batch[name].append(row[position] if position < len(row) else None)
+            row_count += 1
+            if row_count == batch_size:
+                yield {name: convert(name, values) for name, values in batch.items()}
+                yielded = True
+                batch = {name: [] for name in positions.values()}
+                row_count = 0
+        if row_count or not yielded:
+            yield {name: convert(name, values) for name, values in batch.items()}
+    finally:
+        workbook.close()
+
+
+def read_snapshot_streaming(file_path: str, columns=SNAPSHOT_COLUMNS, batch_size: int = DEFAULT_BATCH_SIZE,
+                            typed: bool = True, canonical_headers: bool = True) -> pd.DataFrame:
+    """Reads a snapshot workbook with iter_snapshot_batches and returns the projected columns as a DataFrame."""
+    batches = [pd.DataFrame(batch) for batch in
+               iter_snapshot_batches(file_path, columns, batch_size, typed, canonical_headers)]
+    if not batches:
+        return pd.DataFrame()
+    return pd.concat(batches, ignore_index=True) if len(batches) > 1 else batches[0]
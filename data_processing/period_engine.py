@@ -0,0 +1,192 @@
+import logging
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_processing.schema import SNAPSHOT_SCHEMA
+from data_processing.scoring import DKP_FORMULA_NAME, ScoringEngine, change_column
+from data_processing.snapshot_cache import read_snapshot
+
+# Configure logging for the period engine module
+logger = logging.getLogger('data_processing.period_engine')
+
+# Metrics every snapshot must have; their changes are the columns of the period frames
+PERIOD_METRICS = ['Power', 'Kill Points', 'Deads', 'Tier 4 Kills', 'Tier 5 Kills']
+# Metrics also stacked, if the snapshots have them, so that scoring formulas can use them (0 if missing)
+OPTIONAL_PERIOD_METRICS = ['Tier 1 Kills', 'Tier 2 Kills', 'Tier 3 Kills']
+# Order of the last axis of the snapshot array
+STACKED_METRICS = PERIOD_METRICS + OPTIONAL_PERIOD_METRICS
+
+
+class SnapshotStack:
+    """
+    All snapshots of a KVK stacked into a single governor x snapshot x metric array.
+    Governors are the players of the master list (kvk_start_power.xlsx); players missing from the master
+    list are dropped once, when a snapshot is stacked. For each snapshot the stack also keeps which governors
+    it contains, their names (and alliance tags, if any snapshot has them) and the governors' order in the
+    snapshot file.
+    """
+
+    def __init__(self, master_ids, snapshots: List[pd.DataFrame]):
+        self.governor_ids = pd.Index(pd.unique(np.asarray(master_ids, dtype=object)))
+        shape = (len(self.governor_ids), len(snapshots))
+        self.values = np.zeros(shape + (len(STACKED_METRICS),), dtype=np.float64)
+        self.present = np.zeros(shape, dtype=bool)
+        self.names = np.full(shape, None, dtype=object)
+        self.alliances = np.full(shape, None, dtype=object) \
+            if any('Alliance' in df.columns for df in snapshots) else None
+        # Whether a metric was read as integers, so that period columns keep the dtype of the workbook
+        self.integer_metrics = np.ones((len(snapshots), len(STACKED_METRICS)), dtype=bool)
+        self.has_metric = np.zeros((len(snapshots), len(STACKED_METRICS)), dtype=bool)
+        self.valid = np.ones(len(snapshots), dtype=bool)
+        self.row_orders = []
+
+        for s, df in enumerate(snapshots):
+            positions = self.governor_ids.get_indexer(df['Governor ID'].astype(str))
+            in_master = positions >= 0
+            # A governor listed twice in a snapshot keeps its first row
+            first_rows = in_master & ~pd.Series(positions).duplicated().to_numpy()
+            rows = positions[first_rows]
+            self.row_orders.append(rows)
+            self.present[rows, s] = True
+            if 'Governor Name' in df.columns:
+                self.names[rows, s] = df['Governor Name'].to_numpy()[first_rows]
+            if self.alliances is not None and 'Alliance' in df.columns:
+                self.alliances[rows, s] = df['Alliance'].to_numpy()[first_rows]
+
+            missing = [metric for metric in PERIOD_METRICS if metric not in df.columns]
+            if missing:
+                self.valid[s] = False
+                continue
+            for m, metric in enumerate(STACKED_METRICS):
+                if metric not in df.columns:
+                    continue
+                self.has_metric[s, m] = True
+                column = pd.to_numeric(df[metric], errors='coerce')
+                self.integer_metrics[s, m] = pd.api.types.is_integer_dtype(column)
+                self.values[rows, s, m] = column.fillna(0).to_numpy(dtype=np.float64)[first_rows]
+
+
+def _period_frame(stack: SnapshotStack, s: int, e: int, rows: np.ndarray, deltas: np.ndarray,
+                  dkp: np.ndarray, ranks: np.ndarray, p: int, dkp_is_integer: bool) -> pd.DataFrame:
+    """Builds the DataFrame of one period from the stacked arrays, in the same layout as calculate_period_stats."""
+    def typed(values: np.ndarray, integer: bool) -> np.ndarray:
+        return values.astype(np.int64) if integer else values
+
+    names = pd.Series(stack.names[rows, e]).fillna(pd.Series(stack.names[rows, s])).fillna('Unknown Governor')
+    columns = {'Governor ID': stack.governor_ids.to_numpy()[rows], 'Governor Name': names.to_numpy()}
+    if stack.alliances is not None:
+        alliances = pd.Series(stack.alliances[rows, e]).fillna(pd.Series(stack.alliances[rows, s])).fillna('')
+        columns['Alliance'] = alliances.to_numpy()
+    change_is_integer = {}
+    for m, metric in enumerate(PERIOD_METRICS):
+        start_integer, end_integer = stack.integer_metrics[s, m], stack.integer_metrics[e, m]
+        change_is_integer[metric] = start_integer and end_integer
+        end_column = 'Power_after' if metric == 'Power' else f'{metric}_end'
+        columns[f'{metric}_start'] = typed(stack.values[rows, s, m], start_integer)
+        columns[end_column] = typed(stack.values[rows, e, m], end_integer)
+        columns[change_column(metric)] = typed(deltas[rows, p, m], change_is_integer[metric])
+
+    total_is_integer = change_is_integer['Tier 4 Kills'] and change_is_integer['Tier 5 Kills']
+    columns['Total Kills T4+T5 Change'] = typed(
+        columns['Tier 4 Kills Change'] + columns['Tier 5 Kills Change'], total_is_integer)
+    columns['DKP'] = typed(dkp[rows, p], dkp_is_integer)
+    columns['Rank'] = ranks[rows, p].astype(int)
+    return pd.DataFrame(columns)
+
+
+def calculate_stacked_periods(stack: SnapshotStack, periods: Dict[str, Tuple[int, int]],
+                              scoring: ScoringEngine = None) -> Dict[str, pd.DataFrame]:
+    """
+    Calculates the statistics of several periods from a SnapshotStack in one vectorized pass.
+    periods maps a period name to the positions of its (start, end) snapshots in the stack.
+    DKP is scored with the DKP formula of scoring (the default formula if None).
+    Returns {period name: period DataFrame}; a period that cannot be calculated gets an empty DataFrame.
+    """
+    scoring = scoring or ScoringEngine()
+    dkp_metrics = [STACKED_METRICS.index(metric) for metric in scoring.dkp.metrics]
+    # One vectorized pass over all periods: governor x period (x metric) arrays
+    starts = np.array([start for start, _ in periods.values()], dtype=np.intp)
+    ends = np.array([end for _, end in periods.values()], dtype=np.intp)
+    deltas = stack.values[:, ends, :] - stack.values[:, starts, :]
+    dkp = scoring.evaluate({metric: deltas[:, :, m] for m, metric in enumerate(STACKED_METRICS)},
+                           [DKP_FORMULA_NAME])[DKP_FORMULA_NAME]
+    in_period = stack.present[:, starts] & stack.present[:, ends]
+    # Rank players by DKP within each period (only players present in both of its snapshots)
+    ranks = pd.DataFrame(np.where(in_period, dkp, np.nan)).rank(ascending=False, method='min').to_numpy()
+
+    results = {}
+    for p, period_name in enumerate(periods):
+        s, e = starts[p], ends[p]
+        if not (stack.valid[s] and stack.valid[e]):
+            logger.error(f"Period '{period_name}': a snapshot is missing one of the columns {PERIOD_METRICS}.")
+            results[period_name] = pd.DataFrame()
+            continue
+        # Players in the order of the end snapshot, present in the master list AND in both snapshots
+        rows = stack.row_orders[e][stack.present[stack.row_orders[e], s]]
+        if len(rows) == 0:
+            logger.warning(
+                f"No common players found for period '{period_name}' after applying the main player list filter. Check 'Governor ID' column for matches across all relevant files.")
+            results[period_name] = pd.DataFrame()
+            continue
+        unavailable = [STACKED_METRICS[m] for m in dkp_metrics if not (stack.has_metric[s, m] and stack.has_metric[e, m])]
+        if unavailable:
+            logger.warning(f"Period '{period_name}': the DKP formula uses {unavailable}, which the snapshots do not "
+                           f"both have; their changes are scored as 0.")
+        dkp_is_integer = scoring.dkp.integral and all(
+            stack.integer_metrics[s, m] and stack.integer_metrics[e, m] for m in dkp_metrics)
+        results[period_name] = _period_frame(stack, s, e, rows, deltas, dkp, ranks, p, dkp_is_integer)
+        logger.info(f"Period '{period_name}': {len(rows)} players.")
+
+    return results
+
+
+def calculate_all_period_stats(period_files: Dict[str, Tuple[str, str]], master_file: str,
+                               scoring: ScoringEngine = None) -> Dict[str, pd.DataFrame]:
+    """
+    Calculates the statistics of several periods at once.
+    period_files maps a period name to the full paths of its (start, end) snapshot files; master_file is
+    kvk_start_power.xlsx, the main player list shared by all periods.
+    Every distinct snapshot is loaded once, even if periods share files (one period's end is often the
+    next one's start), the snapshots are stacked into a governor x snapshot x metric array, and the changes,
+    DKP (with the DKP formula of scoring, the default formula if None) and ranks of all periods are computed
+    together with array operations.
+    Returns {period name: period DataFrame}. Periods whose files are missing are left out; periods that
+    could not be calculated get an empty DataFrame.
+    """
+    if not os.path.exists(master_file):
+        logger.error(
+            f"Critical error: KVK start power file '{os.path.basename(master_file)}' not found. Cannot calculate period statistics based on the main player list.")
+        return {}
+
+    periods = {}
+    for period_name, (start_file, end_file) in period_files.items():
+        missing = [path for path in (start_file, end_file) if not os.path.exists(path)]
+        if missing:
+            logger.warning(f"Skipping period '{period_name}': {', '.join(os.path.basename(p) for p in missing)} not found.")
+            continue
+        periods[period_name] = (start_file, end_file)
+    if not periods:
+        return {}
+
+    # Load every distinct snapshot exactly once
+    snapshot_files = list(dict.fromkeys(path for files in periods.values() for path in files))
+    try:
+        df_master_players = SNAPSHOT_SCHEMA.canonicalize(read_snapshot(master_file))
+        snapshots = [SNAPSHOT_SCHEMA.canonicalize(read_snapshot(path)) for path in snapshot_files]
+    except Exception as e:
+        logger.error(f"Error loading Excel files for period statistics or main player list: {e}")
+        return {period_name: pd.DataFrame() for period_name in periods}
+
+    stack = SnapshotStack(df_master_players['Governor ID'].astype(str), snapshots)
+    logger.info(
+        f"Main player list from '{os.path.basename(master_file)}' contains {len(stack.governor_ids)} players; "
+        f"stacked {len(snapshot_files)} snapshots for {len(periods)} periods.")
+
+    snapshot_positions = {path: s for s, path in enumerate(snapshot_files)}
+    return calculate_stacked_periods(stack, {
+        period_name: (snapshot_positions[start_file], snapshot_positions[end_file])
+        for period_name, (start_file, end_file) in periods.items()
+    }, scoring)
@@ -0,0 +1,191 @@
+import json
+import logging
+import os
+import shutil
+import time
+from typing import List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_processing.calculator import get_overall_input_files
+from data_processing.export import write_frame
+from data_processing.schema import SNAPSHOT_SCHEMA
+from data_processing.snapshot_cache import read_snapshot
+
+# Configure logging for the requirements generator module
+logger = logging.getLogger('data_processing.requirements')
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Optional requirement tiers of the running KVK, in the project root (DEFAULT_REQUIREMENT_TIERS otherwise)
+REQUIREMENTS_CONFIG_FILE = 'kvk_requirements.json'
+
+# Modes of a requirements config: 'brackets' gives every governor the requirements of the highest tier whose
+# power does not exceed theirs, 'curve' interpolates linearly between the tiers
+BRACKETS_MODE = 'brackets'
+CURVE_MODE = 'curve'
+
+# Tiers of the hand-made kvk_requirements.xlsx: power at KVK start (lower bound) -> required kills and deaths
+DEFAULT_REQUIREMENT_TIERS = [
+    {'power': 0, 'kills': 500_000, 'deaths': 100_000},
+    {'power': 40_000_000, 'kills': 2_500_000, 'deaths': 300_000},
+    {'power': 45_000_000, 'kills': 3_000_000, 'deaths': 400_000},
+    {'power': 50_000_000, 'kills': 3_500_000, 'deaths': 500_000},
+    {'power': 55_000_000, 'kills': 4_000_000, 'deaths': 600_000},
+    {'power': 60_000_000, 'kills': 5_500_000, 'deaths': 700_000},
+    {'power': 65_000_000, 'kills': 6_500_000, 'deaths': 800_000},
+    {'power': 70_000_000, 'kills': 8_000_000, 'deaths': 900_000},
+    {'power': 75_000_000, 'kills': 9_500_000, 'deaths': 1_000_000},
+    {'power': 80_000_000, 'kills': 11_000_000, 'deaths': 1_100_000},
+    {'power': 85_000_000, 'kills': 14_000_000, 'deaths': 1_400_000},
+    {'power': 90_000_000, 'kills': 17_000_000, 'deaths': 1_400_000},
+    {'power': 100_000_000, 'kills': 25_000_000, 'deaths': 1_800_000},
+    {'power': 110_000_000, 'kills': 30_000_000, 'deaths': 2_100_000},
+]
+
+# Columns of kvk_requirements.xlsx, as read by calculate_stats
+REQUIREMENTS_COLUMNS = ['Governor ID', 'Governor Name', 'Power', 'Required Kills', 'Required Deaths']
+
+
+class RequirementsConfigError(ValueError):
+    """Raised when a requirements config cannot be used."""
+
+
+class RequirementTiers:
+    """
+    Kill and death requirements as a function of the power at KVK start, defined by tiers of
+    {'power', 'kills', 'deaths'}:
+    - in BRACKETS_MODE, tiers are lower bounds of power brackets (governors below the first one have no
+      requirements), looked up with np.searchsorted;
+    - in CURVE_MODE, tiers are points of piecewise-linear curves, evaluated with np.interp (constant before
+      the first and after the last point) and rounded to a multiple of round_to.
+    The whole roster is evaluated at once.
+    """
+
+    def __init__(self, tiers: List[Mapping[str, float]], mode: str = BRACKETS_MODE, round_to: int = 1):
+        if mode not in (BRACKETS_MODE, CURVE_MODE):
+            raise RequirementsConfigError(f"'mode' must be '{BRACKETS_MODE}' or '{CURVE_MODE}', got {mode!r}.")
+        if not isinstance(tiers, list) or not tiers:
+            raise RequirementsConfigError("'tiers' must be a non-empty list of {'power', 'kills', 'deaths'}.")
+        for tier in tiers:
+            if not isinstance(tier, Mapping) or any(
+                    isinstance(tier.get(key), bool) or not isinstance(tier.get(key), (int, float)) or tier[key] < 0
+                    for key in ('power', 'kills', 'deaths')):
+                raise RequirementsConfigError(f"Every tier needs non-negative numbers 'power', 'kills' and 'deaths', "
+                                              f"got {tier!r}.")
+        if isinstance(round_to, bool) or not isinstance(round_to, int) or round_to < 1:
+            raise RequirementsConfigError(f"'round_to' must be a positive integer, got {round_to!r}.")
+
+        tiers = sorted(tiers, key=lambda tier: tier['power'])
+        self.powers = np.array([tier['power'] for tier in tiers], dtype=np.float64)
+        if np.any(np.diff(self.powers) == 0):
+            raise RequirementsConfigError("Two tiers have the same 'power'.")
+        self.kills = np.array([tier['kills'] for tier in tiers], dtype=np.float64)
+        self.deaths = np.array([tier['deaths'] for tier in tiers], dtype=np.float64)
+        self.mode = mode
+        self.round_to = round_to
+
+    @classmethod
+    def from_config(cls, config) -> 'RequirementTiers':
+        """Builds the tiers from a requirements config: {'mode', 'tiers', 'round_to'} (see REQUIREMENTS_CONFIG_FILE)."""
+        if not isinstance(config, dict):
+            raise RequirementsConfigError("The requirements config must be a JSON object.")
+        return cls(config.get('tiers'), config.get('mode', BRACKETS_MODE), config.get('round_to', 1))
+
+    @classmethod
+    def load(cls, config_path: str = None) -> 'RequirementTiers':
+        """
+        The tiers of the running KVK: kvk_requirements.json if it exists, DEFAULT_REQUIREMENT_TIERS otherwise.
+        Raises RequirementsConfigError if the file cannot be used.
+        """
+        config_path = config_path or os.path.join(PROJECT_ROOT, REQUIREMENTS_CONFIG_FILE)
+        if not os.path.exists(config_path):
+            return cls(DEFAULT_REQUIREMENT_TIERS)
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise RequirementsConfigError(f"Cannot read '{os.path.basename(config_path)}': {e}")
+        return cls.from_config(config)
+
+    def evaluate(self, power) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns the (required kills, required deaths) int64 arrays for an array of powers at KVK start."""
+        power = np.asarray(power, dtype=np.float64)
+        if self.mode == BRACKETS_MODE:
+            tier = np.searchsorted(self.powers, power, side='right') - 1
+            below_first = tier < 0
+            tier[below_first] = 0
+            kills = np.where(below_first, 0, self.kills[tier])
+            deaths = np.where(below_first, 0, self.deaths[tier])
+        else:
+            kills = np.interp(power, self.powers, self.kills)
+            deaths = np.interp(power, self.powers, self.deaths)
+            kills = np.round(kills / self.round_to) * self.round_to
+            deaths = np.round(deaths / self.round_to) * self.round_to
+        return kills.astype(np.int64), deaths.astype(np.int64)
+
+    def generate(self, df_start: pd.DataFrame) -> pd.DataFrame:
+        """Builds the requirements table (REQUIREMENTS_COLUMNS) of the governors of a start power snapshot."""
+        power = pd.to_numeric(df_start['Power'], errors='coerce').fillna(0)
+        kills, deaths = self.evaluate(power.to_numpy(dtype=np.float64))
+        names = df_start['Governor Name'] if 'Governor Name' in df_start.columns else ''
+        return pd.DataFrame({
+            'Governor ID': df_start['Governor ID'].to_numpy(),
+            'Governor Name': names,
+            'Power': power.to_numpy(),
+            'Required Kills': kills,
+            'Required Deaths': deaths,
+        }, index=df_start.index).reset_index(drop=True)
+
+
+def _id_cells(ids: pd.Series) -> np.ndarray:
+    """
+    Governor IDs as workbook cells: the snapshot cache stores them as text, and the IDs that are whole numbers
+    (without leading zeros) become numbers again, as they are in the start power workbook.
+    """
+    return np.array([int(value) if isinstance(value, str) and value.isdigit() and (value == '0' or value[0] != '0')
+                     else value for value in ids.tolist()], dtype=object)
+
+
+def _backup_workbook(path: str) -> Optional[str]:
+    """
+    Copies a workbook to <path>.<YYYYmmdd-HHMMSS>.bak before it is replaced and returns the copy's path
+    (None if there is no workbook). Every backup has its own name, so the hand-made workbook is never
+    overwritten by a later backup.
+    """
+    if not os.path.exists(path):
+        return None
+    backup_path = f"{path}.{time.strftime('%Y%m%d-%H%M%S')}.bak"
+    if not os.path.exists(backup_path):
+        # A backup made the same second already holds the older workbook
+        shutil.copy2(path, backup_path)
+    return backup_path
+
+
+def generate_requirements_file(tiers: RequirementTiers = None, start_power_file: str = None,
+                               output_file: str = None) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Regenerates kvk_requirements.xlsx (the optional requirements input of calculate_stats) from the governors
+    of kvk_start_power.xlsx and the tiers (RequirementTiers.load() by default). Governor IDs are written as
+    numbers when they are whole numbers, like in the hand-made workbook. The workbook is written next to the
+    output file and then moved over it; the previous workbook is first copied to a timestamped backup
+    (see _backup_workbook). Returns the written table and the path of the backup (None if there was no workbook). Raises RequirementsConfigError if the tiers cannot be loaded and FileNotFoundError
+    if the start power file is missing.
+    """
+    input_files = get_overall_input_files()
+    start_power_file = start_power_file or input_files['start_power']
+    output_file = output_file or input_files['requirements']
+    tiers = tiers or RequirementTiers.load()
+    if not os.path.exists(start_power_file):
+        raise FileNotFoundError(f"KVK start power file '{os.path.basename(start_power_file)}' not found.")
+
+    df_start = SNAPSHOT_SCHEMA.canonicalize(read_snapshot(start_power_file))
+    df_start = df_start.assign(**{'Governor ID': _id_cells(df_start['Governor ID'])})
+    df_requirements = tiers.generate(df_start)
+    backup_path = _backup_workbook(output_file)
+    write_frame(df_requirements, output_file, 'xlsx')
+    logger.info(f"Generated requirements of {len(df_requirements)} governors ({tiers.mode}, {len(tiers.powers)} tiers) "
+                f"into '{os.path.basename(output_file)}'" +
+                (f", previous workbook kept as '{os.path.basename(backup_path)}'." if backup_path else "."))
+    return df_requirements, backup_path
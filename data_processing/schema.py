@@ -0,0 +1,120 @@
+import logging
+from typing import Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+# Configure logging for the schema module
+logger = logging.getLogger('data_processing.schema')
+
+# Cyrillic letters that look like Latin ones ('Убийства Т4' is typed both with a Cyrillic and a Latin 'T').
+# Both sides of a lookup are folded the same way, so only the normalized keys are affected.
+_HOMOGLYPHS = str.maketrans('авекмнорстух', 'abekmhopctyx')
+
+# Maximum number of distinct header layouts whose resolution is kept by a ColumnSchema
+HEADER_CACHE_SIZE = 256
+
+
+def normalize_header(name) -> str:
+    """Case-, whitespace- and Cyrillic/Latin lookalike-insensitive form of a column header."""
+    return ' '.join(str(name).casefold().split()).translate(_HOMOGLYPHS)
+
+
+class ColumnSchema:
+    """
+    A set of canonical column names and the header variants (English/Russian) that map to them.
+    The alias table is compiled into a normalized lookup once, when the schema is created, and the
+    resolution of every observed header tuple is cached, so files sharing a layout are resolved for free.
+    """
+
+    def __init__(self, name: str, aliases: Dict[str, Iterable[str]]):
+        self.name = name
+        self.columns = list(aliases)
+        self._lookup = {}
+        for canonical, variants in aliases.items():
+            for variant in (canonical, *variants):
+                key = normalize_header(variant)
+                if self._lookup.setdefault(key, canonical) != canonical:
+                    raise ValueError(f"Header alias '{variant}' is mapped to both '{self._lookup[key]}' and '{canonical}'.")
+        self._resolved: Dict[Tuple, Tuple[Optional[str], ...]] = {}
+
+    def canonical_name(self, header) -> Optional[str]:
+        """Returns the canonical name of a single header, or None if it is not part of the schema."""
+        return self._lookup.get(normalize_header(header))
+
+    def resolve(self, header: Iterable) -> Tuple[Optional[str], ...]:
+        """
+        Returns, for every position of a header row, the canonical column name.
+        Headers outside of the schema are kept, stripped; empty cells and later duplicates of an already
+        resolved column (the first matching header wins) are None.
+        """
+        header = tuple(header)
+        resolved = self._resolved.get(header)
+        if resolved is not None:
+            return resolved
+
+        names = []
+        seen = set()
+        for cell in header:
+            name = None
+            if cell is not None and str(cell).strip():
+                name = self.canonical_name(cell) or str(cell).strip()
+                if name in seen:
+                    name = None
+                else:
+                    seen.add(name)
+            names.append(name)
+        resolved = tuple(names)
+
+        if len(self._resolved) >= HEADER_CACHE_SIZE:
+            self._resolved.pop(next(iter(self._resolved)))
+        self._resolved[header] = resolved
+        logger.debug(f"Resolved {self.name} header layout: {dict(zip(header, resolved))}")
+        return resolved
+
+    def positions(self, header: Iterable, columns=None) -> Dict[int, str]:
+        """
+        Maps header positions to canonical names.
+        With columns=None every resolved header is kept; otherwise only the requested canonical columns.
+        """
+        return {position: name for position, name in enumerate(self.resolve(header))
+                if name is not None and (columns is None or name in columns)}
+
+    def canonicalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Returns df with its columns renamed to canonical names (and duplicates dropped); df itself is not modified."""
+        resolved = self.resolve(df.columns)
+        if all(name == column for name, column in zip(resolved, df.columns)):
+            return df
+        keep = [position for position, name in enumerate(resolved) if name is not None]
+        return df.take(keep, axis=1).set_axis([resolved[position] for position in keep], axis=1)
+
+
+# Columns of the KVK snapshot workbooks used by the calculators
+SNAPSHOT_SCHEMA = ColumnSchema('snapshot', {
+    'Governor ID': [],
+    'Governor Name': ['Имя Губернатора'],
+    'Alliance': ['Alliance Tag', 'Тег Альянса', 'Альянс'],
+    'Power': ['Мощь'],
+    'Kill Points': ['Очки Убийств', 'Суммарные очки убийств'],
+    'Deads': ['Dead Troops', 'Deaths', 'Погибшие войска', 'Смерти'],
+    'Tier 1 Kills': ['T1 Kills', 'Убийства Т1'],
+    'Tier 2 Kills': ['T2 Kills', 'Убийства Т2'],
+    'Tier 3 Kills': ['T3 Kills', 'Убийства Т3'],
+    'Tier 4 Kills': ['T4 Kills', 'Убийства Т4'],
+    'Tier 5 Kills': ['T5 Kills', 'Убийства Т5'],
+    'Required Kills': [],
+    'Required Deaths': [],
+})
+
+# Columns of the per-period workbooks imported into the database by bot.db_manager (keyed by database column)
+IMPORT_SCHEMA = ColumnSchema('import', {
+    'player_id': ['ID', 'Governor ID'],
+    'player_name': ['Имя', 'Governor Name', 'Имя Губернатора'],
+    'alliance_tag': ['Тег Альянса', 'Alliance Tag', 'Alliance'],
+    'kills': ['Убийства', 'Kills'],
+    'death': ['Смерти', 'Deaths', 'Deads'],
+    'resource_gathered': ['Собранные Ресурсы', 'Resources Gathered'],
+    'alliance_help': ['Помощь Альянса', 'Alliance Helps'],
+    'ruins_captured': ['Захваченные Руины', 'Ruins Captured'],
+    'pass_occupied': ['Занятые Проходы', 'Passes Occupied'],
+    'kill_points': ['Очки Убийств', 'Kill Points'],
+})
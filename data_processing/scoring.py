@@ -0,0 +1,256 @@
+import ast
+import logging
+from typing import Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    # Optional and deliberately not in requirements.txt: evaluates non-linear formulas in one multithreaded pass
+    # without temporaries; without it they are evaluated with numpy (same results)
+    import numexpr
+except ImportError:
+    numexpr = None
+
+# Configure logging for the scoring module
+logger = logging.getLogger('data_processing.scoring')
+
+# Terms a formula can use: term -> snapshot metric whose change over the period the term stands for
+TERM_METRICS = {
+    'power': 'Power',
+    'kill_points': 'Kill Points',
+    'deads': 'Deads',
+    't1': 'Tier 1 Kills',
+    't2': 'Tier 2 Kills',
+    't3': 'Tier 3 Kills',
+    't4': 'Tier 4 Kills',
+    't5': 'Tier 5 Kills',
+}
+# Power lost over the period (0 if power grew), e.g. to reward troops lost in fights
+POWER_LOSS_TERM = 'power_loss'
+FORMULA_TERMS = list(TERM_METRICS) + [POWER_LOSS_TERM]
+
+# Name of the formula that produces the DKP column and the ranks; other formulas are scoring variants
+DKP_FORMULA_NAME = 'dkp'
+DEFAULT_DKP_FORMULA = {'deads': 15, 't5': 10, 't4': 4}
+
+# Syntax allowed in formula expressions: arithmetic on terms and numbers
+_EXPRESSION_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Add, ast.Sub, ast.Mult, ast.Div,
+                     ast.UAdd, ast.USub, ast.Constant, ast.Name, ast.Load)
+
+# Key of the constant in linear combinations built by _linear_combination
+_CONSTANT = ''
+
+
+class ScoringFormulaError(ValueError):
+    """Raised when a scoring formula cannot be compiled."""
+
+
+def change_column(metric: str) -> str:
+    """Column holding a metric's change in the results and period frames (e.g. 'Deads' -> 'Deads Change')."""
+    return 'Kills Change' if metric == 'Kill Points' else f'{metric} Change'
+
+
+def _linear_combination(node: ast.AST) -> Optional[Dict[str, float]]:
+    """Reduces an expression to {term: weight} (plus _CONSTANT), or returns None if it is not linear."""
+    if isinstance(node, ast.Expression):
+        return _linear_combination(node.body)
+    if isinstance(node, ast.Constant):
+        return {_CONSTANT: node.value}
+    if isinstance(node, ast.Name):
+        return {node.id: 1}
+    if isinstance(node, ast.UnaryOp):
+        operand = _linear_combination(node.operand)
+        if operand is None or isinstance(node.op, ast.UAdd):
+            return operand
+        return {term: -weight for term, weight in operand.items()}
+    left, right = _linear_combination(node.left), _linear_combination(node.right)
+    if left is None or right is None:
+        return None
+    if isinstance(node.op, (ast.Add, ast.Sub)):
+        sign = 1 if isinstance(node.op, ast.Add) else -1
+        combined = dict(left)
+        for term, weight in right.items():
+            combined[term] = combined.get(term, 0) + sign * weight
+        return combined
+    # A product or a quotient is linear only if one side (the divisor for a quotient) is a constant
+    if isinstance(node.op, ast.Mult):
+        if set(left) == {_CONSTANT}:
+            left, right = right, left
+        if set(right) == {_CONSTANT}:
+            return {term: weight * right[_CONSTANT] for term, weight in left.items()}
+    if isinstance(node.op, ast.Div) and set(right) == {_CONSTANT} and right[_CONSTANT] != 0:
+        return {term: weight / right[_CONSTANT] for term, weight in left.items()}
+    return None
+
+
+class ScoringFormula:
+    """
+    One scoring formula, compiled once. A formula is defined either as weights, {term: weight}
+    (e.g. {"deads": 15, "t5": 10, "t4": 4}), or as an arithmetic expression over the terms
+    (e.g. "15 * deads + 10 * t5 + 4 * t4 - power_loss / 2"). The terms are FORMULA_TERMS: the change of
+    each metric of TERM_METRICS over the period, and power_loss.
+    Linear expressions are reduced to weights; weights is None for the others, which are evaluated as
+    expressions.
+    """
+
+    def __init__(self, name: str, definition: Union[Mapping[str, float], str]):
+        self.name = name
+        if isinstance(definition, Mapping):
+            for term, weight in definition.items():
+                if isinstance(weight, bool) or not isinstance(weight, (int, float)):
+                    raise ScoringFormulaError(f"Formula '{name}': the weight of '{term}' must be a number, got {weight!r}.")
+            self.weights: Optional[Dict[str, float]] = dict(definition)
+            self.intercept = 0
+            self.expression = ' + '.join(f"{weight} * {term}" for term, weight in definition.items()) or '0'
+            terms = set(definition)
+            self._code = None
+        elif isinstance(definition, str):
+            try:
+                tree = ast.parse(definition, mode='eval')
+            except SyntaxError as e:
+                raise ScoringFormulaError(f"Formula '{name}' is not a valid expression: {e.msg}.")
+            for node in ast.walk(tree):
+                if not isinstance(node, _EXPRESSION_NODES) or \
+                        (isinstance(node, ast.Constant) and (isinstance(node.value, bool) or
+                                                             not isinstance(node.value, (int, float)))):
+                    raise ScoringFormulaError(f"Formula '{name}' may only use numbers, terms and + - * / operators.")
+            terms = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+            linear = _linear_combination(tree)
+            self.intercept = linear.pop(_CONSTANT, 0) if linear is not None else 0
+            self.weights = linear
+            self.expression = definition
+            self._code = compile(tree, f"<formula {name}>", 'eval')
+        else:
+            raise ScoringFormulaError(f"Formula '{name}' must be an object of weights or an expression string.")
+
+        unknown = sorted(terms - set(FORMULA_TERMS))
+        if unknown:
+            raise ScoringFormulaError(f"Formula '{name}' uses unknown terms {unknown}; "
+                                      f"available terms: {', '.join(FORMULA_TERMS)}.")
+        self.terms = sorted(terms)
+        # Integer changes scored with integer weights give integer scores
+        self.integral = self.weights is not None and all(
+            float(weight).is_integer() for weight in list(self.weights.values()) + [self.intercept])
+
+    @property
+    def metrics(self) -> List[str]:
+        """Snapshot metrics whose changes the formula depends on."""
+        return sorted({TERM_METRICS['power' if term == POWER_LOSS_TERM else term] for term in self.terms})
+
+    def evaluate_expression(self, terms: Mapping[str, np.ndarray]) -> np.ndarray:
+        """Evaluates the formula as an expression (with numexpr when it is installed)."""
+        local_terms = {term: terms[term] for term in self.terms}
+        if numexpr is not None:
+            return numexpr.evaluate(self.expression, local_dict=local_terms)
+        # The expression was validated to contain nothing but arithmetic on the terms
+        return np.asarray(eval(self._code, {'__builtins__': {}}, local_terms))
+
+
+def _combine_linear(formulas: List[ScoringFormula], terms: Mapping[str, np.ndarray],
+                    shape: tuple) -> Dict[str, np.ndarray]:
+    """
+    Scores linear formulas together: a formula x term weight matrix times the term x governor matrix,
+    a single BLAS matrix multiplication in float64. Scores of formulas with integer weights over integer
+    changes are converted back to int64 (exact while they stay below 2**53).
+    """
+    linear_terms = sorted({term for formula in formulas for term in formula.terms})
+    weights = np.array([[formula.weights.get(term, 0) for term in linear_terms] for formula in formulas],
+                       dtype=np.float64).reshape(len(formulas), len(linear_terms))
+    stacked = np.empty((len(linear_terms), int(np.prod(shape, dtype=np.int64))), dtype=np.float64)
+    for t, term in enumerate(linear_terms):
+        stacked[t] = np.ravel(terms[term])
+    combined = (weights @ stacked).reshape((len(formulas),) + shape)
+    integer_changes = all(np.issubdtype(terms[term].dtype, np.integer) for term in linear_terms)
+
+    scores = {}
+    for f, formula in enumerate(formulas):
+        values = combined[f] + formula.intercept if formula.intercept else combined[f]
+        scores[formula.name] = values.astype(np.int64) if formula.integral and integer_changes else values
+    return scores
+
+
+class ScoringEngine:
+    """
+    A set of named scoring formulas compiled once: the DKP formula (DKP_FORMULA_NAME, DEFAULT_DKP_FORMULA
+    unless configured) and any number of scoring variants.
+    evaluate() scores all (or the selected) formulas over arrays of metric changes of any shape, e.g.
+    governor or governor x period: the linear formulas together with one matrix multiplication over
+    the stacked term arrays, the other formulas as expressions.
+    """
+
+    def __init__(self, formulas: Mapping[str, Union[Mapping[str, float], str, ScoringFormula]] = None):
+        formulas = dict(formulas or {})
+        formulas.setdefault(DKP_FORMULA_NAME, DEFAULT_DKP_FORMULA)
+        # Formulas already compiled (e.g. those of another engine) are reused as they are
+        self.formulas: Dict[str, ScoringFormula] = {
+            name: definition if isinstance(definition, ScoringFormula) else ScoringFormula(name, definition)
+            for name, definition in formulas.items()}
+
+    @classmethod
+    def from_config(cls, scoring) -> 'ScoringEngine':
+        """Builds the engine from the 'scoring' object of a config.json: {formula name: weights or expression}."""
+        if scoring is None:
+            return cls()
+        if not isinstance(scoring, Mapping) or not all(isinstance(name, str) for name in scoring):
+            raise ScoringFormulaError("'scoring' must be an object of formula name -> weights or expression.")
+        return cls(scoring)
+
+    @property
+    def dkp(self) -> ScoringFormula:
+        return self.formulas[DKP_FORMULA_NAME]
+
+    @property
+    def signature(self) -> tuple:
+        """Identifies the formulas of the engine (names and expressions), e.g. in keys of computations made with it."""
+        return tuple((name, formula.expression) for name, formula in self.formulas.items())
+
+    @property
+    def metrics(self) -> List[str]:
+        """Snapshot metrics whose changes are needed to evaluate every formula."""
+        return sorted({metric for formula in self.formulas.values() for metric in formula.metrics})
+
+    def evaluate(self, changes: Mapping[str, np.ndarray], names: Sequence[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Scores the formulas called names (all formulas by default) from changes, {snapshot metric: array of
+        changes}, all arrays of the same shape. Returns {formula name: array of scores} in formula order.
+        Raises KeyError if a metric needed by a formula is missing from changes.
+        """
+        selected = [self.formulas[name] for name in (names if names is not None else self.formulas)]
+        needed_terms = {term for formula in selected for term in formula.terms}
+        terms = {term: np.asarray(changes[TERM_METRICS[term]]) for term in needed_terms if term in TERM_METRICS}
+        if POWER_LOSS_TERM in needed_terms:
+            terms[POWER_LOSS_TERM] = np.maximum(-np.asarray(changes[TERM_METRICS['power']]), 0)
+
+        scores = {}
+        shape = np.shape(next(iter(changes.values()))) if changes else ()
+        linear = [formula for formula in selected if formula.weights is not None]
+        if linear:
+            scores.update(_combine_linear(linear, terms, shape))
+        for formula in selected:
+            if formula.weights is None:
+                scores[formula.name] = formula.evaluate_expression(terms)
+        return {formula.name: scores[formula.name] for formula in selected}
+
+    def evaluate_frame(self, df: pd.DataFrame, names: Sequence[str] = None) -> pd.DataFrame:
+        """
+        Scores the governors of a results or period frame from its change columns (see change_column);
+        returns a frame with one column per formula, indexed like df. Metrics without a change column
+        count as 0, with a warning. Useful to preview alternative formulas on a loaded frame.
+        Changes are widened to int64 (or float64) first: frames kept by the bot are compacted to int32,
+        whose products would overflow in non-linear formulas.
+        """
+        selected = [self.formulas[name] for name in (names if names is not None else self.formulas)]
+        changes = {}
+        for metric in sorted({metric for formula in selected for metric in formula.metrics}):
+            column = change_column(metric)
+            if column in df.columns:
+                values = df[column]
+                if pd.api.types.is_integer_dtype(values):
+                    changes[metric] = values.to_numpy(dtype=np.int64)
+                else:
+                    changes[metric] = pd.to_numeric(values, errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+            else:
+                logger.warning(f"Column '{column}' is missing, '{metric}' changes are scored as 0.")
+                changes[metric] = np.zeros(len(df), dtype=np.int64)
+        return pd.DataFrame(self.evaluate(changes, names), index=df.index)
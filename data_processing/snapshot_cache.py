@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_processing.loader import read_snapshot_streaming
+
+# Configure logging for the snapshot cache module
+logger = logging.getLogger('data_processing.snapshot_cache')
+
+# Sidecar files live next to the project, outside of the tracked data folders
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+CACHE_DIR = os.path.join(PROJECT_ROOT, 'cache', 'snapshots')
+
+# Bump when the sidecar layout changes so that stale entries are re-parsed
+CACHE_FORMAT_VERSION = 5
+
+# Read buffer used while hashing workbook contents
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# One lock per cache entry: the compute pool may load the same workbook from two threads at once
+_entry_locks = {}
+_entry_locks_guard = threading.Lock()
+
+
+def _file_digest(file_path: str) -> str:
+    """Returns the SHA-1 digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_dir(file_path: str) -> str:
+    """Returns the cache directory for a workbook, keyed by its absolute path."""
+    path_key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, path_key)
+
+
+def _entry_lock(entry_dir: str) -> threading.Lock:
+    with _entry_locks_guard:
+        lock = _entry_locks.get(entry_dir)
+        if lock is None:
+            lock = _entry_locks[entry_dir] = threading.Lock()
+        return lock
+
+
+def _temp_file(entry_dir: str, suffix: str):
+    """Opens a uniquely named temporary file in the entry directory; it is published with os.replace."""
+    return tempfile.NamedTemporaryFile(dir=entry_dir, suffix=suffix, delete=False)
+
+
+def _read_manifest(entry_dir: str):
+    manifest_path = os.path.join(entry_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Snapshot cache manifest '{manifest_path}' is unreadable, ignoring it: {e}")
+        return None
+    if manifest.get('version') != CACHE_FORMAT_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(entry_dir: str, manifest: dict):
+    # Write to a temporary file first so that readers never see a half-written manifest
+    with _temp_file(entry_dir, '.tmp') as f:
+        f.write(json.dumps(manifest, ensure_ascii=False).encode('utf-8'))
+    os.replace(f.name, os.path.join(entry_dir, 'manifest.json'))
+
+
+def _save_array(entry_dir: str, file_name: str, values: np.ndarray):
+    # Replacing the file instead of overwriting it keeps frames that still memory-map the old one valid
+    with _temp_file(entry_dir, '.npy.tmp') as f:
+        np.save(f, values, allow_pickle=False)
+    os.replace(f.name, os.path.join(entry_dir, file_name))
+
+
+def _column_to_array(series: pd.Series):
+    """
+    Converts a column into a NumPy array that can be saved with np.save and memory-mapped back.
+    Returns (kind, values, null_mask), where null_mask is None if the column has no missing values.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return 'bool', series.to_numpy(dtype=bool), None
+    if pd.api.types.is_integer_dtype(series):
+        return 'int', series.to_numpy(dtype=np.int64), None
+    if pd.api.types.is_float_dtype(series):
+        return 'float', series.to_numpy(dtype=np.float64), None
+
+    # Everything else (names, mixed text/number cells, dates) is stored as fixed-width unicode
+    null_mask = series.isna().to_numpy()
+    values = series.where(~null_mask, '').astype(str).to_numpy(dtype=str)
+    return 'str', values, (null_mask if null_mask.any() else None)
+
+
+def _write_sidecar(entry_dir: str, df: pd.DataFrame, digest: str) -> list:
+    columns = []
+    for i, col in enumerate(df.columns):
+        kind, values, null_mask = _column_to_array(df[col])
+        values_file = f"{digest}_{i}.npy"
+        _save_array(entry_dir, values_file, values)
+        mask_file = None
+        if null_mask is not None:
+            mask_file = f"{digest}_{i}.mask.npy"
+            _save_array(entry_dir, mask_file, null_mask)
+        columns.append({'name': col, 'kind': kind, 'file': values_file, 'mask': mask_file})
+    return columns
+
+
+def _load_sidecar(entry_dir: str, manifest: dict) -> pd.DataFrame:
+    """
+    Builds the snapshot frame from the sidecar files. Numeric columns stay memory-mapped: they are read-only
+    views of the .npy files, and copy=False keeps the DataFrame constructor from copying or consolidating them.
+    Text columns are materialized as Python strings.
+    """
+    data = {}
+    for column in manifest['columns']:
+        values = np.load(os.path.join(entry_dir, column['file']), mmap_mode='r', allow_pickle=False)
+        if column['kind'] == 'str':
+            # Text columns become Python objects again, as pd.read_excel would return them
+            values = values.astype(object)
+            if column['mask']:
+                null_mask = np.load(os.path.join(entry_dir, column['mask']), allow_pickle=False)
+                values[null_mask] = np.nan
+        data[column['name']] = values
+    return pd.DataFrame(data, columns=[column['name'] for column in manifest['columns']], copy=False)
+
+
+def _remove_stale_files(entry_dir: str, manifest: dict):
+    keep = {'manifest.json'}
+    for column in manifest['columns']:
+        keep.add(column['file'])
+        if column['mask']:
+            keep.add(column['mask'])
+    for file_name in os.listdir(entry_dir):
+        if file_name not in keep and not file_name.endswith('.tmp'):
+            try:
+                os.remove(os.path.join(entry_dir, file_name))
+            except OSError:
+                pass
+
+
+def _read_snapshot_locked(file_path: str, file_stat: os.stat_result, entry_dir: str, started: float) -> pd.DataFrame:
+    manifest = _read_manifest(entry_dir)
+
+    if manifest is not None:
+        unchanged = (manifest['mtime_ns'] == file_stat.st_mtime_ns and manifest['size'] == file_stat.st_size)
+        if not unchanged and manifest['digest'] == _file_digest(file_path):
+            # The file was touched or copied over with identical contents: the sidecar is still valid
+            manifest['mtime_ns'] = file_stat.st_mtime_ns
+            manifest['size'] = file_stat.st_size
+            _write_manifest(entry_dir, manifest)
+            unchanged = True
+        if unchanged:
+            try:
+                df = _load_sidecar(entry_dir, manifest)
+                logger.info(
+                    f"Snapshot '{os.path.basename(file_path)}' loaded from cache in "
+                    f"{(time.perf_counter() - started) * 1000:.1f} ms. Shape: {df.shape}")
+                return df
+            except (OSError, ValueError) as e:
+                logger.warning(f"Snapshot cache for '{os.path.basename(file_path)}' is damaged, re-parsing: {e}")
+
+    digest = _file_digest(file_path)
+    df = read_snapshot_streaming(file_path)
+    parsed = time.perf_counter()
+
+    try:
+        os.makedirs(entry_dir, exist_ok=True)
+        new_manifest = {
+            'version': CACHE_FORMAT_VERSION,
+            'source': os.path.abspath(file_path),
+            'mtime_ns': file_stat.st_mtime_ns,
+            'size': file_stat.st_size,
+            'digest': digest,
+            'columns': _write_sidecar(entry_dir, df, digest),
+        }
+        _write_manifest(entry_dir, new_manifest)
+        _remove_stale_files(entry_dir, new_manifest)
+    except (OSError, ValueError) as e:
+        # The cache is an optimization only: a failed write must not break the calculation
+        logger.warning(f"Could not write snapshot cache for '{os.path.basename(file_path)}': {e}")
+
+    logger.info(
+        f"Snapshot '{os.path.basename(file_path)}' parsed from workbook in {(parsed - started) * 1000:.1f} ms "
+        f"(cache written in {(time.perf_counter() - parsed) * 1000:.1f} ms). Shape: {df.shape}")
+    return df
+
+
+def read_snapshot(file_path: str) -> pd.DataFrame:
+    """
+    Loads the first sheet of a snapshot workbook, using a columnar sidecar cache.
+    The cache entry is keyed by the workbook path, its mtime and its content hash. On the first load
+    the workbook is streamed with read_snapshot_streaming (only the snapshot columns, headers normalized
+    to their canonical names) and every column is written as a typed .npy file;
+    later loads read those files instead of parsing the workbook again: numeric columns are memory-mapped
+    (read-only, not copied), text columns are converted back to Python strings.
+    """
+    started = time.perf_counter()
+    file_stat = os.stat(file_path)  # Raises FileNotFoundError like pd.read_excel would
+    entry_dir = _entry_dir(file_path)
+    # Checking, parsing and rewriting an entry is serialized per workbook, so concurrent loads never
+    # publish a torn manifest or remove sidecar files that another thread is still writing
+    with _entry_lock(entry_dir):
+        return _read_snapshot_locked(file_path, file_stat, entry_dir, started)
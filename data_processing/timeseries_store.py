@@ -0,0 +1,253 @@
+import logging
+import os
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data_processing.period_engine import PERIOD_METRICS, STACKED_METRICS
+from data_processing.schema import SNAPSHOT_SCHEMA
+from data_processing.snapshot_cache import read_snapshot
+
+# Configure logging for the time-series snapshot store
+logger = logging.getLogger('data_processing.timeseries_store')
+
+# Default location of the store, next to the bot database
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+TIMESERIES_DIR = os.path.join(PROJECT_ROOT, 'data', 'timeseries')
+
+# Folder where officers drop the intra-KVK scan workbooks of the running KVK (see SnapshotTimeSeries.import_folder)
+SCANS_DIR = os.path.join(PROJECT_ROOT, 'scans')
+
+# Scan time in a workbook name, e.g. 'scan_2026-10-16_14-30.xlsx' or '2026-10-16 14.30.05.xlsx'
+_SCAN_NAME_TIME = re.compile(r'(\d{4})-(\d{2})-(\d{2})[ _T](\d{2})[-.:](\d{2})(?:[-.:](\d{2}))?')
+
+# Chunk files are named after the scan timestamp (nanoseconds, zero-padded), so that name order is time order
+_CHUNK_PREFIX = 'scan_'
+_CHUNK_SUFFIX = '.npz'
+
+
+def scan_timestamp(file_path: str) -> Optional[pd.Timestamp]:
+    """Returns the scan time written in a workbook name (YYYY-MM-DD_HH-MM[-SS]), or None if it has none."""
+    match = _SCAN_NAME_TIME.search(os.path.basename(file_path))
+    if match is None:
+        return None
+    year, month, day, hour, minute, second = (int(part or 0) for part in match.groups())
+    try:
+        return pd.Timestamp(year=year, month=month, day=day, hour=hour, minute=minute, second=second)
+    except ValueError:
+        return None
+
+
+def _to_timestamp_ns(timestamp) -> int:
+    """Accepts a pandas/datetime timestamp, a date string or nanoseconds since the epoch."""
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    return pd.Timestamp(timestamp).value
+
+
+class SnapshotTimeSeries:
+    """
+    Append-only store of intra-KVK scans: the metrics of every governor per scan timestamp, i.e. every metric
+    a scoring formula can reference (STACKED_METRICS); PERIOD_METRICS are required, T1-T3 kills are kept if the
+    snapshot has them.
+    - Each scan is written once, as a compact columnar chunk (one .npz file: IDs, names, the names of the
+      recorded metrics and an int64 metric matrix). Chunks are ordered by scan time, not by the order they were
+      recorded in: a scan older than the last stored one takes its place in the series.
+    - On first query the chunks are combined into cumulative arrays of shape scan x governor x metric holding,
+      for each scan, every governor's metrics as of that scan (their last observation at or before it).
+      The change of a governor between any two timestamps is then a single subtraction.
+    Metrics are stored as whole numbers; missing values are stored as 0. The bot records the scan workbooks
+    dropped in the scans folder (see import_folder); the before/after and period snapshot pairs are not scans.
+    """
+
+    def __init__(self, root_dir: str = TIMESERIES_DIR):
+        self.root_dir = root_dir
+        self._arrays = None  # Built lazily by _build(), dropped on append()
+        # Workbooks of the scans folder that could not be recorded -> their mtime, so that each is reported once
+        self._skipped: Dict[str, int] = {}
+
+    def _chunk_files(self) -> List[str]:
+        if not os.path.isdir(self.root_dir):
+            return []
+        return sorted(name for name in os.listdir(self.root_dir)
+                      if name.startswith(_CHUNK_PREFIX) and name.endswith(_CHUNK_SUFFIX))
+
+    def _stored_timestamps(self) -> Set[int]:
+        return {int(name[len(_CHUNK_PREFIX):-len(_CHUNK_SUFFIX)]) for name in self._chunk_files()}
+
+    @property
+    def timestamps(self) -> pd.DatetimeIndex:
+        """Timestamps of the stored scans, in ascending order."""
+        return pd.DatetimeIndex(self._load()[0])
+
+    def append(self, df: pd.DataFrame, timestamp) -> int:
+        """
+        Records one scan (a snapshot frame) taken at timestamp, in any order: a scan older than the last stored
+        one is inserted at its place in time. Raises ValueError if a scan was already recorded at timestamp.
+        Returns the number of governors recorded.
+        """
+        timestamp_ns = _to_timestamp_ns(timestamp)
+        if timestamp_ns in self._stored_timestamps():
+            raise ValueError(f"A scan at {pd.Timestamp(timestamp_ns)} is already recorded.")
+
+        df = SNAPSHOT_SCHEMA.canonicalize(df)
+        missing = [column for column in ['Governor ID'] + PERIOD_METRICS if column not in df.columns]
+        if missing:
+            raise KeyError(f"Snapshot is missing the columns {missing}.")
+        df = df.drop_duplicates(subset='Governor ID')
+
+        names = df['Governor Name'] if 'Governor Name' in df.columns else pd.Series('', index=df.index)
+        metric_names = [metric for metric in STACKED_METRICS if metric in df.columns]
+        metrics = np.column_stack([
+            pd.to_numeric(df[metric], errors='coerce').fillna(0).to_numpy(dtype=np.int64) for metric in metric_names
+        ])
+
+        os.makedirs(self.root_dir, exist_ok=True)
+        chunk_path = os.path.join(self.root_dir, f"{_CHUNK_PREFIX}{timestamp_ns:020d}{_CHUNK_SUFFIX}")
+        # Write to a temporary file first, so that a reader never loads a half-written chunk
+        tmp_path = f"{chunk_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f,
+                     governor_ids=df['Governor ID'].astype(str).str.strip().to_numpy(dtype=str),
+                     names=names.fillna('').astype(str).to_numpy(dtype=str),
+                     metric_names=np.array(metric_names, dtype=str),
+                     metrics=metrics)
+        os.replace(tmp_path, chunk_path)
+        self._arrays = None
+        logger.info(f"Recorded scan at {pd.Timestamp(timestamp_ns)} with {len(df)} governors.")
+        return len(df)
+
+    def append_workbook(self, file_path: str, timestamp=None) -> int:
+        """
+        Records a scan workbook. The scan time is timestamp if given, otherwise the one written in the file name
+        (see scan_timestamp); the file's modification time is never used, since copying a file changes it.
+        """
+        if timestamp is None:
+            timestamp = scan_timestamp(file_path)
+            if timestamp is None:
+                raise ValueError(f"'{os.path.basename(file_path)}' has no scan time (YYYY-MM-DD_HH-MM) in its name.")
+        return self.append(read_snapshot(file_path), timestamp)
+
+    def import_folder(self, directory: str = SCANS_DIR) -> int:
+        """
+        Records the scan workbooks of a folder that are not stored yet, i.e. whose scan time (from the file name)
+        has no recorded scan. Workbooks without a scan time in their name or that cannot be recorded are reported
+        once and skipped until they change. Returns the number of scans recorded.
+        """
+        if not os.path.isdir(directory):
+            return 0
+        stored = self._stored_timestamps()
+        recorded = 0
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith('.xlsx') or name.startswith('~$'):
+                continue  # Not a workbook, or an Excel lock file
+            timestamp = scan_timestamp(name)
+            if timestamp is not None and timestamp.value in stored:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                modified = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if self._skipped.get(name) == modified:
+                continue
+            try:
+                self.append_workbook(path, timestamp)
+            except (OSError, KeyError, ValueError) as e:
+                self._skipped[name] = modified
+                logger.warning(f"Scan '{name}' was not recorded in the time-series store: {e}")
+                continue
+            self._skipped.pop(name, None)
+            stored.add(timestamp.value)
+            recorded += 1
+        return recorded
+
+    def _load(self):
+        if self._arrays is None:
+            self._arrays = self._build()
+        return self._arrays
+
+    def _build(self):
+        started = time.perf_counter()
+        chunk_files = self._chunk_files()
+        timestamps = np.array([int(name[len(_CHUNK_PREFIX):-len(_CHUNK_SUFFIX)]) for name in chunk_files],
+                              dtype='datetime64[ns]')
+        chunks = []
+        for name in chunk_files:
+            with np.load(os.path.join(self.root_dir, name), allow_pickle=False) as chunk:
+                # Chunks written before T1-T3 kills were stored hold PERIOD_METRICS only
+                metric_names = chunk['metric_names'].tolist() if 'metric_names' in chunk.files else PERIOD_METRICS
+                columns = np.array([STACKED_METRICS.index(metric) for metric in metric_names], dtype=np.intp)
+                chunks.append((chunk['governor_ids'], chunk['names'], columns, chunk['metrics']))
+
+        # Governors in order of first appearance
+        governor_ids = pd.Index(pd.unique(np.concatenate([ids.astype(object) for ids, _, _, _ in chunks]))
+                                if chunks else np.array([], dtype=object))
+        shape = (len(chunks), len(governor_ids))
+        increments = np.zeros(shape + (len(STACKED_METRICS),), dtype=np.int64)
+        observed = np.zeros(shape, dtype=bool)
+        has_metric = np.zeros((len(chunks), len(STACKED_METRICS)), dtype=bool)
+        names = np.full(shape, None, dtype=object)
+        last_values = np.zeros((len(governor_ids), len(STACKED_METRICS)), dtype=np.int64)
+        for k, (ids, chunk_names, columns, metrics) in enumerate(chunks):
+            rows = governor_ids.get_indexer(ids.astype(object))
+            cells = np.ix_(rows, columns)
+            # Each scan stores the change since the governor's previous observation (of the metrics it recorded)
+            increments[k][cells] = metrics - last_values[cells]
+            last_values[cells] = metrics
+            observed[k, rows] = True
+            has_metric[k, columns] = True
+            names[k, rows] = np.where(chunk_names == '', None, chunk_names.astype(object))
+
+        cumulative = np.cumsum(increments, axis=0)
+        # Position of every governor's last scan at or before each scan (-1 if not scanned yet)
+        scan_positions = np.arange(len(chunks), dtype=np.int64)[:, None]
+        last_seen = np.where(observed, scan_positions, -1)
+        if len(chunks):
+            last_seen = np.maximum.accumulate(last_seen, axis=0)
+        # Latest known name of every governor as of each scan
+        names = pd.DataFrame(names).ffill().to_numpy() if len(chunks) else names
+        # Whether every scan up to each scan recorded a metric (T1-T3 kills are optional in snapshots)
+        complete = np.logical_and.accumulate(has_metric, axis=0)
+        logger.debug(f"Time-series store built from {len(chunks)} scans and {len(governor_ids)} governors "
+                     f"in {(time.perf_counter() - started) * 1000:.1f} ms.")
+        return timestamps, governor_ids, cumulative, last_seen, names, complete
+
+    def scan_position(self, timestamp) -> int:
+        """Position of the last scan taken at or before timestamp."""
+        timestamps = self._load()[0]
+        position = int(np.searchsorted(timestamps, np.datetime64(_to_timestamp_ns(timestamp), 'ns'), side='right')) - 1
+        if position < 0:
+            raise ValueError(f"No scan was recorded at or before {pd.Timestamp(_to_timestamp_ns(timestamp))}.")
+        return position
+
+    def delta(self, start_time, end_time) -> Tuple[pd.Index, np.ndarray, np.ndarray]:
+        """
+        Returns (governor IDs, changes, mask) between two timestamps: changes is a governor x metric array
+        (columns in STACKED_METRICS order; a metric some scan up to end_time did not record is not reliable) and mask tells which governors were scanned both by start_time
+        and again after it, up to end_time.
+        """
+        _, governor_ids, cumulative, last_seen, _, _ = self._load()
+        start, end = self.scan_position(start_time), self.scan_position(end_time)
+        return governor_ids, cumulative[end] - cumulative[start], (last_seen[start] >= 0) & (last_seen[end] > start)
+
+    def as_of(self, timestamp, scanned_after=None) -> pd.DataFrame:
+        """
+        Returns a snapshot frame (canonical column names) with every governor's metrics as of timestamp,
+        i.e. from their last scan at or before it. Governors not scanned by then are left out, and so are,
+        if scanned_after is given, governors whose last scan is not later than the scan at scanned_after
+        (so that, like with a pair of files, a period only includes governors scanned at both of its ends).
+        Optional metrics (T1-T3 kills) are only included if every scan up to timestamp recorded them.
+        """
+        _, all_ids, cumulative, last_seen, names, complete = self._load()
+        position = self.scan_position(timestamp)
+        earliest = self.scan_position(scanned_after) + 1 if scanned_after is not None else 0
+        rows = np.flatnonzero(last_seen[position] >= earliest)
+        frame = pd.DataFrame({'Governor ID': all_ids.to_numpy()[rows], 'Governor Name': names[position, rows]})
+        for m, metric in enumerate(STACKED_METRICS):
+            if complete[position, m]:
+                frame[metric] = cumulative[position, rows, m]
+        return frame
@@ -0,0 +1,143 @@
+import logging
+import warnings
+from typing import Dict, Iterable, List, Mapping
+
+import numpy as np
+import pandas as pd
+
+# Configure logging for the snapshot validation module
+logger = logging.getLogger('data_processing.validation')
+
+# Counters that never decrease in game: a negative change means the snapshots are mixed up or mistyped
+NON_DECREASING_METRICS = ['Kill Points', 'Deads', 'Tier 1 Kills', 'Tier 2 Kills', 'Tier 3 Kills',
+                          'Tier 4 Kills', 'Tier 5 Kills']
+
+# Changes further than this many standard deviations from the kingdom's mean are reported as outliers
+Z_SCORE_THRESHOLD = 4.0
+# Below this many governors the standard deviation means little and outliers are not looked for
+MIN_GOVERNORS_FOR_OUTLIERS = 10
+
+# Columns of the per-governor issue tables
+ISSUE_COLUMNS = ['Governor ID', 'Governor Name', 'Column', 'Change', 'Z-score']
+
+
+class ValidationReport:
+    """
+    Problems found in the input snapshots of one calculation, collected by calculate_stats before scoring:
+    - duplicates: {input file: Governor IDs listed more than once};
+    - dropped: {merge: Governor IDs the inner merge removed};
+    - negative_deltas: governors whose change of a NON_DECREASING_METRICS counter is negative;
+    - outliers: governors whose change is more than Z_SCORE_THRESHOLD standard deviations from the mean;
+    - missing_changes: governors whose change is missing (NaN), e.g. an empty cell in a snapshot.
+    Every check runs on whole ID or change arrays at once. The issue tables have ISSUE_COLUMNS ('Z-score' is
+    empty for negative deltas and missing changes, 'Change' for missing changes).
+    """
+
+    def __init__(self):
+        self.governors = 0
+        self.duplicates: Dict[str, np.ndarray] = {}
+        self.dropped: Dict[str, np.ndarray] = {}
+        self.negative_deltas = pd.DataFrame(columns=ISSUE_COLUMNS)
+        self.outliers = pd.DataFrame(columns=ISSUE_COLUMNS)
+        self.missing_changes = pd.DataFrame(columns=ISSUE_COLUMNS)
+
+    def check_duplicates(self, source: str, ids) -> None:
+        """Records the Governor IDs listed more than once in an input file."""
+        # Hash-based (no sort of the ID strings); each duplicated ID is reported once
+        ids = pd.Series(np.asarray(ids, dtype=object))
+        duplicates = pd.unique(ids[ids.duplicated()].to_numpy())
+        if len(duplicates):
+            self.duplicates[source] = duplicates
+            logger.warning(f"'{source}' lists {len(duplicates)} Governor IDs more than once: "
+                           f"{', '.join(duplicates[:10])}{'...' if len(duplicates) > 10 else ''}")
+
+    def record_merge(self, stage: str, ids_before, ids_after) -> None:
+        """Records the Governor IDs an inner merge removed (present before it, missing after it)."""
+        ids_before = pd.Series(pd.unique(np.asarray(ids_before, dtype=object)))
+        dropped = ids_before[~ids_before.isin(np.asarray(ids_after, dtype=object))].to_numpy()
+        if len(dropped):
+            self.dropped[stage] = dropped
+            logger.info(f"{stage}: {len(dropped)} governors dropped.")
+
+    def check_changes(self, ids, names, changes: Mapping[str, np.ndarray],
+                      non_decreasing: Iterable[str] = ()) -> None:
+        """
+        Checks the change columns of the merged governors: changes maps a change column to its values
+        (aligned with ids and names); the columns listed in non_decreasing must not be negative.
+        All columns are stacked into one governor x column matrix and checked with array operations.
+        Missing changes are reported as such and left out of the mean and standard deviation of their column.
+        """
+        ids, names = np.asarray(ids, dtype=object), np.asarray(names, dtype=object)
+        self.governors = len(ids)
+        columns = list(changes)
+        if not columns or not len(ids):
+            return
+        matrix = np.column_stack([np.asarray(changes[col], dtype=np.float64) for col in columns])
+
+        missing = np.isnan(matrix)
+        rows, cols = np.nonzero(missing)
+        self.missing_changes = self._issues(ids, names, columns, matrix, rows, cols, np.full(len(rows), np.nan))
+
+        non_decreasing = [c for c, col in enumerate(columns) if col in set(non_decreasing)]
+        rows, cols = np.nonzero(matrix[:, non_decreasing] < 0)
+        cols = np.asarray(non_decreasing, dtype=np.intp)[cols]
+        self.negative_deltas = self._issues(ids, names, columns, matrix, rows, cols, np.full(len(rows), np.nan))
+
+        if len(ids) >= MIN_GOVERNORS_FOR_OUTLIERS:
+            # A column without any value has no mean: its z-scores stay 0 (np.divide's where leaves them)
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', RuntimeWarning)
+                mean, std = np.nanmean(matrix, axis=0), np.nanstd(matrix, axis=0)
+            z_scores = np.divide(matrix - mean, std, out=np.zeros_like(matrix), where=(std > 0) & ~missing)
+            rows, cols = np.nonzero(np.abs(z_scores) > Z_SCORE_THRESHOLD)
+            outliers = self._issues(ids, names, columns, matrix, rows, cols, z_scores[rows, cols])
+            self.outliers = outliers.iloc[np.argsort(-outliers['Z-score'].abs().to_numpy(), kind='stable')] \
+                .reset_index(drop=True)
+
+        if len(self.negative_deltas) or len(self.outliers) or len(self.missing_changes):
+            logger.warning(f"{len(self.negative_deltas)} negative changes of never-decreasing counters, "
+                           f"{len(self.outliers)} outlier changes (|z| > {Z_SCORE_THRESHOLD}) and "
+                           f"{len(self.missing_changes)} missing changes found.")
+
+    @staticmethod
+    def _issues(ids: np.ndarray, names: np.ndarray, columns: List[str], matrix: np.ndarray,
+                rows: np.ndarray, cols: np.ndarray, z_scores: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({
+            'Governor ID': ids[rows],
+            'Governor Name': names[rows],
+            'Column': np.asarray(columns, dtype=object)[cols],
+            'Change': matrix[rows, cols],
+            'Z-score': np.round(z_scores, 2),
+        }, columns=ISSUE_COLUMNS)
+
+    @property
+    def issue_count(self) -> int:
+        return (sum(len(ids) for ids in self.duplicates.values()) + sum(len(ids) for ids in self.dropped.values())
+                + len(self.negative_deltas) + len(self.outliers) + len(self.missing_changes))
+
+    def summary(self) -> str:
+        """One-line summary, as logged after each calculation."""
+        return (f"{self.governors} governors checked: "
+                f"{sum(len(ids) for ids in self.duplicates.values())} duplicate IDs, "
+                f"{sum(len(ids) for ids in self.dropped.values())} dropped by merges, "
+                f"{len(self.negative_deltas)} negative changes, {len(self.outliers)} outliers, "
+                f"{len(self.missing_changes)} missing changes.")
+
+    def write_workbook(self, output) -> None:
+        """
+        Writes the report (a path or a binary file object): Duplicates, Dropped, Negative Changes, Outliers and
+        Missing Changes sheets.
+        """
+        def id_table(ids_by_source: Dict[str, np.ndarray], source_column: str) -> pd.DataFrame:
+            return pd.DataFrame({
+                source_column: np.repeat(list(ids_by_source), [len(ids) for ids in ids_by_source.values()]),
+                'Governor ID': np.concatenate(list(ids_by_source.values())) if ids_by_source else [],
+            }, columns=[source_column, 'Governor ID'])
+
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            id_table(self.duplicates, 'File').to_excel(writer, sheet_name='Duplicates', index=False)
+            id_table(self.dropped, 'Merge').to_excel(writer, sheet_name='Dropped', index=False)
+            self.negative_deltas.drop(columns='Z-score').to_excel(writer, sheet_name='Negative Changes', index=False)
+            self.outliers.to_excel(writer, sheet_name='Outliers', index=False)
+            self.missing_changes.drop(columns=['Change', 'Z-score']).to_excel(writer, sheet_name='Missing Changes',
+                                                                               index=False)
@@ -0,0 +1,126 @@
+import logging
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from data_processing.scoring import DKP_FORMULA_NAME, ScoringEngine, ScoringFormula, change_column
+
+# Configure logging for the what-if scoring module
+logger = logging.getLogger('data_processing.whatif')
+
+# Size of the top of the leaderboard compared between the baseline formula and each variant
+TOP_OVERLAP_SIZE = 50
+
+
+def rank_matrix(scores: np.ndarray) -> np.ndarray:
+    """
+    Ranks each row of a formula x governor score matrix in descending order, all rows at once:
+    rank 1 is the highest score and tied scores share the best rank (like Series.rank(method='min'),
+    which ranks the results frame).
+    """
+    formulas, governors = scores.shape
+    order = np.argsort(-scores, axis=1, kind='stable')
+    sorted_scores = np.take_along_axis(scores, order, axis=1)
+    # Each position takes the position of the first score of its run of equal scores
+    run_starts = np.ones((formulas, governors), dtype=bool)
+    run_starts[:, 1:] = sorted_scores[:, 1:] != sorted_scores[:, :-1]
+    sorted_ranks = np.maximum.accumulate(np.where(run_starts, np.arange(governors), 0), axis=1) + 1
+    ranks = np.empty((formulas, governors), dtype=np.int64)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=1)
+    return ranks
+
+
+def unavailable_metrics(df: pd.DataFrame, formula: ScoringFormula) -> List[str]:
+    """Metrics of a formula without a change column in df (ScoringEngine.evaluate_frame would score them as 0)."""
+    return [metric for metric in formula.metrics if change_column(metric) not in df.columns]
+
+
+class WhatIfComparison:
+    """
+    Side-by-side scoring of one results or period frame with several formulas of a ScoringEngine: the
+    baseline formula (the DKP formula by default) and the variants to compare with it.
+    All formulas are scored together (one matrix multiplication for the linear ones, see
+    ScoringEngine.evaluate) into a formula x governor score matrix, which is ranked row by row with a
+    single argsort. A positive rank shift means the variant moves the governor up the leaderboard.
+    Raises ValueError if a formula uses a metric the frame has no change column for (e.g. T1-T3 kills,
+    which the results frame does not keep), rather than ranking with those changes as 0.
+    The frame itself is not modified.
+    """
+
+    def __init__(self, df: pd.DataFrame, scoring: ScoringEngine, variants: Sequence[str] = None,
+                 baseline: str = DKP_FORMULA_NAME):
+        if variants is None:
+            variants = [name for name in scoring.formulas if name != baseline]
+        self.baseline = baseline
+        self.names: List[str] = [baseline] + [name for name in variants if name != baseline]
+        self.formulas = {name: scoring.formulas[name] for name in self.names}
+        unavailable = {name: unavailable_metrics(df, formula) for name, formula in self.formulas.items()}
+        unavailable = {name: metrics for name, metrics in unavailable.items() if metrics}
+        if unavailable:
+            raise ValueError("The data has no changes of " + "; ".join(
+                f"{', '.join(metrics)} (used by '{name}')" for name, metrics in unavailable.items()) + ".")
+        self.governor_ids = df['Governor ID'].astype(str).to_numpy()
+        self.governor_names = df['Governor Name'].to_numpy() if 'Governor Name' in df.columns \
+            else np.full(len(df), '', dtype=object)
+
+        scores = scoring.evaluate_frame(df, self.names)
+        self.scores = scores.to_numpy(dtype=np.float64).T
+        self.ranks = rank_matrix(self.scores)
+        # Shifts of every formula against the baseline (row 0, all zeros)
+        self.shifts = self.ranks[0] - self.ranks
+        self._score_frame = scores
+        logger.info(f"What-if scoring of {len(df)} governors with {len(self.names)} formulas: {self.names}.")
+
+    def _row(self, name: str) -> int:
+        return self.names.index(name)
+
+    def movers(self, name: str, count: int) -> Dict[str, np.ndarray]:
+        """Row positions of the count governors the variant moves up ('up') and down ('down') the most."""
+        shifts = self.shifts[self._row(name)]
+        order = np.argsort(-shifts, kind='stable')
+        up = order[:count]
+        down = order[::-1][:count]
+        return {'up': up[shifts[up] > 0], 'down': down[shifts[down] < 0]}
+
+    def top(self, name: str, count: int) -> np.ndarray:
+        """Row positions of the count best-ranked governors under a formula."""
+        ranks = self.ranks[self._row(name)]
+        return np.argsort(ranks, kind='stable')[:count]
+
+    def summary(self) -> pd.DataFrame:
+        """
+        One row per variant: governors whose rank changes, mean and largest absolute rank shift, and how
+        many of the baseline's TOP_OVERLAP_SIZE best-ranked governors stay in the variant's top.
+        """
+        top_size = min(TOP_OVERLAP_SIZE, self.ranks.shape[1])
+        in_top = self.ranks <= top_size
+        absolute_shifts = np.abs(self.shifts[1:])
+        return pd.DataFrame({
+            'Formula': self.names[1:],
+            'Expression': [self.formulas[name].expression for name in self.names[1:]],
+            'Governors Moved': np.count_nonzero(absolute_shifts, axis=1),
+            'Mean Rank Shift': absolute_shifts.mean(axis=1) if absolute_shifts.shape[1] else 0.0,
+            'Largest Rank Shift': absolute_shifts.max(axis=1, initial=0),
+            f'Top {top_size} Kept': np.count_nonzero(in_top[1:] & in_top[0], axis=1),
+        })
+
+    def to_frame(self) -> pd.DataFrame:
+        """The comparison table: each governor's score and rank under every formula and the variants' rank shifts,
+        ordered by the baseline rank."""
+        columns = {'Governor ID': self.governor_ids, 'Governor Name': self.governor_names}
+        for row, name in enumerate(self.names):
+            columns[f'{name} Score'] = self._score_frame[name].to_numpy()
+            columns[f'{name} Rank'] = self.ranks[row]
+            if row:
+                columns[f'{name} Rank Shift'] = self.shifts[row]
+        return pd.DataFrame(columns).iloc[np.argsort(self.ranks[0], kind='stable')].reset_index(drop=True)
+
+    def write_workbook(self, output) -> None:
+        """Writes the comparison workbook (a path or a binary file object): Comparison, Summary and Formulas sheets."""
+        formulas = pd.DataFrame({'Formula': self.names,
+                                 'Expression': [self.formulas[name].expression for name in self.names]})
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            self.to_frame().to_excel(writer, sheet_name='Comparison', index=False)
+            self.summary().to_excel(writer, sheet_name='Summary', index=False)
+            formulas.to_excel(writer, sheet_name='Formulas', index=False)
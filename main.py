@@ -25,6 +25,7 @@ root_logger.addHandler(handler)
 logging.getLogger('discord').setLevel(logging.INFO)
 logging.getLogger('discord.http').setLevel(logging.INFO)
 logging.getLogger('data_processing.calculator').setLevel(logging.DEBUG)
+logging.getLogger('data_processing.snapshot_cache').setLevel(logging.DEBUG)
 logging.getLogger('utils.chart_generator').setLevel(logging.DEBUG)
 logging.getLogger('utils.helpers').setLevel(logging.DEBUG)
 # --- КОНЕЦ БЛОКА КОНФИГУРАЦИИ ЛОГИРОВАНИЯ ---
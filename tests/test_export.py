@@ -0,0 +1,35 @@
+import threading
+
+import pandas as pd
+
+from data_processing import export
+from data_processing.export import ResultsExporter
+
+
+def test_get_during_export_joins_the_running_export(tmp_path, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+    writes = []
+
+    def slow_write_frame(df, path, fmt):
+        writes.append(path)
+        started.set()
+        assert release.wait(timeout=5)
+
+    monkeypatch.setattr(export, 'write_frame', slow_write_frame)
+    exporter = ResultsExporter(output_dir=str(tmp_path), formats=['csv'])
+    try:
+        scheduled = exporter.submit(pd.DataFrame({'Governor ID': ['1'], 'DKP': [10]}))['csv']
+        assert started.wait(timeout=5)
+
+        # The export has started but not finished: get() must not queue a second one
+        joined = exporter.get('csv')
+        assert joined is scheduled
+
+        release.set()
+        assert joined.result(timeout=5) == exporter.path('csv')
+        assert exporter.get('csv').result(timeout=5) == exporter.path('csv')
+    finally:
+        release.set()
+        exporter.shutdown()
+
+    assert writes == [exporter.path('csv')]
@@ -1,81 +1,178 @@
-import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-import os
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import asyncio
 import io
 import logging
-import pandas as pd  # Needed for pd.isna
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Hashable, Optional
 from utils.helpers import format_number_custom  # Import the helper for number formatting
 
 # Configure logging for this module
 logger = logging.getLogger(__name__)
 
+# Number of worker threads (and template figures) used by ChartRenderService
+CHART_RENDER_WORKERS = 2
+# Number of finished PNG charts kept in memory by ChartRenderService
+CHART_CACHE_SIZE = 256
+
+# Arc geometry: a half circle from 0 to 180 degrees
+ARC_THETA_START = 0
+ARC_THETA_END = 180
+
+
+def _progress_angle(completion_pct: float) -> float:
+    return ARC_THETA_START + (ARC_THETA_END - ARC_THETA_START) * (min(completion_pct, 100) / 100)
+
+
+class ProgressChartTemplate:
+    """
+    A pre-built dual semi-circular progress figure.
+    The figure, the three arcs and the text labels are created once; render() only updates the
+    progress angles and the label texts in place before saving the PNG.
+    A template must only be used by one thread at a time.
+    """
+
+    def __init__(self):
+        self.fig = Figure(figsize=(6, 3), facecolor='#222222')
+        FigureCanvasAgg(self.fig)
+        ax = self.fig.add_subplot()
+        ax.set_xlim(-1.1, 1.1)
+        ax.set_ylim(-0.6, 1.1)
+        ax.axis('off')
+
+        center = (0, 0)
+
+        # Background arc (outermost)
+        radius_outer = 1.0
+        background = patches.Arc(center, radius_outer * 2, radius_outer * 2, angle=0, theta1=ARC_THETA_START,
+                                 theta2=ARC_THETA_END, linewidth=12, color='#555555', alpha=0.7)
+        ax.add_patch(background)
+
+        # Deaths progress arc (middle)
+        radius_middle_deaths = 0.9
+        self.deaths_progress = patches.Arc(center, radius_middle_deaths * 2, radius_middle_deaths * 2, angle=0,
+                                           theta1=ARC_THETA_START, theta2=ARC_THETA_START,
+                                           linewidth=12, color='#E879F9', alpha=0.8)  # Purple for deaths
+        ax.add_patch(self.deaths_progress)
+
+        # Kills progress arc (innermost)
+        radius_inner_kills = 0.8
+        self.kills_progress = patches.Arc(center, radius_inner_kills * 2, radius_inner_kills * 2, angle=0,
+                                          theta1=ARC_THETA_START, theta2=ARC_THETA_START,
+                                          linewidth=12, color='#D4AF37', alpha=0.8)  # Gold for kills
+        ax.add_patch(self.kills_progress)
+
+        # Text labels, filled in by render()
+        self.kills_text = ax.text(-0.5, -0.2, '', ha='center', va='center', fontsize=10, color='#D4AF37')
+        self.deaths_text = ax.text(0.5, -0.2, '', ha='center', va='center', fontsize=10, color='#E879F9')
+        self.title_text = ax.text(0, 0.3, '', ha='center', va='center', fontsize=14, color='#AAAAAA')
+
+        ax.set_aspect('equal', adjustable='box')
+
+    def render(self, kills_completion_pct: float, deaths_completion_pct: float,
+               player_name: str, required_kills: float, current_kills: float,
+               required_deaths: float, current_deaths: float) -> bytes:
+        """Updates the arcs and labels for one player and returns the chart as PNG bytes."""
+        self.deaths_progress.theta2 = _progress_angle(deaths_completion_pct)
+        self.deaths_progress.stale = True
+        self.kills_progress.theta2 = _progress_angle(kills_completion_pct)
+        self.kills_progress.stale = True
+
+        self.kills_text.set_text(
+            f'Kills:\n Cur: {format_number_custom(current_kills)}\n Req:{format_number_custom(required_kills)}\n({kills_completion_pct:.0f}%)')
+        self.deaths_text.set_text(
+            f'Deaths:\n Cur: {format_number_custom(current_deaths)}\n Req: {format_number_custom(required_deaths)}\n({deaths_completion_pct:.0f}%)')
+        self.title_text.set_text(f'{player_name}\nProgress')
+
+        buf = io.BytesIO()
+        self.fig.savefig(buf, format='png', transparent=True, bbox_inches='tight', dpi=100)
+        return buf.getvalue()
+
 
 def create_dual_semi_circular_progress(kills_completion_pct: float, deaths_completion_pct: float,
                                        player_name: str, required_kills: float, current_kills: float,
-                                       required_deaths: float, current_deaths: float) -> str:
+                                       required_deaths: float, current_deaths: float) -> Optional[io.BytesIO]:
     """
     Creates a dual semi-circular progress chart for Kills and Deaths completion.
     This version uses overlapping arcs on a single subplot and displays detailed stats.
+    The chart is rendered in memory and returned as a PNG buffer that discord.File accepts directly.
+    It uses its own Figure with the Agg canvas (no global pyplot state), so it is safe to call from worker threads.
+    For repeated rendering, use ChartRenderService, which reuses template figures and caches results.
     """
-    fig, ax = plt.subplots(figsize=(6, 3), facecolor='#222222')
-    ax.set_xlim(-1.1, 1.1)
-    ax.set_ylim(-0.6, 1.1)
-    ax.axis('off')
-
-    center = (0, 0)
-    theta1 = 0
-    theta2 = 180
-
-    # Background arc (outermost)
-    radius_outer = 1.0
-    background = patches.Arc(center, radius_outer * 2, radius_outer * 2, angle=0, theta1=theta1, theta2=theta2,
-                             linewidth=12, color='#555555', alpha=0.7)
-    ax.add_patch(background)
-
-    # Deaths progress arc (middle)
-    radius_middle_deaths = 0.9
-    angle_deaths = theta1 + (theta2 - theta1) * (min(deaths_completion_pct, 100) / 100)
-    deaths_progress = patches.Arc(center, radius_middle_deaths * 2, radius_middle_deaths * 2, angle=0, theta1=theta1,
-                                  theta2=angle_deaths,
-                                  linewidth=12, color='#E879F9', alpha=0.8)  # Purple for deaths
-    ax.add_patch(deaths_progress)
-
-    # Kills progress arc (innermost)
-    radius_inner_kills = 0.8
-    angle_kills = theta1 + (theta2 - theta1) * (min(kills_completion_pct, 100) / 100)
-    kills_progress = patches.Arc(center, radius_inner_kills * 2, radius_inner_kills * 2, angle=0, theta1=theta1,
-                                 theta2=angle_kills,
-                                 linewidth=12, color='#D4AF37', alpha=0.8)  # Gold for kills
-    ax.add_patch(kills_progress)
-
-    # Text labels
-    # Use current_kills and required_kills directly from function arguments
-    ax.text(-0.5, -0.2,
-            f'Kills:\n Cur: {format_number_custom(current_kills)}\n Req:{format_number_custom(required_kills)}\n({kills_completion_pct:.0f}%)',
-            ha='center', va='center', fontsize=10, color='#D4AF37')
-    # Use current_deaths and required_deaths directly from function arguments
-    ax.text(0.5, -0.2,
-            f'Deaths:\n Cur: {format_number_custom(current_deaths)}\n Req: {format_number_custom(required_deaths)}\n({deaths_completion_pct:.0f}%)',
-            ha='center', va='center', fontsize=10, color='#E879F9')
-
-    ax.text(0, 0.3, f'{player_name}\nProgress', ha='center', va='center', fontsize=14, color='#AAAAAA')
-
-    plt.gca().set_aspect('equal', adjustable='box')
-
-    buf = io.BytesIO()
     try:
-        plt.savefig(buf, format='png', transparent=True, bbox_inches='tight', dpi=100)
-        buf.seek(0)
-        plt.close(fig)  # Close the figure to free memory
-
-        unique_filename = f"progress_chart_{os.urandom(4).hex()}.png"
-        file_path = os.path.join(os.getcwd(), unique_filename)
-        with open(file_path, 'wb') as f:
-            f.write(buf.getvalue())
-        logger.debug(f"Chart saved to {file_path}")
-        return file_path
+        png = ProgressChartTemplate().render(kills_completion_pct, deaths_completion_pct, player_name,
+                                             required_kills, current_kills, required_deaths, current_deaths)
+        logger.debug(f"Chart rendered in memory ({len(png)} bytes)")
+        return io.BytesIO(png)
     except Exception as e:
-        logger.error(f"Error creating or saving chart: {e}", exc_info=True)
-        plt.close(fig)
+        logger.error(f"Error creating chart: {e}", exc_info=True)
         return None
 
+
+class ChartRenderService:
+    """
+    Renders progress charts in background worker threads.
+    - Each worker borrows one of a fixed pool of ProgressChartTemplate figures, so figures are reused.
+    - Finished PNG bytes are kept in an LRU cache keyed by the caller's cache key
+      (e.g. governor and data generation), so repeated requests for the same chart cost nothing.
+    """
+
+    def __init__(self, workers: int = CHART_RENDER_WORKERS, cache_size: int = CHART_CACHE_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chart-render')
+        # Templates are built lazily by the workers, the queue only holds the ones not in use
+        self._templates = queue.Queue()
+        self._templates_created = 0
+        self._max_templates = workers
+        self._templates_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+
+    def _borrow_template(self) -> ProgressChartTemplate:
+        try:
+            return self._templates.get_nowait()
+        except queue.Empty:
+            pass
+        with self._templates_lock:
+            if self._templates_created < self._max_templates:
+                self._templates_created += 1
+                return ProgressChartTemplate()
+        return self._templates.get()
+
+    def _render_in_worker(self, *chart_args) -> bytes:
+        template = self._borrow_template()
+        try:
+            return template.render(*chart_args)
+        finally:
+            self._templates.put(template)
+
+    async def render(self, cache_key: Hashable, kills_completion_pct: float, deaths_completion_pct: float,
+                     player_name: str, required_kills: float, current_kills: float,
+                     required_deaths: float, current_deaths: float) -> Optional[io.BytesIO]:
+        """Returns the chart for cache_key as a PNG buffer, rendering it in a worker thread on a cache miss."""
+        png = self._cache.get(cache_key)
+        if png is not None:
+            self._cache.move_to_end(cache_key)
+            logger.debug(f"Chart for {cache_key} served from cache")
+            return io.BytesIO(png)
+
+        try:
+            png = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._render_in_worker, kills_completion_pct, deaths_completion_pct, player_name,
+                required_kills, current_kills, required_deaths, current_deaths)
+        except Exception as e:
+            logger.error(f"Error creating chart: {e}", exc_info=True)
+            return None
+
+        self._cache[cache_key] = png
+        self._cache.move_to_end(cache_key)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        logger.debug(f"Chart for {cache_key} rendered ({len(png)} bytes)")
+        return io.BytesIO(png)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -12,20 +12,20 @@ logger = logging.getLogger(__name__)
 def format_number_custom(num_value):
     """
     Formats a number with a dot as the thousand separator and a comma for decimals.
-    Handles standard int/float and numpy.int64/numpy.float64.
+    Handles standard int/float and NumPy integer/float scalars of any width (e.g. int32 from compacted frames).
     If the number is an integer, it returns it without decimal places.
     """
     if pd.isna(num_value):
         return "N/A"
 
-    if not isinstance(num_value, (int, float, np.int64, np.float64)):
+    if not isinstance(num_value, (int, float, np.integer, np.floating)):
         logger.debug(f"format_number_custom: Received non-numeric value: {num_value} ({type(num_value)})")
         return str(num_value)
 
     # Convert numpy types to standard Python int/float
-    if isinstance(num_value, np.int64):
+    if isinstance(num_value, np.integer):
         num_value = int(num_value)
-    elif isinstance(num_value, np.float64):
+    elif isinstance(num_value, np.floating):
         num_value = float(num_value)
 
     # Check if the number is an integer by value